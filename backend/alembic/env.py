@@ -0,0 +1,60 @@
+"""Alembic environment: runs migrations with the app's sync engine settings."""
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine, pool
+
+from app.core.config import settings
+from app.models.database import Base
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+# Postgres-only search/filter objects managed by hand-written migrations
+# (0004, 0005), not declared on the models - keep autogenerate from dropping them
+UNMANAGED = {
+    "search_vector", "ix_recipes_search_vector", "ix_recipes_title_trgm",
+    "ix_recipes_tags", "ix_recipes_ingredient_names",
+    "ix_recipes_user_calories", "ix_recipes_user_protein", "ix_recipes_user_carbs", "ix_recipes_user_fat",
+}
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    return name not in UNMANAGED
+
+
+def run_migrations_offline():
+    context.configure(
+        url=settings.DATABASE_URL,
+        target_metadata=target_metadata,
+        include_object=include_object,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    # Reuse a connection handed over by init_db.py (held under its migration lock)
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        context.configure(connection=connection, target_metadata=target_metadata, include_object=include_object)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
+    engine = create_engine(settings.DATABASE_URL, poolclass=pool.NullPool)
+    with engine.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata, include_object=include_object)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
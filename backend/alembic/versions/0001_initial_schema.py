@@ -0,0 +1,108 @@
+"""Initial schema (the tables previously created by Base.metadata.create_all)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'families',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime()),
+    )
+    op.create_index('ix_families_id', 'families', ['id'])
+
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('username', sa.String(), nullable=False),
+        sa.Column('hashed_password', sa.String(), nullable=False),
+        sa.Column('full_name', sa.String()),
+        sa.Column('role', sa.String()),
+        sa.Column('client_code', sa.String()),
+        sa.Column('dietary_restrictions', sa.JSON()),
+        sa.Column('preferences', sa.JSON()),
+        sa.Column('family_id', sa.Integer(), sa.ForeignKey('families.id'), nullable=True),
+        sa.Column('created_at', sa.DateTime()),
+    )
+    op.create_index('ix_users_id', 'users', ['id'])
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+    op.create_index('ix_users_username', 'users', ['username'], unique=True)
+    op.create_index('ix_users_client_code', 'users', ['client_code'], unique=True)
+
+    op.create_table(
+        'recipes',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('description', sa.Text()),
+        sa.Column('instructions', sa.Text(), nullable=False),
+        sa.Column('prep_time', sa.Integer()),
+        sa.Column('cook_time', sa.Integer()),
+        sa.Column('servings', sa.Integer()),
+        sa.Column('difficulty', sa.String()),
+        sa.Column('image_url', sa.String()),
+        sa.Column('source_url', sa.String()),
+        sa.Column('tags', sa.JSON()),
+        sa.Column('ingredients', sa.JSON()),
+        sa.Column('nutritional_info', sa.JSON()),
+        sa.Column('created_at', sa.DateTime()),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=True),
+    )
+    op.create_index('ix_recipes_id', 'recipes', ['id'])
+
+    op.create_table(
+        'meals',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('meal_type', sa.String()),
+        sa.Column('recipe_id', sa.Integer(), sa.ForeignKey('recipes.id')),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('notes', sa.Text()),
+        sa.Column('planned', sa.Boolean()),
+        sa.Column('created_at', sa.DateTime()),
+    )
+    op.create_index('ix_meals_id', 'meals', ['id'])
+
+    op.create_table(
+        'grocery_items',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('quantity', sa.Float()),
+        sa.Column('unit', sa.String()),
+        sa.Column('category', sa.String()),
+        sa.Column('expiration_date', sa.Date()),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('created_at', sa.DateTime()),
+        sa.Column('updated_at', sa.DateTime()),
+    )
+    op.create_index('ix_grocery_items_id', 'grocery_items', ['id'])
+
+    op.create_table(
+        'coach_clients',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('coach_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('client_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False, unique=True),
+        sa.Column('created_at', sa.DateTime()),
+    )
+    op.create_index('ix_coach_clients_id', 'coach_clients', ['id'])
+
+
+def downgrade():
+    op.drop_table('coach_clients')
+    op.drop_table('grocery_items')
+    op.drop_table('meals')
+    op.drop_table('recipes')
+    op.drop_table('users')
+    op.drop_table('families')
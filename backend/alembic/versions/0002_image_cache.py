@@ -0,0 +1,30 @@
+"""Persistent Unsplash image lookup cache
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases last booted with create_all may already have this table
+    if not context.is_offline_mode() and sa.inspect(op.get_bind()).has_table('image_cache'):
+        return
+    op.create_table(
+        'image_cache',
+        sa.Column('query', sa.String(), primary_key=True),
+        sa.Column('image_url', sa.String(), nullable=False),
+        sa.Column('fetched_at', sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table('image_cache')
@@ -0,0 +1,39 @@
+"""Composite indexes for the hot query shapes
+
+- meals (user_id, date, meal_type): get_meals / get_weekly_meals filter and sort order
+- grocery_items (user_id, expiration_date): get_expiring_items range scan
+- recipes (user_id, created_at): get_client_recipes newest-first listing
+- coach_clients (coach_id, client_id): coach's client list and link checks
+
+Built CONCURRENTLY on Postgres so existing tables stay writable.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_meals_user_date_type', 'meals', ['user_id', 'date', 'meal_type']),
+    ('ix_grocery_items_user_expiration', 'grocery_items', ['user_id', 'expiration_date']),
+    ('ix_recipes_user_created', 'recipes', ['user_id', 'created_at']),
+    ('ix_coach_clients_coach_client', 'coach_clients', ['coach_id', 'client_id']),
+]
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
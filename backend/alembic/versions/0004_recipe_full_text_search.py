@@ -0,0 +1,42 @@
+"""Full-text and trigram search on recipes (Postgres only)
+
+- search_vector: generated tsvector over title (A), tags and ingredient names (C)
+  and description (B), with a GIN index
+- pg_trgm GIN index on title for typo-tolerant similarity matching
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+SEARCH_VECTOR = """
+    setweight(to_tsvector('english', coalesce(title, '')), 'A')
+    || setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    || setweight(to_tsvector('english', coalesce(tags::jsonb, '[]'::jsonb)), 'C')
+    || setweight(to_tsvector('english', jsonb_path_query_array(coalesce(ingredients::jsonb, '[]'::jsonb), '$[*].name')), 'C')
+"""
+
+
+def upgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return  # Other databases use the in-process search index
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(f"ALTER TABLE recipes ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({SEARCH_VECTOR}) STORED")
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_recipes_search_vector ON recipes USING gin (search_vector)")
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_recipes_title_trgm ON recipes USING gin (title gin_trgm_ops)")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("DROP INDEX IF EXISTS ix_recipes_title_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_recipes_search_vector")
+    op.execute("ALTER TABLE recipes DROP COLUMN IF EXISTS search_vector")
@@ -0,0 +1,73 @@
+"""JSONB recipe columns with GIN and expression indexes for structured filters
+
+- recipes.tags / ingredients / nutritional_info: json -> jsonb
+- ix_recipes_tags: GIN (jsonb_ops) for tags @> / ?| (all-of / any-of)
+- ix_recipes_ingredient_names: GIN (jsonb_path_ops) over lower-cased ingredient
+  names for "contains chicken and rice" filters
+- ix_recipes_user_<macro>: btree on (user_id, numeric macro) for range filters
+
+The generated search_vector column (0004) depends on tags and ingredients, so
+it is dropped and re-added around the type change. Postgres only.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+COLUMNS = ("tags", "ingredients", "nutritional_info")
+MACROS = ("calories", "protein", "carbs", "fat")
+
+SEARCH_VECTOR = """
+    setweight(to_tsvector('english', coalesce(title, '')), 'A')
+    || setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    || setweight(to_tsvector('english', coalesce(tags::jsonb, '[]'::jsonb)), 'C')
+    || setweight(to_tsvector('english', jsonb_path_query_array(coalesce(ingredients::jsonb, '[]'::jsonb), '$[*].name')), 'C')
+"""
+
+# Expressions must match what app.services.recipe_filters / nutrition_service render
+INGREDIENT_NAMES = "(lower(jsonb_path_query_array(ingredients, '$[*].name')::text)::jsonb)"
+MACRO_VALUE = "(CASE WHEN jsonb_typeof(nutritional_info -> '{0}') = 'number' THEN CAST(nutritional_info -> '{0}' AS FLOAT) END)"
+
+
+def _retype(column_type: str):
+    op.execute("DROP INDEX IF EXISTS ix_recipes_search_vector")
+    op.execute("ALTER TABLE recipes DROP COLUMN IF EXISTS search_vector")
+    for column in COLUMNS:
+        op.execute(f"ALTER TABLE recipes ALTER COLUMN {column} TYPE {column_type} USING {column}::{column_type}")
+    op.execute(f"ALTER TABLE recipes ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({SEARCH_VECTOR}) STORED")
+
+
+def upgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return  # JSON filters fall back to json_each elsewhere
+    _retype("jsonb")
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_recipes_search_vector ON recipes USING gin (search_vector)")
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_recipes_tags ON recipes USING gin (tags)")
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_recipes_ingredient_names "
+            f"ON recipes USING gin ({INGREDIENT_NAMES} jsonb_path_ops)"
+        )
+        for macro in MACROS:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_recipes_user_{macro} "
+                f"ON recipes (user_id, {MACRO_VALUE.format(macro)})"
+            )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for macro in MACROS:
+        op.execute(f"DROP INDEX IF EXISTS ix_recipes_user_{macro}")
+    op.execute("DROP INDEX IF EXISTS ix_recipes_ingredient_names")
+    op.execute("DROP INDEX IF EXISTS ix_recipes_tags")
+    _retype("json")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_recipes_search_vector ON recipes USING gin (search_vector)")
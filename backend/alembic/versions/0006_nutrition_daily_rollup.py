@@ -0,0 +1,48 @@
+"""Per-user daily nutrition rollup table, backfilled from existing meals
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+MACROS = ("calories", "protein", "carbs", "fat")
+# Numeric macro or NULL, per dialect (mirrors app.services.nutrition_service.macro_expression)
+MACRO_VALUE = {
+    "postgresql": "CASE WHEN jsonb_typeof(r.nutritional_info -> '{0}') = 'number' THEN CAST(r.nutritional_info -> '{0}' AS FLOAT) END",
+    "sqlite": "CASE WHEN json_type(r.nutritional_info, '$.{0}') IN ('integer', 'real') THEN json_extract(r.nutritional_info, '$.{0}') END",
+}
+
+
+def upgrade():
+    op.create_table(
+        'nutrition_daily',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+        sa.Column('date', sa.Date(), primary_key=True),
+        sa.Column('meals', sa.Integer(), nullable=False),
+        sa.Column('calories', sa.Float(), nullable=False),
+        sa.Column('protein', sa.Float(), nullable=False),
+        sa.Column('carbs', sa.Float(), nullable=False),
+        sa.Column('fat', sa.Float(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+    )
+    value = MACRO_VALUE.get(op.get_bind().dialect.name)
+    if value is None:
+        return  # run `python nutrition_rollup.py rebuild` after migrating
+    sums = ", ".join(f"COALESCE(SUM({value.format(macro)}), 0)" for macro in MACROS)
+    op.execute(
+        "INSERT INTO nutrition_daily (user_id, date, meals, calories, protein, carbs, fat, updated_at) "
+        f"SELECT m.user_id, m.date, COUNT(*), {sums}, CURRENT_TIMESTAMP "
+        "FROM meals m JOIN recipes r ON r.id = m.recipe_id GROUP BY m.user_id, m.date"
+    )
+
+
+def downgrade():
+    op.drop_table('nutrition_daily')
@@ -0,0 +1,40 @@
+"""Unique (user_id, name, unit) on grocery_items for bulk upserts
+
+Existing duplicates are merged first: quantities are summed into the oldest
+row, which keeps the earliest expiration date, and the rest are deleted.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+SAME_ITEM = "d.user_id = grocery_items.user_id AND d.name = grocery_items.name AND coalesce(d.unit, '') = coalesce(grocery_items.unit, '')"
+KEEP_IDS = "SELECT min(id) FROM grocery_items GROUP BY user_id, name, coalesce(unit, '')"
+
+
+def upgrade():
+    op.execute(
+        "UPDATE grocery_items SET "
+        f"quantity = (SELECT sum(d.quantity) FROM grocery_items d WHERE {SAME_ITEM}), "
+        f"expiration_date = (SELECT min(d.expiration_date) FROM grocery_items d WHERE {SAME_ITEM}) "
+        f"WHERE id IN ({KEEP_IDS} HAVING count(*) > 1)"
+    )
+    op.execute(f"DELETE FROM grocery_items WHERE id NOT IN ({KEEP_IDS})")
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE UNIQUE INDEX {}IF NOT EXISTS uq_grocery_items_user_name_unit "
+            "ON grocery_items (user_id, name, coalesce(unit, ''))".format(
+                "CONCURRENTLY " if op.get_bind().dialect.name == "postgresql" else ""
+            )
+        )
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS uq_grocery_items_user_name_unit")
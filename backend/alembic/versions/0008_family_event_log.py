@@ -0,0 +1,34 @@
+"""Family sync event log with per-family sequence numbers
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('families', sa.Column('last_event_seq', sa.Integer(), nullable=False, server_default='0'))
+    op.create_table(
+        'family_events',
+        sa.Column('family_id', sa.Integer(), sa.ForeignKey('families.id'), primary_key=True),
+        sa.Column('seq', sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column('type', sa.String(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('data', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('ix_family_events_created_at', 'family_events', ['created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_family_events_created_at', table_name='family_events')
+    op.drop_table('family_events')
+    op.drop_column('families', 'last_event_seq')
@@ -1,39 +1,76 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-import bcrypt
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
 from typing import Optional
 import secrets
 
-from app.models.database import get_db, User
-from app.schemas.schemas import UserCreate, UserResponse, Token
+from app.models.database import get_db, User, CoachClient
+from app.schemas.schemas import UserCreate, UserResponse, Token, TokenUser
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.metrics import register_collector
+from app.core.security import PasswordHasherBusy, needs_rehash, password_hasher
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+# Token subject (email) -> UserResponse snapshot, so authenticated requests
+# don't need a user query every time
+user_cache = TTLCache(maxsize=settings.USER_CACHE_MAX_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+auth_stats = {"cache": 0, "db": 0, "stale_claims": 0}
+register_collector("auth", lambda: {"resolved_by": dict(auth_stats), "user_cache": user_cache.stats()})
+
+# Bumped on every invalidation: a lookup that raced one doesn't cache what it read
+_cache_generation = 0
+_PENDING_INVALIDATIONS = "invalidate_user_ids"
+
+
+def invalidate_user(user_id: int) -> None:
+    """Drop a user's cached snapshot (after profile, family or coach-link changes)."""
+    global _cache_generation
+    _cache_generation += 1
+    user_cache.discard_where(lambda _, cached: cached.id == user_id)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_user_changes(session, flush_context):
+    # Flushed is not committed: remember whose snapshot to drop once the commit lands
+    pending = session.info.setdefault(_PENDING_INVALIDATIONS, set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, User):
+            pending.add(obj.id)
+        elif isinstance(obj, CoachClient):
+            pending.update((obj.coach_id, obj.client_id))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    for user_id in session.info.pop(_PENDING_INVALIDATIONS, ()):
+        invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_users(session):
+    session.info.pop(_PENDING_INVALIDATIONS, None)
+
 
 def generate_client_code() -> str:
     """Generate a unique 16-character client code."""
     return secrets.token_hex(8).upper()  # 16 hex chars = 64 bits entropy
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return bcrypt.checkpw(
-        plain_password.encode('utf-8'),
-        hashed_password.encode('utf-8')
+def _hasher_busy_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many sign-in attempts right now. Please try again shortly.",
+        headers={"Retry-After": "1"},
     )
 
 
-def get_password_hash(password: str) -> str:
-    # Bcrypt has a 72 byte limit
-    password_bytes = password.encode('utf-8')[:72]
-    salt = bcrypt.gensalt()
-    return bcrypt.hashpw(password_bytes, salt).decode('utf-8')
-
-
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -45,42 +82,88 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def decode_token(token: str) -> dict:
+    """Decode and verify a JWT, raising 401 if it is invalid or has no subject."""
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
     except JWTError:
-        raise credentials_exception
-    
+        raise _credentials_exception()
+    if payload.get("sub") is None:
+        raise _credentials_exception()
+    return payload
+
+
+async def _resolve_user(payload: dict, db: AsyncSession) -> UserResponse:
     # Email comparison is case-insensitive (stored as lowercase)
-    user = db.query(User).filter(User.email == email.lower()).first()
-    if user is None:
-        raise credentials_exception
+    email = payload["sub"].lower()
+
+    cached = user_cache.get(email)
+    if cached is not None:
+        auth_stats["cache"] += 1
+        user = cached
+    else:
+        generation = _cache_generation
+        result = await db.execute(select(User).where(User.email == email))
+        db_user = result.scalars().first()
+        if db_user is None:
+            raise _credentials_exception()
+        auth_stats["db"] += 1
+        user = UserResponse.model_validate(db_user)
+        if generation == _cache_generation:
+            user_cache.set(email, user)
+
+    # Claims are a snapshot from login. A token for a deleted (or deleted and
+    # re-registered) account is rejected; a changed role or family is authorized
+    # by its current value, not the claim
+    if "user_id" in payload and payload["user_id"] != user.id:
+        raise _credentials_exception()
+    if payload.get("role", user.role) != user.role or payload.get("family_id", user.family_id) != user.family_id:
+        auth_stats["stale_claims"] += 1
     return user
 
 
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+    """Full user profile for the token subject, served from the user cache when possible."""
+    return await _resolve_user(decode_token(token), db)
+
+
+async def get_token_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> TokenUser:
+    """
+    Lightweight principal (id, email, role, family_id) for routes that only authorize.
+    Role and family come from the cached user, never from the token alone, so they
+    are at most USER_CACHE_TTL_SECONDS old; a cache hit costs no query.
+    """
+    user = await _resolve_user(decode_token(token), db)
+    return TokenUser(id=user.id, email=user.email, role=user.role, family_id=user.family_id)
+
+
 @router.post("/register/", response_model=UserResponse)
-async def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     # Normalise email to lowercase for case-insensitive comparison
     normalised_email = user.email.lower()
     
-    db_user = db.query(User).filter(User.email == normalised_email).first()
+    result = await db.execute(select(User).where(User.email == normalised_email))
+    db_user = result.scalars().first()
     if db_user:
         raise HTTPException(status_code=400, detail="An account with this email may already exist. Try logging in instead.")
     
     # Generate a unique client code
     client_code = generate_client_code()
-    while db.query(User).filter(User.client_code == client_code).first():
+    while (await db.execute(select(User.id).where(User.client_code == client_code))).first():
         client_code = generate_client_code()  # Regenerate if collision
     
-    hashed_password = get_password_hash(user.password)
+    try:
+        hashed_password = await password_hasher.hash(user.password)
+    except PasswordHasherBusy:
+        raise _hasher_busy_exception()
     db_user = User(
         email=normalised_email,  # Store as lowercase
         username=user.username,
@@ -92,18 +175,28 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
         preferences=user.preferences
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 
 @router.post("/login/", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     # Normalise email to lowercase for case-insensitive comparison
     normalised_email = form_data.username.lower()
     
-    user = db.query(User).filter(User.email == normalised_email).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    result = await db.execute(select(User).where(User.email == normalised_email))
+    user = result.scalars().first()
+    try:
+        verified = user is not None and await password_hasher.verify(form_data.password, user.hashed_password)
+        if verified and needs_rehash(user.hashed_password):
+            # BCRYPT_ROUNDS changed since this hash was made - upgrade it transparently
+            user.hashed_password = await password_hasher.hash(form_data.password)
+            await db.commit()
+    except PasswordHasherBusy:
+        raise _hasher_busy_exception()
+
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -111,11 +204,14 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
         )
     
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(data={"sub": user.email}, expires_delta=access_token_expires)
+    access_token = create_access_token(
+        data={"sub": user.email, "user_id": user.id, "role": user.role, "family_id": user.family_id},
+        expires_delta=access_token_expires,
+    )
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @router.get("/me/", response_model=UserResponse)
-async def get_me(current_user: User = Depends(get_current_user)):
+async def get_me(current_user: UserResponse = Depends(get_current_user)):
     return current_user
 
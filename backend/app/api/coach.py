@@ -1,16 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from typing import List, Optional
+from datetime import date, timedelta
 
-from app.models.database import get_db, User, CoachClient, Meal, Recipe
+from app.models.database import get_db, User, CoachClient, Meal, Recipe, GroceryItem
 from app.schemas.schemas import (
     LinkClientRequest,
     ClientSummary,
     CoachSummary,
     MealResponse,
-    RecipeResponse
+    RecipeResponse,
+    TokenUser,
+    ClientDashboardEntry,
+    CoachDashboardResponse
 )
-from app.api.auth import get_current_user
+from app.api.auth import get_token_user
+from app.core.config import settings
+from app.core.fast_json import RECIPES, json_response, meal_records, select_meals
+from app.core.http_cache import collection_version
+from app.core.pagination import keyset_paginate, set_next_link
+from app.core.response_cache import cache_key, cached_response, response_cache, tag
+from app.services.nutrition_service import MACROS, macro_expression
+from app.services.transfer_service import export_response
 
 router = APIRouter()
 
@@ -18,8 +31,8 @@ router = APIRouter()
 @router.post("/link/", response_model=dict)
 async def link_client(
     request: LinkClientRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
 ):
     """Coach links a client using their email and unique client code."""
     if current_user.role != "coach":
@@ -29,7 +42,8 @@ async def link_client(
         )
     
     # Find the client by email
-    client = db.query(User).filter(User.email == request.client_email).first()
+    result = await db.execute(select(User).where(User.email == request.client_email))
+    client = result.scalars().first()
     if not client:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -44,7 +58,8 @@ async def link_client(
         )
     
     # Check if client is already linked to another coach
-    existing_link = db.query(CoachClient).filter(CoachClient.client_id == client.id).first()
+    result = await db.execute(select(CoachClient).where(CoachClient.client_id == client.id))
+    existing_link = result.scalars().first()
     if existing_link:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -57,7 +72,8 @@ async def link_client(
         client_id=client.id
     )
     db.add(coach_client)
-    db.commit()
+    await db.commit()
+    await response_cache.invalidate([tag("coach", current_user.id)])
     
     return {"message": f"Successfully linked to client {client.username}"}
 
@@ -65,8 +81,8 @@ async def link_client(
 @router.delete("/unlink/{client_id}", response_model=dict)
 async def unlink_client(
     client_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
 ):
     """Coach unlinks a client."""
     if current_user.role != "coach":
@@ -75,10 +91,11 @@ async def unlink_client(
             detail="Only coaches can unlink clients"
         )
     
-    link = db.query(CoachClient).filter(
+    result = await db.execute(select(CoachClient).where(
         CoachClient.coach_id == current_user.id,
         CoachClient.client_id == client_id
-    ).first()
+    ))
+    link = result.scalars().first()
     
     if not link:
         raise HTTPException(
@@ -86,16 +103,17 @@ async def unlink_client(
             detail="Client link not found"
         )
     
-    db.delete(link)
-    db.commit()
+    await db.delete(link)
+    await db.commit()
+    await response_cache.invalidate([tag("coach", current_user.id)])
     
     return {"message": "Successfully unlinked client"}
 
 
 @router.get("/clients/", response_model=List[ClientSummary])
 async def get_clients(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
 ):
     """Coach retrieves list of their linked clients."""
     if current_user.role != "coach":
@@ -104,17 +122,26 @@ async def get_clients(
             detail="Only coaches can view clients"
         )
     
-    links = db.query(CoachClient).filter(CoachClient.coach_id == current_user.id).all()
-    clients = [link.client for link in links]
+    # Select the client users directly instead of loading each link's relation
+    result = await db.execute(
+        select(User).join(CoachClient, CoachClient.client_id == User.id)
+        .where(CoachClient.coach_id == current_user.id)
+        .order_by(User.username)
+    )
     
-    return clients
+    return result.scalars().all()
 
 
 @router.get("/clients/{client_id}/meals", response_model=List[MealResponse])
 async def get_client_meals(
     client_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's Link header"),
+    skip: Optional[int] = Query(None, ge=0, description="Offset pagination (compatibility mode)"),
+    limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
 ):
     """Coach views a specific client's meals."""
     if current_user.role != "coach":
@@ -124,10 +151,11 @@ async def get_client_meals(
         )
     
     # Verify the coach is linked to this client
-    link = db.query(CoachClient).filter(
+    result = await db.execute(select(CoachClient).where(
         CoachClient.coach_id == current_user.id,
         CoachClient.client_id == client_id
-    ).first()
+    ))
+    link = result.scalars().first()
     
     if not link:
         raise HTTPException(
@@ -135,17 +163,58 @@ async def get_client_meals(
             detail="You are not linked to this client"
         )
     
-    # Get the client's meals
-    meals = db.query(Meal).filter(Meal.user_id == client_id).order_by(Meal.date.desc()).all()
+    # Get the client's meals, each with its recipe's columns (projected, not loaded as entities)
+    query = select_meals().where(Meal.user_id == client_id)
+    
+    if skip is not None and not cursor:
+        result = await db.execute(query.order_by(Meal.date.desc(), Meal.id.desc()).offset(skip).limit(limit))
+        return json_response(response, await meal_records(db, result.mappings()))
+    
+    # Page size is capped (PAGE_SIZE_MAX) - a client's full history is never loaded at once
+    page = await keyset_paginate(
+        db, query, "client_meals", [Meal.date, Meal.id], cursor, limit, descending=True, mappings=True
+    )
+    set_next_link(request, response, page.next_cursor)
+    return json_response(response, await meal_records(db, page.items))
+
+
+@router.get("/clients/{client_id}/meals/export")
+async def export_client_meals(
+    client_id: int,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
+):
+    """Coach downloads a client's full meal history, streamed as NDJSON or CSV."""
+    if current_user.role != "coach":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only coaches can view client meals"
+        )
+    
+    result = await db.execute(select(CoachClient).where(
+        CoachClient.coach_id == current_user.id,
+        CoachClient.client_id == client_id
+    ))
+    if not result.scalars().first():
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You are not linked to this client"
+        )
     
-    return meals
+    return export_response("meals", client_id, format, f"gymfuel-client-{client_id}-meals-{date.today()}")
 
 
 @router.get("/clients/{client_id}/recipes", response_model=List[RecipeResponse])
 async def get_client_recipes(
     client_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's Link header"),
+    skip: Optional[int] = Query(None, ge=0, description="Offset pagination (compatibility mode)"),
+    limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
 ):
     """Coach views a specific client's recipes."""
     if current_user.role != "coach":
@@ -155,10 +224,11 @@ async def get_client_recipes(
         )
     
     # Verify the coach is linked to this client
-    link = db.query(CoachClient).filter(
+    result = await db.execute(select(CoachClient).where(
         CoachClient.coach_id == current_user.id,
         CoachClient.client_id == client_id
-    ).first()
+    ))
+    link = result.scalars().first()
     
     if not link:
         raise HTTPException(
@@ -167,18 +237,103 @@ async def get_client_recipes(
         )
     
     # Get the client's recipes
-    recipes = db.query(Recipe).filter(Recipe.user_id == client_id).order_by(Recipe.created_at.desc()).all()
+    query = select(*RECIPES.columns).where(Recipe.user_id == client_id)
     
-    return recipes
+    async def load():
+        if skip is not None and not cursor:
+            ordered = query.order_by(Recipe.created_at.desc(), Recipe.id.desc())
+            result = await db.execute(ordered.offset(skip).limit(limit))
+            return RECIPES.records(result.mappings())
+        
+        page = await keyset_paginate(
+            db, query, "client_recipes", [Recipe.created_at, Recipe.id], cursor, limit, descending=True,
+            mappings=True,
+        )
+        set_next_link(request, response, page.next_cursor)
+        return RECIPES.records(page.items)
+    
+    # Cached per coach (the link check above always runs); the client's recipe writes invalidate it
+    version, _ = await collection_version(db, client_id, "recipes")
+    key = cache_key(current_user.id, "coach/client-recipes", client_id=client_id, cursor=cursor, skip=skip, limit=limit)
+    tags = [tag("recipes", client_id), tag("coach", current_user.id)]
+    return await cached_response(response, key, version, tags, load)
+
+
+@router.get("/dashboard", response_model=CoachDashboardResponse)
+async def get_dashboard(
+    week_start: Optional[date] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
+):
+    """Coach overview of every client: last activity, meals this week and macro totals."""
+    if current_user.role != "coach":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only coaches can view the dashboard"
+        )
+    
+    # If no date provided, default to current week (Mon-Sun)
+    if not week_start:
+        today = date.today()
+        week_start = today - timedelta(days=today.weekday())
+    week_end = week_start + timedelta(days=6)
+    
+    client_ids = select(CoachClient.client_id).where(CoachClient.coach_id == current_user.id)
+    
+    # Query 1: clients with their latest meal, recipe and pantry activity
+    clients = await db.execute(
+        select(
+            User.id, User.username, User.email, User.full_name,
+            select(func.max(Meal.created_at)).where(Meal.user_id == User.id).scalar_subquery().label("last_meal"),
+            select(func.max(Recipe.created_at)).where(Recipe.user_id == User.id).scalar_subquery().label("last_recipe"),
+            select(func.max(GroceryItem.updated_at)).where(GroceryItem.user_id == User.id).scalar_subquery().label("last_grocery"),
+        )
+        .where(User.id.in_(client_ids))
+        .order_by(User.username)
+    )
+    
+    # Query 2: this week's meal counts and macro totals, grouped per client
+    dialect = db.get_bind().dialect.name
+    weekly = await db.execute(
+        select(
+            Meal.user_id,
+            func.count(Meal.id).label("meals"),
+            *[func.coalesce(func.sum(macro_expression(dialect, macro)), 0).label(macro) for macro in MACROS],
+        )
+        .outerjoin(Recipe, Meal.recipe_id == Recipe.id)
+        .where(Meal.user_id.in_(client_ids), Meal.date >= week_start, Meal.date <= week_end)
+        .group_by(Meal.user_id)
+    )
+    totals = {row.user_id: row for row in weekly}
+    
+    entries = []
+    for client in clients:
+        week = totals.get(client.id)
+        activity = [t for t in (client.last_meal, client.last_recipe, client.last_grocery) if t]
+        entries.append(ClientDashboardEntry(
+            id=client.id,
+            username=client.username,
+            email=client.email,
+            full_name=client.full_name,
+            last_activity=max(activity) if activity else None,
+            meals_this_week=week.meals if week else 0,
+            **{macro: float(getattr(week, macro)) if week else 0 for macro in MACROS},
+        ))
+    
+    return CoachDashboardResponse(week_start=week_start, week_end=week_end, clients=entries)
 
 
 @router.get("/my-coach/", response_model=CoachSummary)
 async def get_my_coach(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
 ):
     """Client views their linked coach."""
-    link = db.query(CoachClient).filter(CoachClient.client_id == current_user.id).first()
+    result = await db.execute(
+        select(CoachClient).options(joinedload(CoachClient.coach))
+        .where(CoachClient.client_id == current_user.id)
+    )
+    link = result.scalars().first()
     
     if not link:
         raise HTTPException(
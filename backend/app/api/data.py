@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Depends, Path, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date
+
+from app.models.database import get_db
+from app.schemas.schemas import ImportResult, TokenUser
+from app.api.auth import get_token_user
+from app.services.change_events import changes
+from app.services.transfer_service import ImportReport, export_response, import_rows
+
+router = APIRouter()
+
+# Entity name in change events, per dataset
+ENTITIES = {"recipes": "recipe", "meals": "meal", "groceries": "grocery_item"}
+KIND = Path(..., pattern="^(recipes|meals|groceries)$")
+FORMAT = Query("ndjson", pattern="^(ndjson|csv)$")
+
+
+@router.get("/export/{kind}")
+async def export_data(
+    kind: str = KIND,
+    format: str = FORMAT,
+    current_user: TokenUser = Depends(get_token_user)
+):
+    """Stream all of your recipes, meals or groceries as NDJSON or CSV."""
+    return export_response(kind, current_user.id, format, f"gymfuel-{kind}-{date.today()}")
+
+
+@router.post("/import/{kind}", response_model=ImportResult)
+async def import_data(
+    request: Request,
+    kind: str = KIND,
+    format: str = FORMAT,
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
+):
+    """Import NDJSON or CSV (as produced by the export) from the request body.
+
+    Records are validated like the create endpoints and committed in batches;
+    invalid ones are skipped and listed by line number. Groceries merge into
+    existing items with the same name and unit.
+    """
+    report = ImportReport()
+    try:
+        return await import_rows(db, kind, current_user.id, format, request.stream(), report)
+    finally:
+        # Batches commit as they go: announce whatever was committed, even if a later batch failed
+        changes.record_bulk(current_user, ENTITIES[kind], report.imported)
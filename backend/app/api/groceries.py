@@ -1,63 +1,121 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import date, datetime, timedelta
 
-from app.models.database import get_db, GroceryItem, User
-from app.schemas.schemas import GroceryItemCreate, GroceryItemUpdate, GroceryItemResponse
-from app.api.auth import get_current_user
+from app.models.database import get_db, GroceryItem
+from app.schemas.schemas import GroceryItemCreate, GroceryItemUpdate, GroceryItemResponse, ShoppingListResponse, TokenUser
+from app.api.auth import get_token_user
+from app.core.config import settings
+from app.core.fast_json import GROCERIES, json_response
+from app.core.http_cache import bump_versions, not_modified
+from app.core.pagination import keyset_paginate, set_next_link
+from app.core.response_cache import cache_key, cached_response, tag
+from app.services.change_events import changes
+from app.services.grocery_service import upsert_grocery_items
+from app.services.shopping_service import build_shopping_list
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[GroceryItemResponse])
 async def get_grocery_items(
+    request: Request,
+    response: Response,
     category: Optional[str] = None,
     expiring_soon: Optional[bool] = False,
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's Link header"),
+    skip: Optional[int] = Query(None, ge=0, description="Offset pagination (compatibility mode)"),
+    limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
 ):
-    query = db.query(GroceryItem).filter(GroceryItem.user_id == current_user.id)
+    await not_modified(request, response, db, current_user.id, "groceries")
+    query = select(*GROCERIES.columns).where(GroceryItem.user_id == current_user.id)
     
     if category:
-        query = query.filter(GroceryItem.category == category)
+        query = query.where(GroceryItem.category == category)
     
     if expiring_soon:
         seven_days = date.today() + timedelta(days=7)
-        query = query.filter(GroceryItem.expiration_date <= seven_days)
+        query = query.where(GroceryItem.expiration_date <= seven_days)
     
-    items = query.order_by(GroceryItem.expiration_date).offset(skip).limit(limit).all()
-    return items
+    if skip is not None and not cursor:
+        # Same order as the cursor path, id breaking ties so pages never overlap
+        query = query.order_by(GroceryItem.expiration_date.asc().nulls_last(), GroceryItem.id)
+        result = await db.execute(query.offset(skip).limit(limit))
+        return json_response(response, GROCERIES.records(result.mappings()))
+    
+    # Soonest expiry first; items without an expiration date come last
+    page = await keyset_paginate(
+        db, query, "groceries", [GroceryItem.expiration_date, GroceryItem.id], cursor, limit,
+        nulls_last=True, mappings=True,
+    )
+    set_next_link(request, response, page.next_cursor)
+    return json_response(response, GROCERIES.records(page.items))
 
 
 @router.get("/expiring-soon", response_model=List[GroceryItemResponse])
 async def get_expiring_items(
+    request: Request,
+    response: Response,
     days: int = 7,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
+):
+    version = await not_modified(request, response, db, current_user.id, "groceries")
+    today = date.today()
+    cutoff_date = today + timedelta(days=days)
+    
+    async def load():
+        result = await db.execute(select(*GROCERIES.columns).where(
+            GroceryItem.user_id == current_user.id,
+            GroceryItem.expiration_date <= cutoff_date,
+            GroceryItem.expiration_date >= today
+        ).order_by(GroceryItem.expiration_date, GroceryItem.id))
+        return GROCERIES.records(result.mappings())
+    
+    key = cache_key(current_user.id, "groceries/expiring-soon", today=today, days=days)
+    return await cached_response(response, key, version, [tag("groceries", current_user.id)], load)
+
+
+@router.get("/shopping-list", response_model=ShoppingListResponse)
+async def get_shopping_list(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    family: bool = Query(False, description="Include every family member's meals and pantry"),
+    servings_per_meal: float = Query(1.0, gt=0, le=20),
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
 ):
-    cutoff_date = date.today() + timedelta(days=days)
-    items = db.query(GroceryItem).filter(
-        GroceryItem.user_id == current_user.id,
-        GroceryItem.expiration_date <= cutoff_date,
-        GroceryItem.expiration_date >= date.today()
-    ).order_by(GroceryItem.expiration_date).all()
+    """Ingredients for the planned meals in a date range, minus pantry stock, by category."""
+    start_date = start_date or date.today()
+    end_date = end_date or start_date + timedelta(days=6)
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must be on or after start_date")
+    if (end_date - start_date).days > 92:
+        raise HTTPException(status_code=400, detail="Date range is limited to 93 days")
     
-    return items
+    return await build_shopping_list(
+        db, current_user.id, start_date, end_date,
+        family_id=current_user.family_id if family else None,
+        servings_per_meal=servings_per_meal,
+    )
 
 
 @router.get("/{item_id}", response_model=GroceryItemResponse)
 async def get_grocery_item(
     item_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
 ):
-    item = db.query(GroceryItem).filter(
+    result = await db.execute(select(GroceryItem).where(
         GroceryItem.id == item_id,
         GroceryItem.user_id == current_user.id
-    ).first()
+    ))
+    item = result.scalars().first()
     
     if not item:
         raise HTTPException(status_code=404, detail="Grocery item not found")
@@ -67,32 +125,29 @@ async def get_grocery_item(
 @router.post("/", response_model=GroceryItemResponse)
 async def create_grocery_item(
     item: GroceryItemCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
 ):
-    db_item = GroceryItem(**item.model_dump(), user_id=current_user.id)
-    db.add(db_item)
-    db.commit()
-    db.refresh(db_item)
+    # Adding something already in the pantry (same name and unit) tops it up
+    db_item, = await upsert_grocery_items(db, current_user.id, [item])
+    await bump_versions(db, current_user.id, "groceries")
+    await db.commit()
+    changes.record(current_user, "grocery_item", db_item.id, "upserted")
     return db_item
 
 
 @router.post("/bulk", response_model=List[GroceryItemResponse])
 async def create_bulk_grocery_items(
     items: List[GroceryItemCreate],
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
 ):
-    created_items = []
-    for item_data in items:
-        db_item = GroceryItem(**item_data.model_dump(), user_id=current_user.id)
-        db.add(db_item)
-        created_items.append(db_item)
-    
-    db.commit()
-    for item in created_items:
-        db.refresh(item)
-    
+    # One multi-row upsert; responses are built from the RETURNING rows
+    created_items = await upsert_grocery_items(db, current_user.id, items)
+    await bump_versions(db, current_user.id, "groceries")
+    await db.commit()
+    for db_item in created_items:
+        changes.record(current_user, "grocery_item", db_item.id, "upserted")
     return [GroceryItemResponse.model_validate(item) for item in created_items]
 
 
@@ -100,13 +155,14 @@ async def create_bulk_grocery_items(
 async def update_grocery_item(
     item_id: int,
     item: GroceryItemUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
 ):
-    db_item = db.query(GroceryItem).filter(
+    result = await db.execute(select(GroceryItem).where(
         GroceryItem.id == item_id,
         GroceryItem.user_id == current_user.id
-    ).first()
+    ))
+    db_item = result.scalars().first()
     
     if not db_item:
         raise HTTPException(status_code=404, detail="Grocery item not found")
@@ -114,26 +170,35 @@ async def update_grocery_item(
     update_data = item.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_item, field, value)
+    await bump_versions(db, current_user.id, "groceries")
     
-    db.commit()
-    db.refresh(db_item)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="A grocery item with this name and unit already exists")
+    changes.record(current_user, "grocery_item", item_id, "updated", update_data)
+    await db.refresh(db_item)
     return db_item
 
 
 @router.delete("/{item_id}")
 async def delete_grocery_item(
     item_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
 ):
-    db_item = db.query(GroceryItem).filter(
+    result = await db.execute(select(GroceryItem).where(
         GroceryItem.id == item_id,
         GroceryItem.user_id == current_user.id
-    ).first()
+    ))
+    db_item = result.scalars().first()
     
     if not db_item:
         raise HTTPException(status_code=404, detail="Grocery item not found")
     
-    db.delete(db_item)
-    db.commit()
+    await db.delete(db_item)
+    await bump_versions(db, current_user.id, "groceries")
+    await db.commit()
+    changes.record(current_user, "grocery_item", item_id, "deleted")
     return {"message": "Grocery item deleted successfully"}
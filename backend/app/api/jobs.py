@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.schemas.schemas import JobResponse, TokenUser
+from app.api.auth import get_token_user
+from app.services.jobs import job_queue
+
+router = APIRouter()
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: str,
+    current_user: TokenUser = Depends(get_token_user)
+):
+    """Poll a background job submitted by the current user."""
+    job = await job_queue.get(job_id, current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
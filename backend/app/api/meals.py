@@ -1,44 +1,65 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from typing import List, Optional
 from datetime import date, datetime, timedelta
 
-from app.models.database import get_db, Meal, Recipe, User
-from app.schemas.schemas import MealCreate, MealUpdate, MealResponse
-from app.api.auth import get_current_user
+from app.models.database import get_db, Meal, Recipe
+from app.schemas.schemas import MealCreate, MealUpdate, MealResponse, NutritionSummaryResponse, TokenUser
+from app.api.auth import get_token_user
+from app.core.config import settings
+from app.core.fast_json import json_response, meal_records, select_meals
+from app.core.http_cache import bump_versions, not_modified
+from app.core.pagination import keyset_paginate, set_next_link
+from app.core.response_cache import cache_key, cached_response, tag
+from app.services.change_events import changes
+from app.services.nutrition_service import nutrition_summary, parse_range, refresh_daily_totals
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[MealResponse])
 async def get_meals(
+    request: Request,
+    response: Response,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     meal_type: Optional[str] = None,
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's Link header"),
+    skip: Optional[int] = Query(None, ge=0, description="Offset pagination (compatibility mode)"),
+    limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
 ):
-    query = db.query(Meal).options(joinedload(Meal.recipe)).filter(Meal.user_id == current_user.id)
+    await not_modified(request, response, db, current_user.id, "meals")
+    query = select_meals().where(Meal.user_id == current_user.id)
     
     if start_date:
-        query = query.filter(Meal.date >= start_date)
+        query = query.where(Meal.date >= start_date)
     if end_date:
-        query = query.filter(Meal.date <= end_date)
+        query = query.where(Meal.date <= end_date)
     if meal_type:
-        query = query.filter(Meal.meal_type == meal_type)
+        query = query.where(Meal.meal_type == meal_type)
     
-    meals = query.order_by(Meal.date, Meal.meal_type).offset(skip).limit(limit).all()
-    return meals
+    if skip is not None and not cursor:
+        result = await db.execute(query.order_by(Meal.date, Meal.meal_type, Meal.id).offset(skip).limit(limit))
+        return json_response(response, await meal_records(db, result.mappings()))
+    
+    page = await keyset_paginate(db, query, "meals", [Meal.date, Meal.id], cursor, limit, mappings=True)
+    set_next_link(request, response, page.next_cursor)
+    return json_response(response, await meal_records(db, page.items))
 
 
 @router.get("/week", response_model=List[MealResponse])
 async def get_weekly_meals(
+    request: Request,
+    response: Response,
     week_start: Optional[date] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
 ):
+    version = await not_modified(request, response, db, current_user.id, "meals")
     # If no date provided, default to current week (Mon-Sun)
     if not week_start:
         today = date.today()
@@ -46,19 +67,38 @@ async def get_weekly_meals(
     
     week_end = week_start + timedelta(days=6)
     
-    # Fetch all meals for the week, including recipe details for UI display
-    meals = db.query(Meal).options(joinedload(Meal.recipe)).filter(
-        Meal.user_id == current_user.id,
-        Meal.date >= week_start,
-        Meal.date <= week_end
-    ).order_by(Meal.date, Meal.meal_type).all()
+    async def load():
+        # Fetch all meals for the week, including recipe details for UI display
+        result = await db.execute(select_meals().where(
+            Meal.user_id == current_user.id,
+            Meal.date >= week_start,
+            Meal.date <= week_end
+        ).order_by(Meal.date, Meal.meal_type, Meal.id))
+        return await meal_records(db, result.mappings())
     
-    return meals
+    key = cache_key(current_user.id, "meals/week", week_start=week_start)
+    return await cached_response(response, key, version, [tag("meals", current_user.id)], load)
+
+
+@router.get("/nutrition", response_model=NutritionSummaryResponse)
+async def get_nutrition(
+    date_range: str = Query("7d", alias="range", description="7d, 4w (ending today) or YYYY-MM-DD..YYYY-MM-DD"),
+    group: str = Query("day", pattern="^(day|week)$"),
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
+):
+    """Macro totals per day or week, served from the nutrition_daily rollup."""
+    try:
+        start, end = parse_range(date_range)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await nutrition_summary(db, current_user.id, start, end, group)
 
 
 @router.get("/{meal_id}", response_model=MealResponse)
-async def get_meal(meal_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    meal = db.query(Meal).options(joinedload(Meal.recipe)).filter(Meal.id == meal_id, Meal.user_id == current_user.id).first()
+async def get_meal(meal_id: int, db: AsyncSession = Depends(get_db), current_user: TokenUser = Depends(get_token_user)):
+    result = await db.execute(select(Meal).options(joinedload(Meal.recipe)).where(Meal.id == meal_id, Meal.user_id == current_user.id))
+    meal = result.scalars().first()
     if not meal:
         raise HTTPException(status_code=404, detail="Meal not found")
     return meal
@@ -67,62 +107,75 @@ async def get_meal(meal_id: int, db: Session = Depends(get_db), current_user: Us
 @router.post("/", response_model=MealResponse)
 async def create_meal(
     meal: MealCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
 ):
     if meal.recipe_id:
-        recipe = db.query(Recipe).filter(Recipe.id == meal.recipe_id).first()
+        recipe = await db.get(Recipe, meal.recipe_id)
         if not recipe:
             raise HTTPException(status_code=404, detail="Recipe not found")
     
     db_meal = Meal(**meal.model_dump(), user_id=current_user.id)
     db.add(db_meal)
-    db.commit()
-    db.refresh(db_meal)
+    await refresh_daily_totals(db, [(current_user.id, db_meal.date)])
+    await bump_versions(db, current_user.id, "meals")
+    await db.commit()
+    changes.record(current_user, "meal", db_meal.id, "created")
     # Reload relation
-    db_meal = db.query(Meal).options(joinedload(Meal.recipe)).filter(Meal.id == db_meal.id).first()
-    return db_meal
+    result = await db.execute(select(Meal).options(joinedload(Meal.recipe)).where(Meal.id == db_meal.id))
+    return result.scalars().first()
 
 
 @router.put("/{meal_id}", response_model=MealResponse)
 async def update_meal(
     meal_id: int,
     meal: MealUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
 ):
-    db_meal = db.query(Meal).filter(Meal.id == meal_id, Meal.user_id == current_user.id).first()
+    result = await db.execute(select(Meal).where(Meal.id == meal_id, Meal.user_id == current_user.id))
+    db_meal = result.scalars().first()
     if not db_meal:
         raise HTTPException(status_code=404, detail="Meal not found")
     
     if meal.recipe_id is not None:
-        recipe = db.query(Recipe).filter(Recipe.id == meal.recipe_id).first()
+        recipe = await db.get(Recipe, meal.recipe_id)
         if not recipe:
             raise HTTPException(status_code=404, detail="Recipe not found")
     
+    previous_date = db_meal.date
     update_data = meal.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_meal, field, value)
     
-    db.commit()
-    db.refresh(db_meal)
-    # Reload relation
-    db_meal = db.query(Meal).options(joinedload(Meal.recipe)).filter(Meal.id == db_meal.id).first()
-    return db_meal
+    await refresh_daily_totals(db, [(current_user.id, previous_date), (current_user.id, db_meal.date)])
+    await bump_versions(db, current_user.id, "meals")
+    await db.commit()
+    changes.record(current_user, "meal", meal_id, "updated", update_data)
+    # Reload relation (populate_existing so the recipe reflects the new recipe_id)
+    result = await db.execute(
+        select(Meal).options(joinedload(Meal.recipe)).where(Meal.id == db_meal.id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
 
 
 @router.delete("/{meal_id}")
 async def delete_meal(
     meal_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
 ):
-    db_meal = db.query(Meal).filter(Meal.id == meal_id, Meal.user_id == current_user.id).first()
+    result = await db.execute(select(Meal).where(Meal.id == meal_id, Meal.user_id == current_user.id))
+    db_meal = result.scalars().first()
     if not db_meal:
         raise HTTPException(status_code=404, detail="Meal not found")
     
-    db.delete(db_meal)
-    db.commit()
+    await db.delete(db_meal)
+    await refresh_daily_totals(db, [(current_user.id, db_meal.date)])
+    await bump_versions(db, current_user.id, "meals")
+    await db.commit()
+    changes.record(current_user, "meal", meal_id, "deleted")
     return {"message": "Meal deleted successfully"}
 
 
@@ -130,8 +183,8 @@ async def delete_meal(
 async def generate_weekly_plan(
     start_date: Optional[date] = None,
     preferences: Optional[str] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
 ):
     if not start_date:
         start_date = date.today()
@@ -139,24 +192,23 @@ async def generate_weekly_plan(
     # Auto-generate empty placeholders for 3 meals/day for the next week
     # This allows users to easily tap and fill slots
     meal_types = ["breakfast", "lunch", "dinner"]
-    generated_meals = []
-    
-    for day_offset in range(7):
-        current_date = start_date + timedelta(days=day_offset)
-        
-        for meal_type in meal_types:
-            db_meal = Meal(
-                date=current_date,
-                meal_type=meal_type,
-                user_id=current_user.id,
-                planned=True,
-                notes=f"Auto-generated for {preferences}" if preferences else None
-            )
-            db.add(db_meal)
-            generated_meals.append(db_meal)
+    notes = f"Auto-generated for {preferences}" if preferences else None
+    rows = [
+        {"date": start_date + timedelta(days=day_offset), "meal_type": meal_type,
+         "user_id": current_user.id, "planned": True, "notes": notes}
+        for day_offset in range(7)
+        for meal_type in meal_types
+    ]
     
-    db.commit()
-    for meal in generated_meals:
-        db.refresh(meal)
+    # One multi-row INSERT ... RETURNING; placeholders have no recipe, so the
+    # response is built from the returned rows without reloading anything
+    result = await db.execute(insert(Meal).returning(*Meal.__table__.c), rows)
+    generated_meals = sorted(
+        (MealResponse(**row, recipe=None) for row in result.mappings()), key=lambda m: (m.date, m.id)
+    )
+    await bump_versions(db, current_user.id, "meals")
+    await db.commit()
+    for generated in generated_meals:
+        changes.record(current_user, "meal", generated.id, "created")
     
-    return {"message": "Weekly meal plan generated", "meals": [MealResponse.model_validate(m) for m in generated_meals]}
+    return {"message": "Weekly meal plan generated", "meals": generated_meals}
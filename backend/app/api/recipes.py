@@ -1,64 +1,146 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-import google.generativeai as genai
-import json
 import logging
 
-from app.models.database import get_db, Recipe, User, Meal
-from app.schemas.schemas import RecipeCreate, RecipeUpdate, RecipeResponse
-from app.api.auth import get_current_user
+from app.models.database import get_db, Recipe, Meal
+from app.schemas.schemas import RecipeCreate, RecipeUpdate, RecipeResponse, RecipeSearchResult, RecipeMatch, TokenUser, JobResponse
+from app.api.auth import get_token_user
 from app.core.config import settings
+from app.core.fast_json import RECIPES, json_response
+from app.core.http_cache import bump_recipe_dependents, bump_versions, not_modified
+from app.core.pagination import keyset_paginate, set_next_link
+from app.services.change_events import changes
+from app.services.jobs import job_queue
+from app.services.nutrition_service import MACROS, recipe_days, refresh_daily_totals
+from app.services.pantry_service import load_matched_recipes, match_recipes, pantry_suggestions
+from app.services.recipe_filters import ingredient_filter, macro_range_filter, split_terms, tag_filter
+from app.services.search_service import search_predicate, search_recipes
+from app.services.llm_service import LLMError, LLMTimeout, LLMUnavailable, llm_service
 
 router = APIRouter()
-gemini_model = None
 logger = logging.getLogger(__name__)
 
-# Set up Gemini AI if the API key is configured
-# This will be used for AI recipe generation later
-if settings.GEMINI_API_KEY:
-    genai.configure(api_key=settings.GEMINI_API_KEY)
-    gemini_model = genai.GenerativeModel("gemini-1.5-flash")
-
 
 @router.get("/", response_model=List[RecipeResponse])
 async def get_recipes(
-    skip: int = 0,
-    limit: int = 100,
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's Link header"),
+    skip: Optional[int] = Query(None, ge=0, description="Offset pagination (compatibility mode)"),
+    limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
     search: Optional[str] = None,
     tags: Optional[str] = Query(None, description="Comma-separated tags"),
+    tag_match: str = Query("all", pattern="^(all|any)$", description="Require all tags, or any of them"),
+    ingredients: Optional[str] = Query(None, description="Comma-separated ingredient names, all required"),
+    min_calories: Optional[float] = Query(None, ge=0),
+    max_calories: Optional[float] = Query(None, ge=0),
+    min_protein: Optional[float] = Query(None, ge=0),
+    max_protein: Optional[float] = Query(None, ge=0),
+    min_carbs: Optional[float] = Query(None, ge=0),
+    max_carbs: Optional[float] = Query(None, ge=0),
+    min_fat: Optional[float] = Query(None, ge=0),
+    max_fat: Optional[float] = Query(None, ge=0),
     difficulty: Optional[str] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
 ):
+    await not_modified(request, response, db, current_user.id, "recipes")
     # Get user's recipes with optional search and filtering
-    query = db.query(Recipe).filter(Recipe.user_id == current_user.id)
+    query = select(*RECIPES.columns).where(Recipe.user_id == current_user.id)
+    dialect = db.get_bind().dialect.name
     
     if search:
-        query = query.filter(Recipe.title.ilike(f"%{search}%"))
+        if dialect == "postgresql":
+            # Full-text/trigram match, served by GIN indexes (migration 0004)
+            query = query.where(search_predicate(search))
+        else:
+            query = query.where(Recipe.title.ilike(f"%{search}%"))
+    
+    tag_list = split_terms(tags)
+    if tag_list:
+        query = query.where(tag_filter(dialect, tag_list, tag_match))
+    
+    ingredient_list = split_terms(ingredients, lower=True)
+    if ingredient_list:
+        query = query.where(ingredient_filter(dialect, ingredient_list))
     
-    if tags:
-        tag_list = tags.split(",")
-        for tag in tag_list:
-            query = query.filter(Recipe.tags.contains([tag.strip()]))
+    macro_ranges = {
+        "calories": (min_calories, max_calories),
+        "protein": (min_protein, max_protein),
+        "carbs": (min_carbs, max_carbs),
+        "fat": (min_fat, max_fat),
+    }
+    for macro in MACROS:
+        minimum, maximum = macro_ranges[macro]
+        if minimum is not None or maximum is not None:
+            query = query.where(macro_range_filter(dialect, macro, minimum, maximum))
     
     if difficulty:
-        query = query.filter(Recipe.difficulty == difficulty)
+        query = query.where(Recipe.difficulty == difficulty)
     
-    recipes = query.offset(skip).limit(limit).all()
-    return recipes
+    if skip is not None and not cursor:
+        # Same order as the cursor path, id breaking ties so pages never overlap
+        query = query.order_by(Recipe.created_at.desc(), Recipe.id.desc())
+        result = await db.execute(query.offset(skip).limit(limit))
+        return json_response(response, RECIPES.records(result.mappings()))
+    
+    # Newest first, paged by (created_at, id)
+    page = await keyset_paginate(
+        db, query, "recipes", [Recipe.created_at, Recipe.id], cursor, limit, descending=True, mappings=True
+    )
+    set_next_link(request, response, page.next_cursor)
+    return json_response(response, RECIPES.records(page.items))
+
+
+@router.get("/search", response_model=List[RecipeSearchResult])
+async def search_recipes_ranked(
+    q: str = Query(..., min_length=1, description="Words to find in title, description, ingredients or tags"),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
+):
+    """Ranked, typo-tolerant recipe search with highlighted snippets."""
+    results = await search_recipes(db, current_user.id, q, limit)
+    return [
+        RecipeSearchResult(
+            **RecipeResponse.model_validate(recipe).model_dump(), rank=round(rank, 4), snippet=snippet
+        )
+        for recipe, rank, snippet in results
+    ]
+
+
+@router.get("/match", response_model=List[RecipeMatch])
+async def match_pantry_recipes(
+    pantry: Optional[str] = Query(None, description="Comma-separated items; defaults to your grocery list"),
+    min_coverage: float = Query(0.0, ge=0, le=1, description="Minimum fraction of ingredients on hand"),
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
+):
+    """Saved recipes you can make from your pantry, favouring ones that use up expiring groceries."""
+    matches = await match_recipes(db, current_user.id, split_terms(pantry), limit, min_coverage)
+    return [
+        RecipeMatch(
+            **RecipeResponse.model_validate(recipe).model_dump(),
+            score=m.score, coverage=m.coverage, matched=m.matched, missing=m.missing, expiring=m.expiring,
+        )
+        for recipe, m in await load_matched_recipes(db, matches)
+    ]
 
 
 @router.get("/{recipe_id}", response_model=RecipeResponse)
 async def get_recipe(
     recipe_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
 ):
-    recipe = db.query(Recipe).filter(
+    result = await db.execute(select(Recipe).where(
         Recipe.id == recipe_id,
         Recipe.user_id == current_user.id
-    ).first()
+    ))
+    recipe = result.scalars().first()
     if not recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
     return recipe
@@ -67,22 +149,24 @@ async def get_recipe(
 @router.post("/", response_model=RecipeResponse)
 async def create_recipe(
     recipe: RecipeCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
 ):
     recipe_data = recipe.model_dump()
     
-    # If no image was provided, fetch one automatically from Unsplash
-    if not recipe_data.get("image_url"):
-        from app.services.image_service import get_meal_image
-        image_url = await get_meal_image(recipe_data["title"])
-        if image_url:
-            recipe_data["image_url"] = image_url
-    
     db_recipe = Recipe(**recipe_data, user_id=current_user.id)
     db.add(db_recipe)
-    db.commit()
-    db.refresh(db_recipe)
+    await bump_versions(db, current_user.id, "recipes")
+    await db.commit()
+    await db.refresh(db_recipe)
+    changes.record(current_user, "recipe", db_recipe.id, "created")
+    
+    # If no image was provided, fetch one from Unsplash in the background
+    # and patch it onto the recipe once found
+    if not db_recipe.image_url and settings.UNSPLASH_ACCESS_KEY:
+        await job_queue.submit(
+            "recipes.enrich_image", {"recipe_id": db_recipe.id, "title": db_recipe.title}, current_user.id
+        )
     return db_recipe
 
 
@@ -90,13 +174,14 @@ async def create_recipe(
 async def update_recipe(
     recipe_id: int,
     recipe: RecipeUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
 ):
-    db_recipe = db.query(Recipe).filter(
+    result = await db.execute(select(Recipe).where(
         Recipe.id == recipe_id,
         Recipe.user_id == current_user.id
-    ).first()
+    ))
+    db_recipe = result.scalars().first()
     if not db_recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
     
@@ -104,30 +189,43 @@ async def update_recipe(
     for field, value in update_data.items():
         setattr(db_recipe, field, value)
     
-    db.commit()
-    db.refresh(db_recipe)
+    if "nutritional_info" in update_data:
+        # Every day a meal used this recipe now has different totals
+        await refresh_daily_totals(db, recipe_days(recipe_id))
+    await bump_versions(db, current_user.id, "recipes")
+    await bump_recipe_dependents(db, recipe_id)
+    await db.commit()
+    changes.record(current_user, "recipe", recipe_id, "updated", update_data)
+    await db.refresh(db_recipe)
     return db_recipe
 
 
 @router.delete("/{recipe_id}")
 async def delete_recipe(
     recipe_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
 ):
-    db_recipe = db.query(Recipe).filter(
+    result = await db.execute(select(Recipe).where(
         Recipe.id == recipe_id,
         Recipe.user_id == current_user.id
-    ).first()
+    ))
+    db_recipe = result.scalars().first()
     if not db_recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
     
-    # Clear recipe_id from meals that reference this recipe
-    db.query(Meal).filter(Meal.recipe_id == recipe_id).update({"recipe_id": None})
-    db.commit()
+    # Clear recipe_id from meals that reference this recipe, then drop their
+    # macros from the nutrition rollup
+    affected_days = (await db.execute(recipe_days(recipe_id))).all()
+    await bump_recipe_dependents(db, recipe_id)
+    await db.execute(update(Meal).where(Meal.recipe_id == recipe_id).values(recipe_id=None))
+    await refresh_daily_totals(db, affected_days)
+    await db.commit()
     
-    db.delete(db_recipe)
-    db.commit()
+    await db.delete(db_recipe)
+    await bump_versions(db, current_user.id, "recipes")
+    await db.commit()
+    changes.record(current_user, "recipe", recipe_id, "deleted")
     return {"message": "Recipe deleted successfully"}
 
 
@@ -135,88 +233,72 @@ async def delete_recipe(
 async def generate_recipe_ai(
     prompt: str = Query(..., description="Describe the recipe you want"),
     dietary_restrictions: Optional[str] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
 ):
-    if not gemini_model:
-        raise HTTPException(status_code=503, detail="Gemini API not configured")
-    
-    restrictions_text = ""
-    if dietary_restrictions:
-        restrictions_text = f"Dietary restrictions: {dietary_restrictions}. "
-    
-    system_prompt = """You are a fitness nutrition expert and chef specializing in high-protein meals for gym-goers.
-    Generate recipes that prioritise protein (aim for 30-50g per serving) and support muscle growth/recovery.
-    Return the recipe ONLY as a valid JSON object with this exact structure (no markdown, no text before/after):
-    {
-        "title": "Recipe Name",
-        "description": "Brief description highlighting protein content and fitness benefits",
-        "instructions": "Step by step instructions",
-        "prep_time": 30,
-        "cook_time": 45,
-        "servings": 4,
-        "difficulty": "easy",
-        "ingredients": [{"name": "ingredient", "quantity": 1, "unit": "cup"}],
-        "tags": ["high-protein", "gym-fuel", "muscle-building"],
-        "nutritional_info": {"calories": 500, "protein": 40, "carbs": 30, "fat": 15}
-    }"""
-    
-    user_prompt = f"Generate a HIGH PROTEIN recipe for: {prompt}. {restrictions_text}Focus on lean proteins and whole foods ideal for gym-goers."
-    
     try:
-        response = gemini_model.generate_content(f"{system_prompt}\n\nUser request: {user_prompt}")
-        response_text = response.text.strip()
-        
-        # Clean potential markdown code blocks
-        if response_text.startswith("```"):
-            response_text = response_text.split("```")[1]
-            if response_text.startswith("json"):
-                response_text = response_text[4:]
-        response_text = response_text.strip()
-        
-        recipe_data = json.loads(response_text)
+        recipe_data = await llm_service.generate_recipe(prompt, dietary_restrictions)
         return RecipeCreate(**recipe_data)
-    except json.JSONDecodeError as e:
-        logger.error(f"Failed to parse recipe JSON: {e}")
-        raise HTTPException(status_code=500, detail="Failed to generate recipe. Please try again.")
-    except Exception as e:
+    except LLMUnavailable:
+        raise HTTPException(status_code=503, detail="Gemini API not configured")
+    except LLMTimeout:
+        raise HTTPException(status_code=504, detail="Recipe generation timed out. Please try again.")
+    except LLMError as e:
         logger.error(f"Recipe generation failed: {e}")
         raise HTTPException(status_code=500, detail="Failed to generate recipe. Please try again.")
+    except ValueError as e:
+        logger.error(f"Generated recipe failed validation: {e}")
+        raise HTTPException(status_code=500, detail="Failed to generate recipe. Please try again.")
+
+
+@router.post("/ai/generate/jobs", response_model=JobResponse, status_code=202)
+async def submit_generate_recipe_job(
+    prompt: str = Query(..., description="Describe the recipe you want"),
+    dietary_restrictions: Optional[str] = None,
+    current_user: TokenUser = Depends(get_token_user)
+):
+    """Queue AI recipe generation; poll /api/jobs/{job_id} for the RecipeCreate result."""
+    return await job_queue.submit(
+        "recipes.generate",
+        {"prompt": prompt, "dietary_restrictions": dietary_restrictions},
+        current_user.id,
+    )
 
 
 @router.post("/ai/suggest")
 async def suggest_recipes_ai(
     pantry_items: Optional[List[str]] = None,
     preferences: Optional[str] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
 ):
-    if not gemini_model:
-        raise HTTPException(status_code=503, detail="Gemini API not configured")
-    
-    pantry_text = f"Pantry items: {', '.join(pantry_items) if pantry_items else 'No specific items'}."
-    pref_text = f"Preferences: {preferences}" if preferences else ""
-    
-    system_prompt = """You are a fitness nutrition expert who suggests HIGH-PROTEIN recipes for gym-goers.
-    Return suggestions ONLY as a valid JSON object (no markdown) with this structure:
-    {"suggestions": [{"title": "Recipe Name", "description": "Brief description with estimated protein content", "protein_estimate": "40g"}]}
-    Provide exactly 3 suggestions. Each must be high in protein (30g+ per serving)."""
-    
-    user_prompt = f"{pantry_text} {pref_text} Suggest 3 high-protein recipes I can make for muscle building."
+    # First tier: saved recipes the pantry already covers - no LLM call needed
+    local = {"source": "pantry", "suggestions": await pantry_suggestions(db, current_user.id, pantry_items)}
+    if any(s["coverage"] >= settings.MATCH_MIN_COVERAGE for s in local["suggestions"]):
+        return local
     
     try:
-        response = gemini_model.generate_content(f"{system_prompt}\n\nUser request: {user_prompt}")
-        response_text = response.text.strip()
-        
-        # Clean potential markdown code blocks
-        if response_text.startswith("```"):
-            response_text = response_text.split("```")[1]
-            if response_text.startswith("json"):
-                response_text = response_text[4:]
-        response_text = response_text.strip()
-        
-        suggestions = json.loads(response_text)
-        return suggestions
-    except Exception as e:
+        return {**await llm_service.suggest_recipes(pantry_items, preferences), "source": "llm"}
+    except LLMUnavailable:
+        if local["suggestions"]:
+            return local
+        raise HTTPException(status_code=503, detail="Gemini API not configured")
+    except LLMTimeout:
+        raise HTTPException(status_code=504, detail="Suggestions timed out. Please try again.")
+    except LLMError as e:
         logger.error(f"Failed to generate suggestions: {e}")
         raise HTTPException(status_code=500, detail="Failed to generate suggestions. Please try again.")
+
+
+@router.post("/ai/suggest/jobs", response_model=JobResponse, status_code=202)
+async def submit_suggest_recipes_job(
+    pantry_items: Optional[List[str]] = None,
+    preferences: Optional[str] = None,
+    current_user: TokenUser = Depends(get_token_user)
+):
+    """Queue AI recipe suggestions; poll /api/jobs/{job_id} for the result."""
+    return await job_queue.submit(
+        "recipes.suggest",
+        {"pantry_items": pantry_items, "preferences": preferences, "user_id": current_user.id},
+        current_user.id,
+    )
@@ -1,73 +1,52 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, Query
-from typing import List, Dict, Optional
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, Depends, Query
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from typing import Optional
 import json
 import logging
-from jose import jwt, JWTError
 
-from app.core.config import settings
-from app.models.database import SessionLocal, User
+from app.api.auth import get_current_user
+from app.models.database import AsyncSessionLocal
+from app.schemas.schemas import UserResponse
+from app.services.family_events import publish_event, resume
+from app.services.ws_manager import TRY_AGAIN_LATER, manager
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
-def validate_ws_token(token: str) -> Optional[User]:
-    """Validate JWT token and return user if valid."""
+async def validate_ws_token(token: str) -> Optional[UserResponse]:
+    """
+    Verify the JWT locally and resolve the user (with their family) from the user
+    cache; only a cache miss costs a query, on the async pool. None if invalid.
+    """
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            return None
-        db = SessionLocal()
-        try:
-            user = db.query(User).filter(User.email == email.lower()).first()
-            return user
-        finally:
-            db.close()
-    except JWTError:
+        # The session only checks out a connection if the cache misses
+        async with AsyncSessionLocal() as db:
+            return await get_current_user(token, db)
+    except HTTPException:
         return None
 
 
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[str, List[WebSocket]] = {}
-
-    async def connect(self, websocket: WebSocket, family_id: str):
-        await websocket.accept()
-        if family_id not in self.active_connections:
-            self.active_connections[family_id] = []
-        self.active_connections[family_id].append(websocket)
-
-    def disconnect(self, websocket: WebSocket, family_id: str):
-        if family_id in self.active_connections:
-            self.active_connections[family_id].remove(websocket)
-            if not self.active_connections[family_id]:
-                del self.active_connections[family_id]
-
-    async def broadcast(self, message: dict, family_id: str):
-        if family_id in self.active_connections:
-            disconnected = []
-            for connection in self.active_connections[family_id]:
-                try:
-                    await connection.send_json(message)
-                except:
-                    disconnected.append(connection)
-            
-            for connection in disconnected:
-                self.active_connections[family_id].remove(connection)
-
-
-manager = ConnectionManager()
-
-
 @router.websocket("/family/{family_id}")
 async def websocket_family_sync(
     websocket: WebSocket,
     family_id: str,
-    token: str = Query(...)
+    token: str = Query(...),
+    last_seq: Optional[int] = Query(None, ge=0, description="Last event seq the client applied, to resume from")
 ):
+    # Shed reconnect storms before they reach auth or the database
+    if not manager.accept_limiter.allow():
+        await websocket.accept()
+        await websocket.close(code=TRY_AGAIN_LATER, reason="Too many connections, retry with backoff")
+        return
+
     # Validate JWT token
-    user = validate_ws_token(token)
+    try:
+        user = await validate_ws_token(token)
+    except PoolTimeoutError:
+        await websocket.accept()
+        await websocket.close(code=TRY_AGAIN_LATER, reason="Database busy, retry with backoff")
+        return
     if not user:
         await websocket.close(code=4001)  # Unauthorized
         return
@@ -79,35 +58,40 @@ async def websocket_family_sync(
     
     user_id = str(user.id)
     
+    # Live events are held until the client has been brought up to date
+    connection = await manager.connect(websocket, family_id, hold=True)
+    try:
+        async with AsyncSessionLocal() as db:
+            seq, missed = await resume(db, user.family_id, last_seq)
+    except Exception as e:
+        await manager.disconnect(connection, code=1011)
+        logger.error(f"WebSocket resume failed: {e}")
+        return
+    connected = {
+        "type": "connected",
+        "message": f"User {user_id} connected to family {family_id}",
+        "user_id": user_id,
+        "seq": seq,
+    }
+    connection.release([json.dumps(m, default=str) for m in [connected, *missed]], seq)
+
     try:
-        await manager.connect(websocket, family_id)
-        await websocket.send_json({
-            "type": "connected",
-            "message": f"User {user_id} connected to family {family_id}",
-            "user_id": user_id
-        })
-        
         while True:
             data = await websocket.receive_json()
-            
-            message = {
-                "type": data.get("type", "update"),
-                "data": data.get("data", {}),
-                "user_id": user_id,
-                "timestamp": data.get("timestamp")
-            }
-            
-            await manager.broadcast(message, family_id)
-            
+            if data.get("type") == "pong":
+                continue  # heartbeat reply
+
+            await publish_event(user.family_id, data.get("type", "update"), data.get("data", {}), user.id)
+
     except WebSocketDisconnect:
-        manager.disconnect(websocket, family_id)
+        await manager.disconnect(connection)
         await manager.broadcast({
             "type": "user_disconnected",
             "user_id": user_id,
             "message": f"User {user_id} disconnected"
         }, family_id)
     except Exception as e:
-        manager.disconnect(websocket, family_id)
+        await manager.disconnect(connection)
         logger.error(f"WebSocket error: {e}")
 
 
@@ -118,6 +102,7 @@ async def websocket_test():
         "endpoint": "/ws/family/{family_id}",
         "params": {
             "token": "JWT authentication token",
+            "last_seq": "Optional: last event seq received, to replay missed events on reconnect",
             "user_id": "Current user ID"
         }
     }
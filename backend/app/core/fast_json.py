@@ -0,0 +1,90 @@
+"""
+Fast JSON path for large list responses.
+
+Returning ORM objects through `response_model=List[...]` costs three passes per
+row: loading mapped objects (identity map, relationship loading), validating
+each into the response schema via from_attributes - nested recipes included -
+and jsonable_encoder + stdlib json. For rows read straight from our own tables
+all of that is redundant: they already have the schema's shape.
+
+Here a list query selects only the columns its response schema needs
+(`Projection.columns`), each row becomes a plain dict, and orjson encodes the
+list - dates, datetimes and JSON columns natively, to the same JSON the
+response model produces. Endpoints keep `response_model` for the OpenAPI docs
+and return `json_response(...)`, which FastAPI passes through untouched.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Type
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.engine import RowMapping
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.database import GroceryItem, Meal, Recipe
+from app.schemas.schemas import GroceryItemResponse, MealResponse, RecipeResponse
+
+
+class Projection:
+    """The columns of `model` that `schema` serializes, and rows -> JSON-ready dicts."""
+
+    def __init__(self, model: Any, schema: Type[BaseModel], exclude: Iterable[str] = (), prefix: str = ""):
+        table = model.__table__
+        self.names = [name for name in schema.model_fields if name not in set(exclude)]
+        self.keys = [prefix + name for name in self.names]
+        self.columns = [table.c[name].label(key) for name, key in zip(self.names, self.keys)]
+        # NULL in a column whose schema field has a default (e.g. tags=[]) serializes as that default
+        self.defaults = [
+            (name, schema.model_fields[name].default) for name in self.names
+            if schema.model_fields[name].default is not None and not schema.model_fields[name].is_required()
+        ]
+
+    def record(self, row: RowMapping) -> Dict[str, Any]:
+        record = {name: row[key] for name, key in zip(self.names, self.keys)}
+        for name, default in self.defaults:
+            if record[name] is None:
+                record[name] = default
+        return record
+
+    def records(self, rows: Iterable[RowMapping]) -> List[Dict[str, Any]]:
+        return [self.record(row) for row in rows]
+
+
+RECIPES = Projection(Recipe, RecipeResponse)
+GROCERIES = Projection(GroceryItem, GroceryItemResponse)
+MEALS = Projection(Meal, MealResponse, exclude={"recipe"})
+
+# Recipe ids per IN (...) when attaching recipes to meals
+RECIPE_BATCH = 500
+
+
+def select_meals():
+    """select() of the meal columns MealResponse needs; `meal_records()` adds the recipes."""
+    return select(*MEALS.columns)
+
+
+async def meal_records(db: AsyncSession, rows: Iterable[RowMapping]) -> List[Dict[str, Any]]:
+    """Meal rows as dicts with their recipe embedded, each distinct recipe fetched and built once."""
+    records = MEALS.records(rows)
+    recipe_ids = list({record["recipe_id"] for record in records if record["recipe_id"] is not None})
+    recipes = {}
+    for i in range(0, len(recipe_ids), RECIPE_BATCH):
+        result = await db.execute(select(*RECIPES.columns).where(Recipe.id.in_(recipe_ids[i:i + RECIPE_BATCH])))
+        recipes.update((row["id"], RECIPES.record(row)) for row in result.mappings())
+    for record in records:
+        record["recipe"] = recipes.get(record["recipe_id"])
+    return records
+
+
+def json_response(response: Optional[Response], body: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    """JSON response (encoded here unless already bytes) with the injected `response`'s headers plus `headers`."""
+    if not isinstance(body, bytes):
+        body = orjson.dumps(body)
+    result = Response(body, media_type="application/json", headers=headers)
+    if response is not None:
+        # Raw pairs, not a dict: repeated headers (Set-Cookie, Link) all survive.
+        # Names already set here (content headers, `headers`) take precedence.
+        own = {name for name, _ in result.raw_headers}
+        result.raw_headers.extend((name, value) for name, value in response.headers.raw if name not in own)
+    return result
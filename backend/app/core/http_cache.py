@@ -0,0 +1,115 @@
+"""
+Conditional GETs for list endpoints, from per-user collection versions.
+
+Every mutation bumps its (user, collection) counter inside its own transaction,
+so a list's validator changes exactly when its rows may have. `not_modified()`
+runs first in a list endpoint: one primary-key lookup, then either a bodiless
+304 - the list query and serialization never run - or ETag, Last-Modified and
+Cache-Control headers on the full response.
+
+ETags are weak and also cover the query string and today's date, since lists
+like /week and /expiring-soon default to dates relative to today; for the same
+reason Last-Modified is never earlier than midnight.
+"""
+import hashlib
+from datetime import date, datetime, time, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.metrics import register_collector
+from app.core.response_cache import response_cache, tag
+from app.models.database import CollectionVersion, Meal
+
+# Polled lists: always revalidate - a 304 costs one indexed lookup
+REVALIDATE = "private, no-cache"
+
+_stats: Dict[str, Dict[str, int]] = {}
+register_collector("http_cache", lambda: {name: dict(counts) for name, counts in _stats.items()})
+
+
+async def bump_versions(db: AsyncSession, user_ids: Union[int, Iterable[int]], *collections: str):
+    """Bump (user, collection) counters and drop their cached responses; call before the mutation's commit."""
+    user_ids = [user_ids] if isinstance(user_ids, int) else sorted(set(user_ids))
+    now = datetime.utcnow()
+    rows = [
+        {"user_id": user_id, "collection": collection, "version": 1, "updated_at": now}
+        for user_id in user_ids for collection in sorted(collections)
+    ]
+    if not rows:
+        return
+    insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    stmt = insert(CollectionVersion).values(rows)
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[CollectionVersion.user_id, CollectionVersion.collection],
+        set_={"version": CollectionVersion.version + 1, "updated_at": stmt.excluded.updated_at},
+    ))
+    await response_cache.invalidate([tag(row["collection"], row["user_id"]) for row in rows])
+
+
+async def bump_recipe_dependents(db: AsyncSession, recipe_id: int):
+    """Meal lists embed their recipe: bump `meals` for every user with a meal using it."""
+    result = await db.execute(select(Meal.user_id).where(Meal.recipe_id == recipe_id).distinct())
+    await bump_versions(db, result.scalars().all(), "meals")
+
+
+async def collection_version(db: AsyncSession, user_id: int, collection: str) -> Tuple[int, Optional[datetime]]:
+    result = await db.execute(
+        select(CollectionVersion.version, CollectionVersion.updated_at)
+        .where(CollectionVersion.user_id == user_id, CollectionVersion.collection == collection)
+    )
+    row = result.first()
+    return (row.version, row.updated_at) if row else (0, None)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or (candidate[2:] if candidate.startswith("W/") else candidate) == opaque:
+            return True
+    return False
+
+
+def _not_modified_since(header: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified <= since
+
+
+async def not_modified(request: Request, response: Response, db: AsyncSession, user_id: int,
+                       collection: str, cache_control: str = REVALIDATE) -> int:
+    """Raise a 304 if the client's copy of this list is current, else set the validators on `response`.
+
+    Returns the collection version, for `cached_response()`.
+    """
+    version, updated_at = await collection_version(db, user_id, collection)
+    today = date.today()
+    key = f"{user_id}|{collection}|{today}|{sorted(request.query_params.multi_items())}"
+    etag = f'W/"{version}-{hashlib.sha1(key.encode()).hexdigest()[:16]}"'
+    last_modified = max(updated_at or datetime.min, datetime.combine(today, time.min))
+    last_modified = last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+        "Cache-Control": cache_control,
+    }
+
+    counts = _stats.setdefault(collection, {"checked": 0, "not_modified": 0})
+    counts["checked"] += 1
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if (_etag_matches(if_none_match, etag) if if_none_match is not None
+            else if_modified_since is not None and _not_modified_since(if_modified_since, last_modified)):
+        counts["not_modified"] += 1
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return version
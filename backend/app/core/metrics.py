@@ -0,0 +1,20 @@
+"""
+Process-local metrics registry.
+
+Each subsystem registers a collector (a function returning a dict snapshot of its
+counters/gauges). GET /metrics returns every collector's snapshot as JSON.
+Values are per worker process - aggregate across ECS tasks in CloudWatch.
+"""
+from typing import Any, Callable, Dict
+
+_collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register_collector(name: str, collector: Callable[[], Dict[str, Any]]) -> None:
+    """Register (or replace) the snapshot function for a subsystem."""
+    _collectors[name] = collector
+
+
+def collect() -> Dict[str, Dict[str, Any]]:
+    """Snapshot every registered collector."""
+    return {name: collector() for name, collector in _collectors.items()}
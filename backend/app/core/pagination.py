@@ -0,0 +1,147 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are ordered by a sort key ending in the primary key, e.g. (date, id), and
+each page starts strictly after the previous page's last row - so deep pages cost
+the same as the first one, unlike OFFSET. List bodies stay plain JSON arrays; the
+next page is advertised in a `Link: <...>; rel="next"` header (and X-Next-Cursor).
+
+Cursors are opaque base64 tokens tied to one listing, so a cursor from one
+endpoint is rejected by another. They are still client input: a value of the
+wrong type for its column is rejected with a 400 rather than reaching the query.
+"""
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, List, NamedTuple, Optional, Sequence
+
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class Page(NamedTuple):
+    items: List[Any]
+    next_cursor: Optional[str]
+
+
+def _dump(value: Any) -> list:
+    if isinstance(value, datetime):
+        return ["dt", value.isoformat()]
+    if isinstance(value, date):
+        return ["d", value.isoformat()]
+    return ["v", value]
+
+
+def _load(item: list) -> Any:
+    kind, value = item
+    if kind not in ("dt", "d", "v"):
+        raise ValueError(f"Unknown cursor value kind: {kind!r}")
+    if value is None:
+        return None
+    if kind == "dt":
+        return datetime.fromisoformat(value)
+    if kind == "d":
+        return date.fromisoformat(value)
+    if not isinstance(value, (str, int, float, bool)):
+        raise ValueError("Cursor values must be scalars")
+    return value
+
+
+def _fits(column, value: Any, nullable: bool) -> bool:
+    """Whether a decoded cursor value can be compared with `column`."""
+    if value is None:
+        return nullable
+    try:
+        expected = column.type.python_type
+    except NotImplementedError:
+        return True
+    if isinstance(value, bool) and expected is not bool:
+        return False
+    if expected is date and isinstance(value, datetime):
+        return False
+    if expected is float:
+        expected = (int, float)
+    return isinstance(value, expected)
+
+
+def encode_cursor(listing: str, values: Sequence[Any]) -> str:
+    payload = json.dumps([listing, [_dump(v) for v in values]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(listing: str, token: str, size: int) -> list:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        cursor_listing, values = json.loads(base64.urlsafe_b64decode(padded))
+        values = [_load(item) for item in values]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if cursor_listing != listing or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def _after(columns, values, descending: bool, nulls_last: bool):
+    """WHERE clause for rows strictly after `values` in (columns...) order."""
+    key, tie = columns  # (sort column, primary key)
+    key_value, tie_value = values
+    past = (lambda c, v: c < v) if descending else (lambda c, v: c > v)
+
+    if nulls_last and key_value is None:
+        # Already into the trailing NULLs: only later ids among them remain
+        return and_(key.is_(None), past(tie, tie_value))
+
+    clause = or_(past(key, key_value), and_(key == key_value, past(tie, tie_value)))
+    if nulls_last:
+        clause = or_(clause, key.is_(None))
+    return clause
+
+
+async def keyset_paginate(
+    db: AsyncSession,
+    query,
+    listing: str,
+    columns: Sequence,
+    cursor: Optional[str],
+    limit: int,
+    descending: bool = False,
+    nulls_last: bool = False,
+    mappings: bool = False,
+) -> Page:
+    """
+    Run one page of `query` ordered by `columns` (sort column, primary key).
+    nulls_last supports a nullable sort column (NULLs after every value).
+    mappings=True pages a select() of columns: items are row mappings, not entities.
+    """
+    if cursor:
+        values = decode_cursor(listing, cursor, len(columns))
+        # Only the sort column of a nulls_last listing can legitimately be NULL
+        nullable = [nulls_last and i == 0 for i in range(len(columns))]
+        if not all(map(_fits, columns, values, nullable)):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(_after(columns, values, descending, nulls_last))
+
+    ordering = []
+    for i, column in enumerate(columns):
+        order = column.desc() if descending else column.asc()
+        ordering.append(order.nulls_last() if nulls_last and i == 0 else order)
+
+    result = await db.execute(query.order_by(*ordering).limit(limit + 1))
+    rows = result.mappings().all() if mappings else result.scalars().all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        values = [last[column.key] if mappings else getattr(last, column.key) for column in columns]
+        next_cursor = encode_cursor(listing, values)
+    return Page(rows, next_cursor)
+
+
+def set_next_link(request: Request, response: Response, next_cursor: Optional[str]) -> None:
+    """Advertise the next page (if any) in the Link and X-Next-Cursor headers."""
+    if next_cursor:
+        next_url = request.url.remove_query_params("skip").include_query_params(cursor=next_cursor)
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+        response.headers["X-Next-Cursor"] = next_cursor
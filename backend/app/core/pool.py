@@ -0,0 +1,136 @@
+"""
+Connection pool configuration and telemetry for the SQLAlchemy engines.
+
+Pool sizing comes from Settings (DB_POOL_*). With DB_EXTERNAL_POOLER the app
+defers pooling to PgBouncer: NullPool and no prepared statement caching, which
+transaction-mode PgBouncer cannot route.
+"""
+import threading
+import time
+from typing import Any, Dict
+from uuid import uuid4
+
+from sqlalchemy import exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+from app.core.config import settings
+
+
+class PoolStats:
+    """Checkout counters for one engine's pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record(self, waited: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+
+class _InstrumentedPoolMixin:
+    """Times every checkout, including ones that hit DB_POOL_TIMEOUT."""
+
+    stats: PoolStats = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            if self.stats:
+                self.stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        if self.stats:
+            self.stats.record(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool - keep counting into the same stats
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+class InstrumentedNullPool(_InstrumentedPoolMixin, NullPool):
+    pass
+
+
+def engine_options(url: str, is_async: bool = False) -> Dict[str, Any]:
+    """Keyword arguments for create_engine/create_async_engine from Settings."""
+    if not url.startswith(("postgresql", "postgres")):
+        return {}  # SQLite (tests/local scripts) keeps SQLAlchemy's defaults
+
+    options: Dict[str, Any] = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    connect_args: Dict[str, Any] = {}
+
+    if settings.DB_EXTERNAL_POOLER:
+        options["poolclass"] = InstrumentedNullPool
+        if is_async:
+            # PgBouncer (transaction mode) may hand each statement a different
+            # server connection, so named prepared statements must not be reused
+            connect_args["statement_cache_size"] = 0
+            connect_args["prepared_statement_cache_size"] = 0
+            connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+    else:
+        options.update(
+            poolclass=InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+
+    if settings.DB_STATEMENT_TIMEOUT_MS:
+        timeout = str(settings.DB_STATEMENT_TIMEOUT_MS)
+        if is_async:
+            connect_args["server_settings"] = {"statement_timeout": timeout}
+        else:
+            connect_args["options"] = f"-c statement_timeout={timeout}"
+
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+
+def instrument(engine: Engine) -> None:
+    """Attach a PoolStats to the engine's pool (no-op for uninstrumented pools)."""
+    if isinstance(engine.pool, _InstrumentedPoolMixin):
+        engine.pool.stats = PoolStats()
+
+
+def pool_snapshot(engine: Engine) -> Dict[str, Any]:
+    """Live pool gauges plus the checkout counters."""
+    pool = engine.pool
+    snapshot: Dict[str, Any] = {"pool": type(pool).__name__}
+    for gauge in ("size", "checkedin", "checkedout", "overflow"):
+        if hasattr(pool, gauge):
+            snapshot[gauge] = getattr(pool, gauge)()
+
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        snapshot.update(
+            checkouts=stats.checkouts,
+            checkout_timeouts=stats.timeouts,
+            wait_seconds_total=round(stats.wait_seconds_total, 6),
+            wait_seconds_max=round(stats.wait_seconds_max, 6),
+            wait_seconds_avg=round(stats.wait_seconds_total / stats.checkouts, 6) if stats.checkouts else 0.0,
+        )
+    return snapshot
@@ -0,0 +1,265 @@
+"""
+Per-user response cache for hot list endpoints.
+
+An entry is the serialized JSON body (plus pagination headers) of one response,
+keyed by (user, route, normalized params) and tagged with the collections it was
+built from, e.g. "meals:42". `bump_versions()` - which every mutation of meals,
+groceries and recipes already calls - invalidates those tags. Each entry also
+records the collection version it was built at and only hits while that version
+is current, so a write handled by another worker is never served stale even
+where its invalidation did not reach this cache.
+
+Backends (RESPONSE_CACHE_BACKEND):
+- "memory": per-process LRU + TTL, bounded by entry count and body bytes (default)
+- "redis":  shared by every worker and task; TTL per key, a set per tag for
+            invalidation, eviction left to the server's maxmemory-policy
+"""
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import orjson
+from fastapi import Response
+
+from app.core.config import settings
+from app.core.fast_json import json_response
+from app.core.metrics import register_collector
+
+logger = logging.getLogger(__name__)
+
+# Headers set while building a page that belong to the cached response
+CACHED_HEADERS = ("link", "x-next-cursor")
+
+
+class CachedResponse(NamedTuple):
+    version: int
+    body: bytes
+    headers: List[Tuple[str, str]]  # (name, value) pairs; a name may repeat
+
+
+def tag(collection: str, user_id: int) -> str:
+    return f"{collection}:{user_id}"
+
+
+def cache_key(user_id: int, route: str, **params: Any) -> str:
+    """(user, route, params) with params sorted and unset ones dropped."""
+    query = "&".join(f"{name}={params[name]}" for name in sorted(params) if params[name] is not None)
+    return f"{user_id}:{route}?{query}"
+
+
+class ResponseCacheBackend(ABC):
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.invalidated = 0
+
+    def _lookup(self, entry: Optional[CachedResponse], version: int) -> Optional[CachedResponse]:
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.version != version:
+            self.misses += 1
+            self.stale += 1
+            return None
+        self.hits += 1
+        return entry
+
+    @abstractmethod
+    async def get(self, key: str, version: int) -> Optional[CachedResponse]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, entry: CachedResponse, tags: Iterable[str]):
+        ...
+
+    @abstractmethod
+    async def invalidate(self, tags: Iterable[str]):
+        ...
+
+    async def close(self):
+        pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": settings.RESPONSE_CACHE_BACKEND,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidated": self.invalidated,
+        }
+
+
+class MemoryResponseCache(ResponseCacheBackend):
+    """LRU + TTL in this process, bounded by entry count and total body bytes."""
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        super().__init__()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, entry, tags)
+        self._tags: Dict[str, Set[str]] = {}
+        self.bytes = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _drop(self, key: str):
+        _, entry, tags = self._data.pop(key)
+        self.bytes -= len(entry.body)
+        for name in tags:
+            keys = self._tags.get(name)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[name]
+
+    async def get(self, key: str, version: int) -> Optional[CachedResponse]:
+        item = self._data.get(key)
+        if item is not None and item[0] <= time.monotonic():
+            self._drop(key)
+            self.expirations += 1
+            item = None
+        if item is not None:
+            self._data.move_to_end(key)
+        return self._lookup(item[1] if item else None, version)
+
+    async def set(self, key: str, entry: CachedResponse, tags: Iterable[str]):
+        if len(entry.body) > self.max_bytes:
+            return
+        if key in self._data:
+            self._drop(key)
+        tags = tuple(tags)
+        self._data[key] = (time.monotonic() + self.ttl, entry, tags)
+        self.bytes += len(entry.body)
+        for name in tags:
+            self._tags.setdefault(name, set()).add(key)
+        while len(self._data) > self.max_entries or self.bytes > self.max_bytes:
+            self._drop(next(iter(self._data)))
+            self.evictions += 1
+
+    async def invalidate(self, tags: Iterable[str]):
+        for name in tags:
+            for key in self._tags.get(name, set()).copy():
+                self._drop(key)
+                self.invalidated += 1
+
+    def clear(self):
+        self._data.clear()
+        self._tags.clear()
+        self.bytes = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **super().snapshot(),
+            "entries": len(self._data),
+            "bytes_held": self.bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class RedisResponseCache(ResponseCacheBackend):
+    """Shared cache in Redis. Memory and evictions are reported by the server (INFO memory/stats)."""
+
+    PREFIX = "gymfuel:rc2:"  # rc2: headers stored as (name, value) pairs
+
+    def __init__(self, url: str, ttl: int):
+        super().__init__()
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url)
+        self.ttl = ttl
+        self.errors = 0
+
+    async def get(self, key: str, version: int) -> Optional[CachedResponse]:
+        try:
+            raw = await self.client.get(self.PREFIX + key)
+        except Exception as e:
+            # The database is the source of truth - a cache outage is only a miss
+            self.errors += 1
+            logger.warning("Response cache get failed: %s", e)
+            raw = None
+        entry = None
+        if raw is not None:
+            meta, body = raw.split(b"\n", 1)
+            meta = json.loads(meta)
+            entry = CachedResponse(meta["v"], body, [tuple(pair) for pair in meta["h"]])
+        return self._lookup(entry, version)
+
+    async def set(self, key: str, entry: CachedResponse, tags: Iterable[str]):
+        meta = json.dumps({"v": entry.version, "h": entry.headers}, separators=(",", ":")).encode()
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                pipe.set(self.PREFIX + key, meta + b"\n" + entry.body, ex=self.ttl)
+                for name in tags:
+                    pipe.sadd(self.PREFIX + "tag:" + name, key)
+                    pipe.expire(self.PREFIX + "tag:" + name, self.ttl)
+                await pipe.execute()
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Response cache set failed: %s", e)
+
+    async def invalidate(self, tags: Iterable[str]):
+        tag_keys = [self.PREFIX + "tag:" + name for name in tags]
+        if not tag_keys:
+            return
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for tag_key in tag_keys:
+                    pipe.smembers(tag_key)
+                members = await pipe.execute()
+            keys = {self.PREFIX + key.decode() for keys in members for key in keys}
+            if keys:
+                self.invalidated += await self.client.delete(*keys)
+            await self.client.delete(*tag_keys)
+        except Exception as e:
+            # Entries carry their version, so a missed invalidation is still never served
+            self.errors += 1
+            logger.warning("Response cache invalidation failed: %s", e)
+
+    async def close(self):
+        await self.client.aclose()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**super().snapshot(), "errors": self.errors}
+
+
+def create_response_cache(kind: Optional[str] = None) -> ResponseCacheBackend:
+    kind = kind or settings.RESPONSE_CACHE_BACKEND
+    if kind == "redis":
+        return RedisResponseCache(settings.response_cache_url, settings.RESPONSE_CACHE_TTL_SECONDS)
+    if kind == "memory":
+        return MemoryResponseCache(
+            settings.RESPONSE_CACHE_MAX_ENTRIES, settings.RESPONSE_CACHE_MAX_BYTES, settings.RESPONSE_CACHE_TTL_SECONDS,
+        )
+    raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND: {kind!r}")
+
+
+response_cache = create_response_cache()
+register_collector("response_cache", lambda: response_cache.snapshot())
+
+
+async def cached_response(response: Response, key: str, version: int, tags: List[str],
+                          load: Callable[[], Awaitable[Any]]) -> Response:
+    """Serve `key` from the cache, or run `load()` and cache its JSON-ready result.
+
+    `response` is the endpoint's injected Response: its headers (validators,
+    pagination links) are carried onto the returned one.
+    """
+    entry = await response_cache.get(key, version)
+    if entry is None:
+        body = orjson.dumps(await load())
+        headers = [(name, value) for name, value in response.headers.items() if name in CACHED_HEADERS]
+        entry = CachedResponse(version, body, headers)
+        await response_cache.set(key, entry, tags)
+    else:
+        for name, value in entry.headers:
+            response.headers.append(name, value)
+    return json_response(response, entry.body)
@@ -1,9 +1,18 @@
 import os
+import secrets
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 
-from app.api import auth, coach, groceries, meals, recipes, websocket
+from app.api import auth, coach, data, groceries, jobs, meals, recipes, websocket
+from app.core.config import settings
+from app.core.metrics import collect
+from app.core.response_cache import response_cache
+from app.services.change_events import changes
+from app.services.image_service import image_client
+from app.services.ws_manager import manager as ws_manager
 
 app = FastAPI(
     title="GymFuel API",
@@ -31,20 +40,40 @@ if allowed_origins_env and allowed_origins_env.strip():
         allow_credentials=True,  # Safe with specific origins
         allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH"],
         allow_headers=["*"],
+        expose_headers=["Link", "X-Next-Cursor"],  # Cursor pagination headers
     )
 else:
     # No CORS middleware in production (same-origin via ALB path-based routing)
     # This is the most secure option - all requests come from same origin
     pass
 
+# Close the pooled Unsplash client and the WebSocket backplane cleanly,
+# publishing any change events still being debounced first
+app.add_event_handler("shutdown", image_client.aclose)
+app.add_event_handler("shutdown", changes.flush_all)
+app.add_event_handler("shutdown", ws_manager.stop)
+app.add_event_handler("shutdown", response_cache.close)
+
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(recipes.router, prefix="/api/recipes", tags=["recipes"])
 app.include_router(meals.router, prefix="/api/meals", tags=["meals"])
 app.include_router(groceries.router, prefix="/api/groceries", tags=["groceries"])
 app.include_router(coach.router, prefix="/api/coach", tags=["coach"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["jobs"])
+app.include_router(data.router, prefix="/api/data", tags=["data"])
 app.include_router(websocket.router, prefix="/ws", tags=["websocket"])
 
 
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    # Every pooled connection is busy - fail fast so the ALB can retry elsewhere
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Database busy, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
+
 @app.get("/")
 async def root():
     return {"message": "GymFuel API", "version": "1.0.0"}
@@ -53,3 +82,14 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/metrics")
+async def metrics(request: Request):
+    # Pool, job, cache and socket internals: only for scrapers holding METRICS_TOKEN
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), settings.METRICS_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid metrics token", headers={"WWW-Authenticate": "Bearer"})
+    return collect()
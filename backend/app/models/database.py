@@ -1,17 +1,44 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, Float, DateTime, ForeignKey, Boolean, Date, JSON
+from sqlalchemy import create_engine, Column, Integer, String, Text, Float, DateTime, ForeignKey, Boolean, Date, JSON, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
 from app.core.config import settings
+from app.core.metrics import register_collector
+from app.core.pool import engine_options, instrument, pool_snapshot
 
-engine = create_engine(settings.DATABASE_URL)
+# Sync engine: used by init_db.py, maintenance scripts and tests
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine: used by the API routers so queries don't block the event loop
+async_engine = create_async_engine(
+    settings.async_database_url, **engine_options(settings.async_database_url, is_async=True)
+)
+# expire_on_commit=False - async sessions can't lazy-refresh attributes after commit
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False, class_=AsyncSession
+)
+
+instrument(engine)
+instrument(async_engine.sync_engine)
+register_collector("db_pool", lambda: {
+    "sync": pool_snapshot(engine),
+    "async": pool_snapshot(async_engine.sync_engine),
+})
+
 Base = declarative_base()
 
 
-def get_db():
-    """Dependency for getting database session"""
+async def get_db():
+    """Dependency for getting an async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_sync_db():
+    """Dependency for getting a sync database session (scripts and tests)"""
     db = SessionLocal()
     try:
         yield db
@@ -45,6 +72,8 @@ class Family(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Sequence number of the family's latest sync event (see FamilyEvent)
+    last_event_seq = Column(Integer, nullable=False, default=0, server_default="0")
     
     members = relationship("User", back_populates="family")
 
@@ -62,14 +91,20 @@ class Recipe(Base):
     difficulty = Column(String)
     image_url = Column(String)
     source_url = Column(String)
-    tags = Column(JSON, default=list)
-    ingredients = Column(JSON, default=list)
-    nutritional_info = Column(JSON, default=dict)
+    # JSONB on Postgres so the tag/ingredient/macro filters can use GIN and
+    # expression indexes (migration 0005)
+    tags = Column(JSON().with_variant(JSONB(), "postgresql"), default=list)
+    ingredients = Column(JSON().with_variant(JSONB(), "postgresql"), default=list)
+    nutritional_info = Column(JSON().with_variant(JSONB(), "postgresql"), default=dict)
     created_at = Column(DateTime, default=datetime.utcnow)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     
     user = relationship("User")
 
+    __table_args__ = (
+        Index("ix_recipes_user_created", "user_id", "created_at"),
+    )
+
 
 class Meal(Base):
     __tablename__ = "meals"
@@ -86,6 +121,10 @@ class Meal(Base):
     user = relationship("User", back_populates="meals")
     recipe = relationship("Recipe")
 
+    __table_args__ = (
+        Index("ix_meals_user_date_type", "user_id", "date", "meal_type"),
+    )
+
 
 class GroceryItem(Base):
     __tablename__ = "grocery_items"
@@ -102,6 +141,12 @@ class GroceryItem(Base):
     
     user = relationship("User", back_populates="grocery_items")
 
+    __table_args__ = (
+        Index("ix_grocery_items_user_expiration", "user_id", "expiration_date"),
+        # One row per (user, name, unit); bulk writes upsert into it (migration 0007)
+        Index("uq_grocery_items_user_name_unit", "user_id", "name", text("coalesce(unit, '')"), unique=True),
+    )
+
 
 class CoachClient(Base):
     """Association table linking coaches to their clients"""
@@ -115,3 +160,62 @@ class CoachClient(Base):
     coach = relationship("User", foreign_keys=[coach_id])
     client = relationship("User", foreign_keys=[client_id])
 
+    __table_args__ = (
+        Index("ix_coach_clients_coach_client", "coach_id", "client_id"),
+    )
+
+
+class NutritionDaily(Base):
+    """Per-user daily macro totals over meals with a recipe (one serving each).
+
+    Derived data: maintained by app.services.nutrition_service whenever meals or
+    recipe macros change; rebuild/check with nutrition_rollup.py.
+    """
+    __tablename__ = "nutrition_daily"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    date = Column(Date, primary_key=True)
+    meals = Column(Integer, nullable=False, default=0)
+    calories = Column(Float, nullable=False, default=0)
+    protein = Column(Float, nullable=False, default=0)
+    carbs = Column(Float, nullable=False, default=0)
+    fat = Column(Float, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class FamilyEvent(Base):
+    """Family sync log: every broadcast update, numbered per family for replay on reconnect.
+
+    Bounded by FAMILY_EVENT_RETENTION_MAX / _HOURS; see app.services.family_events.
+    """
+    __tablename__ = "family_events"
+
+    family_id = Column(Integer, ForeignKey("families.id"), primary_key=True)
+    seq = Column(Integer, primary_key=True, autoincrement=False)
+    type = Column(String, nullable=False)
+    user_id = Column(Integer, nullable=True)
+    data = Column(JSON, nullable=False, default=dict)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
+class CollectionVersion(Base):
+    """Per-user change counter for a collection (recipes, meals, groceries).
+
+    Bumped in the same transaction as every mutation; list endpoints turn it into
+    an ETag (see app.core.http_cache).
+    """
+    __tablename__ = "collection_versions"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    collection = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ImageCacheEntry(Base):
+    """Persistent Unsplash lookup cache, keyed by normalized query"""
+    __tablename__ = "image_cache"
+
+    query = Column(String, primary_key=True)
+    image_url = Column(String, nullable=False)  # Empty string = no image found
+    fetched_at = Column(DateTime, default=datetime.utcnow, nullable=False)
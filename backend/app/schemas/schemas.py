@@ -38,6 +38,17 @@ class UserResponse(UserBase):
         from_attributes = True
 
 
+class TokenUser(BaseModel):
+    """Authenticated principal resolved from JWT claims (or the user cache)"""
+    id: int
+    email: str
+    role: str = "client"
+    family_id: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+
 class UserLogin(BaseModel):
     email: EmailStr
     password: str
@@ -77,6 +88,7 @@ class RecipeUpdate(BaseModel):
     difficulty: Optional[str] = None
     tags: Optional[List[str]] = None
     ingredients: Optional[List[Dict[str, Any]]] = None
+    nutritional_info: Optional[Dict[str, Any]] = None
 
 
 class RecipeResponse(RecipeBase):
@@ -88,6 +100,21 @@ class RecipeResponse(RecipeBase):
         from_attributes = True
 
 
+class RecipeSearchResult(RecipeResponse):
+    """Recipe search hit with its relevance and a highlighted snippet"""
+    rank: float
+    snippet: Optional[str] = None
+
+
+class RecipeMatch(RecipeResponse):
+    """Saved recipe scored against the user's pantry"""
+    score: float
+    coverage: float  # fraction of the recipe's ingredients in the pantry
+    matched: List[str] = []
+    missing: List[str] = []
+    expiring: List[str] = []  # matched ingredients using up soon-to-expire groceries
+
+
 class MealBase(BaseModel):
     date: date
     meal_type: str  # breakfast, lunch, dinner, snack
@@ -118,6 +145,25 @@ class MealResponse(MealBase):
         from_attributes = True
 
 
+class NutritionPeriod(BaseModel):
+    start_date: date
+    end_date: date
+    meals: int
+    calories: float
+    protein: float
+    carbs: float
+    fat: float
+
+
+class NutritionSummaryResponse(BaseModel):
+    start_date: date
+    end_date: date
+    group: str  # day or week
+    periods: List[NutritionPeriod]
+    totals: NutritionPeriod
+    daily_average: Dict[str, float]
+
+
 class GroceryItemBase(BaseModel):
     name: str
     quantity: float = 1.0
@@ -148,6 +194,21 @@ class GroceryItemResponse(GroceryItemBase):
         from_attributes = True
 
 
+class ShoppingListItem(BaseModel):
+    name: str
+    quantity: float
+    unit: Optional[str] = None
+    category: str
+    in_stock: float = 0  # already in the pantry, same unit as quantity
+
+
+class ShoppingListResponse(BaseModel):
+    start_date: date
+    end_date: date
+    meals: int
+    categories: Dict[str, List[ShoppingListItem]]
+
+
 # ============ Coach Feature Schemas ============
 
 class LinkClientRequest(BaseModel):
@@ -178,6 +239,23 @@ class CoachSummary(BaseModel):
         from_attributes = True
 
 
+class ClientDashboardEntry(ClientSummary):
+    """Per-client activity and weekly macro totals for the coach dashboard"""
+    last_activity: Optional[datetime] = None
+    meals_this_week: int = 0
+    calories: float = 0
+    protein: float = 0
+    carbs: float = 0
+    fat: float = 0
+
+
+class CoachDashboardResponse(BaseModel):
+    """Coach dashboard: every linked client's summary for one week"""
+    week_start: date
+    week_end: date
+    clients: List[ClientDashboardEntry]
+
+
 class CoachClientResponse(BaseModel):
     """Response for coach-client relationship"""
     id: int
@@ -187,3 +265,24 @@ class CoachClientResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+# ============ Data Transfer Schemas ============
+
+class ImportResult(BaseModel):
+    """Outcome of a streamed import (/api/data/import/{kind})"""
+    imported: int
+    skipped: int
+    batches: int
+    errors: List[Dict[str, Any]] = []  # {"line": n, "error": "..."}, first 100
+
+
+# ============ Background Job Schemas ============
+
+class JobResponse(BaseModel):
+    """Status of a background job, polled via /api/jobs/{job_id}"""
+    job_id: str
+    kind: str
+    status: str  # queued, running, succeeded, failed
+    result: Optional[Any] = None
+    error: Optional[str] = None
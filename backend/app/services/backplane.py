@@ -0,0 +1,238 @@
+"""
+Pub/sub backplane for WebSocket fan-out across uvicorn workers and ECS tasks.
+
+Broadcasts are published on a per-family channel and delivered on every node
+that has a socket for that family; each node hands the payload to its local
+ConnectionManager. Payloads are JSON text, serialized once by the publisher.
+
+- memory:   in-process only (one worker, local dev, tests)
+- postgres: LISTEN/NOTIFY on the application database - no extra service. One
+            dedicated asyncpg connection per worker LISTENs on the channels of
+            the families it has sockets for; NOTIFY goes through the async pool.
+"""
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+import asyncpg
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import register_collector
+from app.models.database import async_engine
+
+logger = logging.getLogger(__name__)
+
+# deliver(family_id, payload) - send to this node's sockets for the family
+Deliver = Callable[[str, str], Awaitable[None]]
+
+CHANNEL_PREFIX = "gymfuel_family_"
+# NOTIFY rejects payloads of 8000 bytes or more
+MAX_NOTIFY_BYTES = 7999
+
+
+class Backplane(ABC):
+    """Per-family channels; `deliver` runs on every subscribed node for each publish."""
+
+    kind = "base"
+
+    def __init__(self):
+        self.deliver: Optional[Deliver] = None
+        self.families: Set[str] = set()
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    async def start(self, deliver: Deliver):
+        self.deliver = deliver
+
+    async def stop(self):
+        self.families.clear()
+
+    async def subscribe(self, family_id: str):
+        self.families.add(family_id)
+
+    async def unsubscribe(self, family_id: str):
+        self.families.discard(family_id)
+
+    @abstractmethod
+    async def publish(self, family_id: str, payload: str):
+        ...
+
+    async def publish_on_commit(self, db: AsyncSession, family_id: str, payload: str) -> bool:
+        """Publish as part of `db`'s transaction, sent only when it commits.
+
+        Returns False when this backplane can't; the caller publishes after its
+        commit instead.
+        """
+        return False
+
+    async def _deliver(self, family_id: str, payload: str):
+        if family_id not in self.families or self.deliver is None:
+            return
+        self.delivered += 1
+        try:
+            await self.deliver(family_id, payload)
+        except Exception:
+            logger.exception("WebSocket delivery failed for family %s", family_id)
+
+    def snapshot(self) -> Dict:
+        return {
+            "kind": self.kind,
+            "families": len(self.families),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+class InMemoryBackplane(Backplane):
+    kind = "memory"
+
+    async def publish(self, family_id: str, payload: str):
+        self.published += 1
+        await self._deliver(family_id, payload)
+
+
+class PostgresBackplane(Backplane):
+    """
+    NOTIFY goes out on commit, in commit order, to every listener - this node's
+    included - so local and remote sockets take the same path. Notifications
+    are queued and delivered by one task to keep that order.
+    """
+
+    kind = "postgres"
+
+    def __init__(self, dsn: str, reconnect_delay: float = 1.0):
+        super().__init__()
+        self.dsn = dsn
+        self.reconnect_delay = reconnect_delay
+        self.reconnects = 0
+        self._connection = None
+        self._lock = asyncio.Lock()
+        self._inbox: "asyncio.Queue[tuple]" = asyncio.Queue()
+        self._pump: Optional[asyncio.Task] = None
+        self._reconnect: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    @staticmethod
+    def channel(family_id: str) -> str:
+        return f"{CHANNEL_PREFIX}{family_id}"
+
+    async def start(self, deliver: Deliver):
+        await super().start(deliver)
+        self._stopping = False
+        self._pump = asyncio.create_task(self._run_pump())
+        await self._connect()
+
+    async def stop(self):
+        self._stopping = True
+        for task in (self._pump, self._reconnect):
+            if task:
+                task.cancel()
+        if self._connection is not None and not self._connection.is_closed():
+            await self._connection.close()
+        self._connection = None
+        await super().stop()
+
+    async def _connect(self):
+        async with self._lock:
+            self._connection = await asyncpg.connect(self.dsn)
+            self._connection.add_termination_listener(self._on_terminated)
+            for family_id in self.families:
+                await self._connection.add_listener(self.channel(family_id), self._on_notify)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        self._inbox.put_nowait((channel[len(CHANNEL_PREFIX):], payload))
+
+    def _on_terminated(self, connection):
+        if not self._stopping and (self._reconnect is None or self._reconnect.done()):
+            logger.warning("Backplane connection lost, reconnecting")
+            self._reconnect = asyncio.create_task(self._reconnect_loop())
+
+    async def _reconnect_loop(self):
+        delay = self.reconnect_delay
+        while not self._stopping:
+            await asyncio.sleep(delay)
+            try:
+                await self._connect()
+                self.reconnects += 1
+                return
+            except Exception as e:
+                logger.warning("Backplane reconnect failed: %s", e)
+                delay = min(delay * 2, 30.0)
+
+    async def _run_pump(self):
+        while True:
+            family_id, payload = await self._inbox.get()
+            await self._deliver(family_id, payload)
+
+    async def subscribe(self, family_id: str):
+        if family_id in self.families:
+            return
+        await super().subscribe(family_id)
+        async with self._lock:
+            if self._connection is not None and not self._connection.is_closed():
+                await self._connection.add_listener(self.channel(family_id), self._on_notify)
+
+    async def unsubscribe(self, family_id: str):
+        if family_id not in self.families:
+            return
+        await super().unsubscribe(family_id)
+        async with self._lock:
+            if self._connection is not None and not self._connection.is_closed():
+                await self._connection.remove_listener(self.channel(family_id), self._on_notify)
+
+    def _fit(self, family_id: str, payload: str) -> str:
+        """The payload, or a resync notice in its place when it's over the NOTIFY limit."""
+        size = len(payload.encode("utf-8"))
+        if size <= MAX_NOTIFY_BYTES:
+            return payload
+        self.dropped += 1
+        logger.warning("Replacing %d-byte broadcast for family %s with a resync (NOTIFY limit)", size, family_id)
+        # Same notice a coalesced socket gets; the seq lets clients resume from the event log
+        return json.dumps({"type": "resync", "skipped": 1, "seq": json.loads(payload).get("seq")})
+
+    async def publish(self, family_id: str, payload: str):
+        payload = self._fit(family_id, payload)
+        async with async_engine.connect() as conn:
+            await conn.execute(select(func.pg_notify(self.channel(family_id), payload)))
+            await conn.commit()
+        self.published += 1
+
+    async def publish_on_commit(self, db: AsyncSession, family_id: str, payload: str) -> bool:
+        # Queued in the caller's transaction: Postgres sends it at commit, and
+        # notifications from different transactions arrive in commit order
+        await db.execute(select(func.pg_notify(self.channel(family_id), self._fit(family_id, payload))))
+        self.published += 1
+        return True
+
+    def snapshot(self) -> Dict:
+        return {
+            **super().snapshot(),
+            "connected": self._connection is not None and not self._connection.is_closed(),
+            "reconnects": self.reconnects,
+            "pending": self._inbox.qsize(),
+        }
+
+
+def listen_dsn() -> str:
+    """asyncpg DSN for the LISTEN connection (no SQLAlchemy driver suffix)."""
+    url = settings.WS_BACKPLANE_URL or settings.async_database_url
+    return url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+
+def create_backplane(kind: Optional[str] = None) -> Backplane:
+    kind = kind or settings.WS_BACKPLANE
+    if kind == "postgres":
+        return PostgresBackplane(listen_dsn())
+    if kind == "memory":
+        return InMemoryBackplane()
+    raise ValueError(f"Unknown WS_BACKPLANE: {kind!r}")
+
+
+backplane = create_backplane()
+register_collector("ws_backplane", lambda: backplane.snapshot())
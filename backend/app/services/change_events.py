@@ -0,0 +1,127 @@
+"""
+Change events from REST mutations, pushed to the family's WebSocket channel.
+
+Routers call `changes.record(...)` after their commit. Changes are buffered per
+family for FAMILY_EVENT_DEBOUNCE_MS from the first one, then published as a
+single "changes" event through the family sync log, so a burst (a bulk upsert,
+a generated week, an import) costs one event instead of one per row.
+
+Each change is {"entity", "id", "op", "version", "fields"}: op is created,
+updated, upserted or deleted; version is the commit time in epoch ms (later
+wins); fields lists what an update touched (None = the whole row). Repeated
+changes to one entity within a batch are merged. Past FAMILY_EVENT_BATCH_MAX
+entities, past MAX_CHANGES_BYTES of JSON (the event must fit in one NOTIFY) or
+for imports, the event carries {"bulk": {entity: count}} and clients refetch
+those collections.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.core.metrics import register_collector
+from app.schemas.schemas import TokenUser
+from app.services.backplane import MAX_NOTIFY_BYTES
+from app.services.family_events import publish_event
+
+logger = logging.getLogger(__name__)
+
+# Serialized "changes" data, leaving room for the event envelope (type, seq, user, timestamp)
+MAX_CHANGES_BYTES = MAX_NOTIFY_BYTES - 512
+
+
+class ChangeBatch:
+    def __init__(self):
+        self.changes: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        self.bulk: Counter = Counter()
+        self.user_ids: Set[int] = set()
+
+    def add(self, entity: str, entity_id: int, op: str, fields: Optional[Iterable[str]]):
+        key = (entity, entity_id)
+        change = {"entity": entity, "id": entity_id, "op": op, "version": int(time.time() * 1000),
+                  "fields": sorted(fields) if fields is not None else None}
+        previous = self.changes.get(key)
+        if previous is not None:
+            if op == "deleted" and previous["op"] == "created":
+                del self.changes[key]  # never seen by the family
+                return
+            if op == "updated":
+                if previous["op"] != "updated":
+                    change["op"] = previous["op"]
+                    change["fields"] = None
+                else:
+                    change["fields"] = sorted(set(previous["fields"] or ()) | set(change["fields"] or ()))
+        self.changes[key] = change
+
+    def message(self) -> Dict[str, Any]:
+        if len(self.changes) <= settings.FAMILY_EVENT_BATCH_MAX and not self.bulk:
+            message = {"changes": list(self.changes.values())}
+            # Measured as the broadcast serializes it (ConnectionManager.broadcast)
+            if len(json.dumps(message, default=str).encode("utf-8")) <= MAX_CHANGES_BYTES:
+                return message
+        bulk = self.bulk + Counter(entity for entity, _ in self.changes)
+        return {"changes": [], "bulk": dict(bulk)}
+
+
+class ChangeBatcher:
+    def __init__(self):
+        self.pending: Dict[int, ChangeBatch] = {}
+        self._flushes: Set[asyncio.Task] = set()
+        self.stats = {"changes": 0, "events": 0, "failed": 0}
+
+    def _batch(self, user: TokenUser) -> Optional[ChangeBatch]:
+        if user.family_id is None:
+            return None  # nobody to tell
+        batch = self.pending.get(user.family_id)
+        if batch is None:
+            batch = self.pending[user.family_id] = ChangeBatch()
+            task = asyncio.create_task(self._flush_later(user.family_id))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+        batch.user_ids.add(user.id)
+        return batch
+
+    def record(self, user: TokenUser, entity: str, entity_id: int, op: str,
+               fields: Optional[Iterable[str]] = None):
+        """Queue a committed change to one of `user`'s rows for their family."""
+        batch = self._batch(user)
+        if batch is not None:
+            batch.add(entity, entity_id, op, fields)
+            self.stats["changes"] += 1
+
+    def record_bulk(self, user: TokenUser, entity: str, count: int):
+        """Queue `count` changes to an entity collection (clients refetch it)."""
+        batch = self._batch(user) if count else None
+        if batch is not None:
+            batch.bulk[entity] += count
+            self.stats["changes"] += count
+
+    async def _flush_later(self, family_id: int):
+        await asyncio.sleep(settings.FAMILY_EVENT_DEBOUNCE_MS / 1000)
+        await self.flush(family_id)
+
+    async def flush(self, family_id: int):
+        batch = self.pending.pop(family_id, None)
+        if batch is None or not (batch.changes or batch.bulk):
+            return
+        user_id = next(iter(batch.user_ids)) if len(batch.user_ids) == 1 else None
+        try:
+            await publish_event(family_id, "changes", batch.message(), user_id)
+            self.stats["events"] += 1
+        except Exception:
+            self.stats["failed"] += 1
+            logger.exception("Publishing changes for family %s failed", family_id)
+
+    async def flush_all(self):
+        for family_id in list(self.pending):
+            await self.flush(family_id)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.stats, "pending_families": len(self.pending)}
+
+
+changes = ChangeBatcher()
+register_collector("change_events", changes.snapshot)
@@ -0,0 +1,157 @@
+"""
+Family sync log: numbered events for resumable WebSocket sync.
+
+Every update broadcast to a family is first written to `family_events` with the
+next per-family sequence number (an atomic increment of families.last_event_seq,
+so numbers are gap-free and ordered across workers). A client reconnects with
+`?last_seq=N` and gets only the events after N. When those are no longer all
+retained, or there are more than FAMILY_REPLAY_MAX_EVENTS of them, it gets one
+compact snapshot of the family's upcoming meals and groceries instead. Live
+events carry their seq too: a client that sees a jump or a resync (a coalesced
+backlog, an event too large for NOTIFY) resumes the same way.
+
+Events reach sockets in seq order. Appending locks the family row until commit,
+so seqs commit in order; the broadcast then either joins the transaction (the
+postgres backplane's NOTIFY is sent at commit, in commit order, to every node)
+or - with the in-process backplane - follows the commit under a per-family lock.
+
+Retention is bounded per family by count (FAMILY_EVENT_RETENTION_MAX) and age
+(FAMILY_EVENT_RETENTION_HOURS); old events are pruned as new ones are written.
+"""
+import asyncio
+import weakref
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.database import AsyncSessionLocal, Family, FamilyEvent, GroceryItem, Meal, User
+from app.schemas.schemas import GroceryItemResponse, MealResponse
+from app.services.ws_manager import manager
+
+# Prune a family's log every this many events
+PRUNE_EVERY = 100
+
+# family_id -> lock held from append to broadcast; entries go once nobody holds or awaits them
+_publish_locks: "weakref.WeakValueDictionary[int, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def _message(event: FamilyEvent) -> Dict[str, Any]:
+    return {
+        "type": event.type,
+        "seq": event.seq,
+        "data": event.data,
+        "user_id": str(event.user_id) if event.user_id is not None else None,
+        "timestamp": event.created_at.isoformat(),
+    }
+
+
+async def current_seq(db: AsyncSession, family_id: int) -> int:
+    result = await db.execute(select(Family.last_event_seq).where(Family.id == family_id))
+    return result.scalar_one_or_none() or 0
+
+
+async def append_event(db: AsyncSession, family_id: int, type: str, data: Dict[str, Any],
+                       user_id: Optional[int] = None) -> Dict[str, Any]:
+    """Log an event under the family's next sequence number; the caller commits."""
+    seq = (await db.execute(
+        update(Family)
+        .where(Family.id == family_id)
+        .values(last_event_seq=Family.last_event_seq + 1)
+        .returning(Family.last_event_seq)
+    )).scalar_one()
+    event = FamilyEvent(family_id=family_id, seq=seq, type=type, user_id=user_id, data=data,
+                        created_at=datetime.utcnow())
+    db.add(event)
+    if seq % PRUNE_EVERY == 0:
+        await prune_events(db, family_id, seq)
+    return _message(event)
+
+
+async def prune_events(db: AsyncSession, family_id: int, seq: int):
+    cutoff = datetime.utcnow() - timedelta(hours=settings.FAMILY_EVENT_RETENTION_HOURS)
+    await db.execute(
+        delete(FamilyEvent)
+        .where(FamilyEvent.family_id == family_id)
+        .where(or_(FamilyEvent.seq <= seq - settings.FAMILY_EVENT_RETENTION_MAX, FamilyEvent.created_at < cutoff))
+    )
+
+
+async def publish_event(family_id: int, type: str, data: Dict[str, Any],
+                        user_id: Optional[int] = None) -> Dict[str, Any]:
+    """Log an event, then broadcast it to the family's sockets on every node, in seq order."""
+    lock = _publish_locks.get(family_id)
+    if lock is None:
+        lock = _publish_locks[family_id] = asyncio.Lock()
+    async with lock:
+        async with AsyncSessionLocal() as db:
+            message = await append_event(db, family_id, type, data, user_id)
+            sent = await manager.broadcast_on_commit(db, message, str(family_id))
+            await db.commit()
+        if not sent:
+            await manager.broadcast(message, str(family_id))
+    return message
+
+
+async def events_since(db: AsyncSession, family_id: int, after_seq: int, up_to: int) -> Optional[List[Dict[str, Any]]]:
+    """Events in (after_seq, up_to], oldest first; None when a snapshot is the better answer."""
+    if after_seq == up_to:
+        return []
+    if after_seq > up_to or up_to - after_seq > settings.FAMILY_REPLAY_MAX_EVENTS:
+        return None
+    result = await db.execute(
+        select(FamilyEvent)
+        .where(FamilyEvent.family_id == family_id, FamilyEvent.seq > after_seq, FamilyEvent.seq <= up_to)
+        .order_by(FamilyEvent.seq)
+    )
+    events = result.scalars().all()
+    if len(events) != up_to - after_seq:
+        return None  # pruned
+    return [_message(event) for event in events]
+
+
+async def snapshot(db: AsyncSession, family_id: int, seq: int) -> Dict[str, Any]:
+    """The family's meals for the next FAMILY_SNAPSHOT_DAYS and all their groceries, as of `seq`."""
+    start = date.today()
+    end = start + timedelta(days=settings.FAMILY_SNAPSHOT_DAYS)
+    members = select(User.id).where(User.family_id == family_id).scalar_subquery()
+
+    meal_fields = [name for name in MealResponse.model_fields if name != "recipe"]
+    meals = await db.execute(
+        select(*[Meal.__table__.c[name] for name in meal_fields])
+        .where(Meal.user_id.in_(members), Meal.date >= start, Meal.date <= end)
+        .order_by(Meal.date, Meal.id)
+    )
+    grocery_fields = list(GroceryItemResponse.model_fields)
+    groceries = await db.execute(
+        select(*[GroceryItem.__table__.c[name] for name in grocery_fields])
+        .where(GroceryItem.user_id.in_(members))
+        .order_by(GroceryItem.id)
+    )
+    return {
+        "type": "snapshot",
+        "seq": seq,
+        "data": {
+            "start_date": start.isoformat(),
+            "end_date": end.isoformat(),
+            "meals": [MealResponse.model_construct(**row).model_dump(mode="json", include=set(meal_fields))
+                      for row in meals.mappings()],
+            "groceries": [GroceryItemResponse.model_construct(**row).model_dump(mode="json")
+                          for row in groceries.mappings()],
+        },
+        "user_id": None,
+        "timestamp": datetime.utcnow().isoformat(),
+    }
+
+
+async def resume(db: AsyncSession, family_id: int, last_seq: Optional[int]) -> Tuple[int, List[Dict[str, Any]]]:
+    """(current seq, messages that bring a client at `last_seq` up to it)."""
+    seq = await current_seq(db, family_id)
+    if last_seq is None:
+        return seq, []  # fresh client: loads over REST, then follows live events
+    missed = await events_since(db, family_id, last_seq, seq)
+    if missed is None:
+        return seq, [await snapshot(db, family_id, seq)]
+    return seq, missed
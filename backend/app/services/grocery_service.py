@@ -0,0 +1,76 @@
+"""
+Bulk grocery writes: one multi-row INSERT ... ON CONFLICT DO UPDATE ... RETURNING
+per batch instead of an INSERT plus a refresh SELECT per item.
+
+Rows are unique on (user_id, name, unit) (uq_grocery_items_user_name_unit), so
+adding an item that's already in the pantry merges into it: quantities add up,
+the earlier expiration date wins and the most recently given category wins (an
+item without one - missing or "" - keeps the category already there). Repeats within one
+payload merge by the same rules, in payload order.
+"""
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import case, func, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.database import GroceryItem
+from app.schemas.schemas import GroceryItemCreate
+
+CONFLICT_TARGET = [GroceryItem.user_id, GroceryItem.name, text("coalesce(unit, '')")]
+
+
+def merge_payload(user_id: int, items: Iterable[GroceryItemCreate]) -> List[Dict]:
+    """Collapse repeats within one payload (a statement can't upsert the same row twice)."""
+    merged: Dict[Tuple[str, str], Dict] = {}
+    for item in items:
+        row = item.model_dump()
+        key = (row["name"], row["unit"] or "")
+        existing = merged.get(key)
+        if existing is None:
+            merged[key] = {**row, "user_id": user_id}
+            continue
+        existing["quantity"] += row["quantity"]
+        existing["category"] = row["category"] or existing["category"]
+        dates = [d for d in (existing["expiration_date"], row["expiration_date"]) if d]
+        existing["expiration_date"] = min(dates) if dates else None
+    return list(merged.values())
+
+
+def _upsert_statement(dialect_name: str):
+    insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    stmt = insert(GroceryItem)
+    current, incoming = GroceryItem.__table__.c, stmt.excluded
+    return stmt.on_conflict_do_update(
+        index_elements=CONFLICT_TARGET,
+        set_={
+            "quantity": func.coalesce(current.quantity, 0) + func.coalesce(incoming.quantity, 0),
+            # "" counts as no category, as in merge_payload
+            "category": func.coalesce(func.nullif(incoming.category, ""), current.category),
+            "expiration_date": case(
+                (incoming.expiration_date.is_(None), current.expiration_date),
+                (current.expiration_date.is_(None), incoming.expiration_date),
+                (incoming.expiration_date < current.expiration_date, incoming.expiration_date),
+                else_=current.expiration_date,
+            ),
+            "updated_at": datetime.utcnow(),
+        },
+    )
+
+
+async def upsert_grocery_items(db: AsyncSession, user_id: int, items: Iterable[GroceryItemCreate]) -> List[GroceryItem]:
+    """Insert or merge items for a user; returns the resulting rows in payload order, one per distinct item.
+
+    SQLAlchemy batches the parameter list into multi-row INSERTs (insertmanyvalues,
+    1000 rows per statement), so a 500-item import is a single round trip.
+    """
+    rows = merge_payload(user_id, items)
+    if not rows:
+        return []
+    # No sort_by_parameter_order: it makes some drivers fall back to one INSERT
+    # per row. Keys are unique after merging, so restore payload order by key.
+    stmt = _upsert_statement(db.get_bind().dialect.name).returning(GroceryItem)
+    result = await db.scalars(stmt, rows, execution_options={"populate_existing": True})
+    by_key = {(item.name, item.unit or ""): item for item in result.all()}
+    return [by_key[(row["name"], row["unit"] or "")] for row in rows]
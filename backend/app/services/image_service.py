@@ -1,13 +1,254 @@
 """
 Image service for fetching meal/recipe images from Unsplash.
 Optimized for fitness/gym-focused food photography.
+
+One long-lived pooled HTTP client serves every lookup. Results are cached by
+normalized query (in-memory LRU, plus an optional persistent `image_cache` table),
+concurrent lookups for the same query share one API call, and a rate-limit
+backoff plus circuit breaker stop Unsplash trouble from slowing recipe creation.
 """
+import asyncio
+import logging
+import re
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
 import httpx
-from typing import Optional
+from sqlalchemy import select
+
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.metrics import register_collector
 
 UNSPLASH_URL = "https://api.unsplash.com/search/photos"
 
+logger = logging.getLogger(__name__)
+
+_NO_IMAGE = ""  # Cached marker for "Unsplash has nothing for this query"
+
+
+def normalize_query(query: str) -> str:
+    """'  Chicken and  Rice ' and 'chicken and rice' share one cache entry."""
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and rejects calls for `cooldown`
+    seconds, then lets a single trial call through (half-open).
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def failure(self):
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+
+class UnsplashImageClient:
+    def __init__(self):
+        self.cache = TTLCache(maxsize=settings.IMAGE_CACHE_MAX_ENTRIES, ttl=settings.IMAGE_CACHE_TTL_SECONDS)
+        self.breaker = CircuitBreaker(settings.IMAGE_BREAKER_THRESHOLD, settings.IMAGE_BREAKER_COOLDOWN_SECONDS)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.rate_limited_until = 0.0
+        self._rate_limit_backoff = settings.IMAGE_RATE_LIMIT_BACKOFF_SECONDS
+        self.stats = {"api_calls": 0, "persistent_hits": 0, "coalesced": 0,
+                      "rate_limited": 0, "short_circuited": 0, "failures": 0}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so it binds to the running event loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=settings.IMAGE_REQUEST_TIMEOUT_SECONDS,
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+                headers={"Authorization": f"Client-ID {settings.UNSPLASH_ACCESS_KEY}"},
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def get_meal_image(self, query: str) -> Optional[str]:
+        if not settings.UNSPLASH_ACCESS_KEY:
+            return None
+
+        key = normalize_query(query)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached or None
+
+        # Coalesce: concurrent lookups for the same query await the first one's call
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(in_flight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        image_url = None
+        try:
+            image_url = await self._lookup(key)
+            return image_url
+        finally:
+            # Waiters get None if this lookup raised or was cancelled
+            del self._in_flight[key]
+            future.set_result(image_url)
+
+    async def _lookup(self, key: str) -> Optional[str]:
+        if settings.IMAGE_CACHE_PERSISTENT:
+            stored = await self._load_persistent(key)
+            if stored is not None:
+                self.stats["persistent_hits"] += 1
+                self.cache.set(key, stored)
+                return stored or None
+
+        image_url = await self._fetch(key)
+        if image_url is not False:
+            # False = transient failure: don't cache, a later call may succeed
+            self.cache.set(key, image_url or _NO_IMAGE)
+            if settings.IMAGE_CACHE_PERSISTENT:
+                await self._store_persistent(key, image_url or _NO_IMAGE)
+            return image_url
+        return None
+
+    async def _fetch(self, key: str):
+        """Call Unsplash. Returns the URL, None for no results, or False on failure."""
+        if time.monotonic() < self.rate_limited_until:
+            self.stats["rate_limited"] += 1
+            return False
+        if not self.breaker.allow():
+            self.stats["short_circuited"] += 1
+            return False
+
+        # Add fitness context to get healthier-looking food photos
+        search_query = f"{key} healthy meal"
+        logger.info(f"Image search: '{key}' -> '{search_query}'")
+        params = {
+            "query": search_query,
+            "per_page": 1,
+            "orientation": "landscape",
+            "content_filter": "high"
+        }
+
+        self.stats["api_calls"] += 1
+        try:
+            resp = await self.client.get(UNSPLASH_URL, params=params)
+            if resp.status_code == 429 or (
+                resp.status_code == 403 and resp.headers.get("X-Ratelimit-Remaining") == "0"
+            ):
+                # Unsplash is up, just throttling us - back off instead of tripping the breaker
+                self.breaker.success()
+                self._back_off(resp)
+                return False
+            resp.raise_for_status()
+            data = resp.json()
+        except httpx.HTTPStatusError as e:
+            logger.warning(f"Unsplash API error: {e.response.status_code}")
+            self._failed()
+            return False
+        except Exception as e:
+            logger.warning(f"Unsplash fetch failed: {e}")
+            self._failed()
+            return False
+
+        self.breaker.success()
+        self._rate_limit_backoff = settings.IMAGE_RATE_LIMIT_BACKOFF_SECONDS
+        if data.get("results"):
+            return data["results"][0]["urls"]["regular"]
+        return None
+
+    def _failed(self):
+        self.stats["failures"] += 1
+        self.breaker.failure()
+
+    def _back_off(self, resp: httpx.Response):
+        """Pause all lookups until the rate limit window resets (exponential if no Retry-After)."""
+        self.stats["rate_limited"] += 1
+        retry_after = resp.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            delay = float(retry_after)
+        else:
+            delay = self._rate_limit_backoff
+            self._rate_limit_backoff = min(self._rate_limit_backoff * 2, 3600)
+        self.rate_limited_until = time.monotonic() + delay
+        logger.warning(f"Unsplash rate limited, pausing image lookups for {delay:.0f}s")
+
+    async def _load_persistent(self, key: str) -> Optional[str]:
+        from app.models.database import AsyncSessionLocal, ImageCacheEntry
+
+        try:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    select(ImageCacheEntry.image_url, ImageCacheEntry.fetched_at)
+                    .where(ImageCacheEntry.query == key)
+                )
+                row = result.first()
+        except Exception as e:
+            logger.warning(f"Image cache read failed: {e}")
+            return None
+        if row is None:
+            return None
+        if (datetime.utcnow() - row.fetched_at).total_seconds() > settings.IMAGE_CACHE_PERSISTENT_TTL_SECONDS:
+            return None
+        return row.image_url or _NO_IMAGE
+
+    async def _store_persistent(self, key: str, image_url: str):
+        from app.models.database import AsyncSessionLocal, ImageCacheEntry
+
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.merge(ImageCacheEntry(query=key, image_url=image_url, fetched_at=datetime.utcnow()))
+                await db.commit()
+        except Exception as e:
+            # Another worker may have stored it first - the in-memory cache still has it
+            logger.warning(f"Image cache write failed: {e}")
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "breaker": self.breaker.state,
+            "rate_limited_for_seconds": max(0.0, round(self.rate_limited_until - time.monotonic(), 1)),
+            "cache": self.cache.stats(),
+        }
+
+
+image_client = UnsplashImageClient()
+register_collector("images", image_client.snapshot)
+
 
 # This service fetches meal images from Unsplash to auto-populate recipe cards
 # It adds "healthy meal" to search queries to get fitness-focused food photos
@@ -21,34 +262,6 @@ async def get_meal_image(query: str) -> Optional[str]:
         query: The meal/recipe name to search for (e.g., "Chicken and Rice")
         
     Returns:
-        URL of the image, or None if not found or API not configured.
+        URL of the image, or None if not found, unavailable or API not configured.
     """
-    if not settings.UNSPLASH_ACCESS_KEY:
-        return None
-    
-    # Add fitness context to get healthier-looking food photos
-    search_query = f"{query} healthy meal"
-    print(f"Image search: '{query}' -> '{search_query}'")
-    
-    headers = {"Authorization": f"Client-ID {settings.UNSPLASH_ACCESS_KEY}"}
-    params = {
-        "query": search_query,
-        "per_page": 1,
-        "orientation": "landscape",
-        "content_filter": "high"
-    }
-    
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get(UNSPLASH_URL, params=params, headers=headers)
-            resp.raise_for_status()
-            data = resp.json()
-            
-            if data.get("results") and len(data["results"]) > 0:
-                return data["results"][0]["urls"]["regular"]
-    except httpx.HTTPStatusError as e:
-        print(f"Unsplash API error: {e.response.status_code}")
-    except Exception as e:
-        print(f"Unsplash fetch failed: {e}")
-    
-    return None
+    return await image_client.get_meal_image(query)
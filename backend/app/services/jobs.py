@@ -0,0 +1,244 @@
+"""
+Background jobs for slow work that shouldn't hold an HTTP request open
+(AI generation, Unsplash image enrichment).
+
+Backends (JOB_BACKEND):
+- "local":  asyncio task in the API process (default, no extra services)
+- "eager":  runs inline at submit time - deterministic, for tests
+- "celery": sent to the Celery broker and run by `celery -A app.worker worker`
+
+Job handlers are plain async functions registered with @job_handler.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import update
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.http_cache import bump_recipe_dependents, bump_versions
+from app.core.metrics import register_collector
+from app.models.database import AsyncSessionLocal, Recipe
+from app.schemas.schemas import JobResponse, RecipeCreate
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[..., Awaitable[Any]]
+_handlers: Dict[str, JobHandler] = {}
+
+
+def job_handler(kind: str):
+    """Register an async function as the handler for a job kind."""
+    def register(fn: JobHandler) -> JobHandler:
+        _handlers[kind] = fn
+        return fn
+    return register
+
+
+class JobStats:
+    """Per-kind counters and latency for jobs run in this process."""
+
+    def __init__(self):
+        self.kinds: Dict[str, Dict[str, Any]] = {}
+
+    def _kind(self, kind: str) -> Dict[str, Any]:
+        return self.kinds.setdefault(kind, {
+            "submitted": 0, "succeeded": 0, "failed": 0,
+            "queue_seconds_total": 0.0, "run_seconds_total": 0.0, "run_seconds_max": 0.0,
+        })
+
+    def submitted(self, kind: str):
+        self._kind(kind)["submitted"] += 1
+
+    def finished(self, kind: str, ok: bool, queued: float, ran: float):
+        stats = self._kind(kind)
+        stats["succeeded" if ok else "failed"] += 1
+        stats["queue_seconds_total"] += queued
+        stats["run_seconds_total"] += ran
+        stats["run_seconds_max"] = max(stats["run_seconds_max"], ran)
+
+    def snapshot(self) -> Dict[str, Any]:
+        snapshot = {}
+        for kind, stats in self.kinds.items():
+            done = stats["succeeded"] + stats["failed"]
+            snapshot[kind] = {
+                **{k: round(v, 4) if isinstance(v, float) else v for k, v in stats.items()},
+                "run_seconds_avg": round(stats["run_seconds_total"] / done, 4) if done else 0.0,
+            }
+        return snapshot
+
+
+job_stats = JobStats()
+
+
+async def run_job(kind: str, payload: Dict[str, Any], submitted_at: float) -> Any:
+    """Run a registered handler, recording latency. Used by every backend."""
+    started = time.time()
+    try:
+        result = await _handlers[kind](**payload)
+    except Exception:
+        job_stats.finished(kind, False, started - submitted_at, time.time() - started)
+        raise
+    job_stats.finished(kind, True, started - submitted_at, time.time() - started)
+    return result
+
+
+class LocalJobQueue:
+    """In-process backend. Job records live in a TTL cache on this worker only."""
+
+    def __init__(self, eager: bool = False):
+        self.eager = eager
+        self._jobs = TTLCache(maxsize=10000, ttl=settings.JOB_RESULT_TTL_SECONDS)
+        self._tasks = set()  # Strong references so running tasks aren't garbage collected
+
+    async def submit(self, kind: str, payload: Dict[str, Any], user_id: Optional[int] = None) -> JobResponse:
+        job = JobResponse(job_id=str(uuid.uuid4()), kind=kind, status="queued")
+        self._jobs.set(job.job_id, (user_id, job))
+        job_stats.submitted(kind)
+
+        submitted_at = time.time()
+        if self.eager:
+            await self._run(job, payload, submitted_at)
+        else:
+            task = asyncio.create_task(self._run(job, payload, submitted_at))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run(self, job: JobResponse, payload: Dict[str, Any], submitted_at: float):
+        job.status = "running"
+        try:
+            job.result = await run_job(job.kind, payload, submitted_at)
+            job.status = "succeeded"
+        except Exception as e:
+            logger.error(f"Job {job.kind} {job.job_id} failed: {e}")
+            job.status = "failed"
+            job.error = str(e) or type(e).__name__
+
+    async def get(self, job_id: str, user_id: Optional[int] = None) -> Optional[JobResponse]:
+        entry = self._jobs.get(job_id)
+        if entry is None or entry[0] != user_id:
+            return None
+        return entry[1]
+
+
+class CeleryJobQueue:
+    """Broker-backed backend. Status and results come from the Celery result backend.
+
+    Each job's owner and kind are stored next to its result at submit time, so a
+    job is only visible to its owner in every state, not just once it succeeds.
+    Needs a key-value result backend (Redis, the default).
+    """
+
+    _states = {"PENDING": "queued", "RECEIVED": "queued", "RETRY": "queued",
+               "STARTED": "running", "SUCCESS": "succeeded", "FAILURE": "failed"}
+
+    OWNER_PREFIX = "gymfuel-job-owner-"
+
+    def __init__(self):
+        from app.worker import celery_app
+
+        self.celery_app = celery_app
+
+    async def submit(self, kind: str, payload: Dict[str, Any], user_id: Optional[int] = None) -> JobResponse:
+        job_id = str(uuid.uuid4())
+
+        def send():
+            # Owner first, so the job is never visible without one. The backend
+            # expires the record with the results (result_expires).
+            self.celery_app.backend.set(
+                self.OWNER_PREFIX + job_id, json.dumps({"user_id": user_id, "kind": kind}),
+            )
+            self.celery_app.send_task(
+                "gymfuel.run_job", args=[kind, payload, user_id, time.time()], task_id=job_id,
+            )
+
+        # Both talk to Redis synchronously - keep them off the event loop
+        await asyncio.to_thread(send)
+        job_stats.submitted(kind)
+        return JobResponse(job_id=job_id, kind=kind, status="queued")
+
+    async def get(self, job_id: str, user_id: Optional[int] = None) -> Optional[JobResponse]:
+        def fetch():
+            owner = self.celery_app.backend.get(self.OWNER_PREFIX + job_id)
+            if owner is None:
+                return None, None, None
+            result = self.celery_app.AsyncResult(job_id)
+            return json.loads(owner), result.state, result.result
+
+        owner, state, value = await asyncio.to_thread(fetch)
+        # Unknown, expired or someone else's job - the same answer in every state
+        if owner is None or owner["user_id"] != user_id:
+            return None
+        job = JobResponse(job_id=job_id, kind=owner["kind"], status=self._states.get(state, "queued"))
+        if job.status == "succeeded":
+            job.result = value["result"]
+        elif job.status == "failed":
+            job.error = str(value)
+        return job
+
+
+def build_job_queue():
+    if settings.JOB_BACKEND == "celery":
+        return CeleryJobQueue()
+    return LocalJobQueue(eager=settings.JOB_BACKEND == "eager")
+
+
+job_queue = build_job_queue()
+register_collector("jobs", lambda: {"backend": settings.JOB_BACKEND, "kinds": job_stats.snapshot()})
+
+
+# ============ Job handlers ============
+
+@job_handler("recipes.generate")
+async def generate_recipe(prompt: str, dietary_restrictions: Optional[str] = None):
+    from app.services.llm_service import llm_service
+
+    recipe_data = await llm_service.generate_recipe(prompt, dietary_restrictions)
+    return RecipeCreate(**recipe_data).model_dump()
+
+
+@job_handler("recipes.suggest")
+async def suggest_recipes(pantry_items: Optional[list] = None, preferences: Optional[str] = None,
+                          user_id: Optional[int] = None):
+    """Saved recipes the pantry covers if there are good ones, otherwise ask the LLM."""
+    from app.services.llm_service import LLMUnavailable, llm_service
+    from app.services.pantry_service import pantry_suggestions
+
+    local = {"source": "pantry", "suggestions": []}
+    if user_id is not None:
+        async with AsyncSessionLocal() as db:
+            local["suggestions"] = await pantry_suggestions(db, user_id, pantry_items)
+        if any(s["coverage"] >= settings.MATCH_MIN_COVERAGE for s in local["suggestions"]):
+            return local
+    try:
+        return {**await llm_service.suggest_recipes(pantry_items, preferences), "source": "llm"}
+    except LLMUnavailable:
+        if local["suggestions"]:
+            return local
+        raise
+
+
+@job_handler("recipes.enrich_image")
+async def enrich_recipe_image(recipe_id: int, title: str):
+    """Look up an Unsplash image and patch it onto a recipe that still has none."""
+    from app.services.image_service import get_meal_image
+
+    image_url = await get_meal_image(title)
+    if image_url:
+        async with AsyncSessionLocal() as db:
+            owner = (await db.execute(
+                update(Recipe)
+                .where(Recipe.id == recipe_id, Recipe.image_url.is_(None))
+                .values(image_url=image_url)
+                .returning(Recipe.user_id)
+            )).scalar_one_or_none()
+            if owner is not None:
+                await bump_versions(db, owner, "recipes")
+                await bump_recipe_dependents(db, recipe_id)
+            await db.commit()
+    return {"recipe_id": recipe_id, "image_url": image_url}
@@ -0,0 +1,246 @@
+"""
+LLM service for AI recipe generation and suggestions.
+
+Calls are non-blocking, capped in concurrency and bounded by a timeout. Responses
+are cached by a content hash of the normalized request (prompt, dietary
+restrictions, pantry items), so repeated/popular prompts return instantly.
+
+The provider is pluggable: Gemini in production, a local stub for tests and
+benchmarks (LLM_PROVIDER=stub).
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import re
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import register_collector
+
+logger = logging.getLogger(__name__)
+
+RECIPE_SYSTEM_PROMPT = """You are a fitness nutrition expert and chef specializing in high-protein meals for gym-goers.
+    Generate recipes that prioritise protein (aim for 30-50g per serving) and support muscle growth/recovery.
+    Return the recipe ONLY as a valid JSON object with this exact structure (no markdown, no text before/after):
+    {
+        "title": "Recipe Name",
+        "description": "Brief description highlighting protein content and fitness benefits",
+        "instructions": "Step by step instructions",
+        "prep_time": 30,
+        "cook_time": 45,
+        "servings": 4,
+        "difficulty": "easy",
+        "ingredients": [{"name": "ingredient", "quantity": 1, "unit": "cup"}],
+        "tags": ["high-protein", "gym-fuel", "muscle-building"],
+        "nutritional_info": {"calories": 500, "protein": 40, "carbs": 30, "fat": 15}
+    }"""
+
+SUGGEST_SYSTEM_PROMPT = """You are a fitness nutrition expert who suggests HIGH-PROTEIN recipes for gym-goers.
+    Return suggestions ONLY as a valid JSON object (no markdown) with this structure:
+    {"suggestions": [{"title": "Recipe Name", "description": "Brief description with estimated protein content", "protein_estimate": "40g"}]}
+    Provide exactly 3 suggestions. Each must be high in protein (30g+ per serving)."""
+
+
+class LLMUnavailable(Exception):
+    """No provider configured."""
+
+
+class LLMTimeout(Exception):
+    """The provider did not answer within LLM_TIMEOUT_SECONDS."""
+
+
+class LLMError(Exception):
+    """The provider failed or returned something that isn't the expected JSON."""
+
+
+class LLMProvider(ABC):
+    """Interface: turn a prompt into raw model text."""
+
+    name = "base"
+
+    @abstractmethod
+    async def generate(self, prompt: str) -> str:
+        ...
+
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+
+    def __init__(self, api_key: str, model_name: str):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self._model = genai.GenerativeModel(model_name)
+
+    async def generate(self, prompt: str) -> str:
+        response = await self._model.generate_content_async(prompt)
+        return response.text
+
+
+class StubProvider(LLMProvider):
+    """Deterministic local provider for tests and benchmarks."""
+
+    name = "stub"
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+
+    async def generate(self, prompt: str) -> str:
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        request = prompt.rsplit("User request:", 1)[-1].strip()
+        if prompt.startswith(SUGGEST_SYSTEM_PROMPT):
+            return json.dumps({"suggestions": [
+                {"title": f"Stub Suggestion {i}", "description": request[:80], "protein_estimate": "40g"}
+                for i in range(1, 4)
+            ]})
+        return json.dumps({
+            "title": "Stub Protein Bowl",
+            "description": request[:200],
+            "instructions": "1. Cook the protein. 2. Serve.",
+            "prep_time": 10,
+            "cook_time": 20,
+            "servings": 2,
+            "difficulty": "easy",
+            "ingredients": [{"name": "chicken breast", "quantity": 300, "unit": "g"}],
+            "tags": ["high-protein", "gym-fuel"],
+            "nutritional_info": {"calories": 450, "protein": 45, "carbs": 30, "fat": 12},
+        })
+
+
+def _normalize_text(value: Optional[str]) -> str:
+    return re.sub(r"\s+", " ", value or "").strip().lower()
+
+
+def _normalize_list(values: Optional[Iterable[str]]) -> List[str]:
+    return sorted({_normalize_text(v) for v in values or [] if _normalize_text(v)})
+
+
+def cache_key(kind: str, prompt: Optional[str], restrictions: Optional[Iterable[str]] = None,
+              pantry_items: Optional[Iterable[str]] = None) -> str:
+    """Content address of a request - equivalent requests hash the same."""
+    normalized = json.dumps(
+        [kind, _normalize_text(prompt), _normalize_list(restrictions), _normalize_list(pantry_items)]
+    )
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def parse_json_response(response_text: str) -> Dict[str, Any]:
+    response_text = response_text.strip()
+
+    # Clean potential markdown code blocks
+    if response_text.startswith("```"):
+        response_text = response_text.split("```")[1]
+        if response_text.startswith("json"):
+            response_text = response_text[4:]
+    response_text = response_text.strip()
+
+    try:
+        return json.loads(response_text)
+    except json.JSONDecodeError as e:
+        raise LLMError(f"Failed to parse model JSON: {e}")
+
+
+class LLMService:
+    def __init__(self, provider: Optional[LLMProvider], timeout: float, max_concurrency: int,
+                 cache: TTLCache):
+        self.provider = provider
+        self.timeout = timeout
+        self.cache = cache
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.calls = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    async def _complete(self, key: str, prompt: str) -> Dict[str, Any]:
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        if self.provider is None:
+            raise LLMUnavailable()
+
+        self.calls += 1
+        try:
+            # The timeout covers waiting for a concurrency slot as well as the call
+            async with asyncio.timeout(self.timeout):
+                async with self._semaphore:
+                    self.in_flight += 1
+                    try:
+                        text = await self.provider.generate(prompt)
+                    finally:
+                        self.in_flight -= 1
+        except TimeoutError:
+            self.timeouts += 1
+            raise LLMTimeout()
+        except Exception as e:
+            self.errors += 1
+            raise LLMError(str(e))
+
+        try:
+            data = parse_json_response(text)
+        except LLMError:
+            self.errors += 1
+            raise
+        self.cache.set(key, data, size=len(text.encode("utf-8")))
+        return data
+
+    async def generate_recipe(self, prompt: str, dietary_restrictions: Optional[str] = None) -> Dict[str, Any]:
+        restrictions = dietary_restrictions.split(",") if dietary_restrictions else []
+        restrictions_text = ""
+        if restrictions:
+            restrictions_text = f"Dietary restrictions: {', '.join(_normalize_list(restrictions))}. "
+
+        user_prompt = f"Generate a HIGH PROTEIN recipe for: {_normalize_text(prompt)}. {restrictions_text}Focus on lean proteins and whole foods ideal for gym-goers."
+        return await self._complete(
+            cache_key("recipe", prompt, restrictions),
+            f"{RECIPE_SYSTEM_PROMPT}\n\nUser request: {user_prompt}",
+        )
+
+    async def suggest_recipes(self, pantry_items: Optional[List[str]] = None,
+                              preferences: Optional[str] = None) -> Dict[str, Any]:
+        items = _normalize_list(pantry_items)
+        pantry_text = f"Pantry items: {', '.join(items) if items else 'No specific items'}."
+        pref_text = f"Preferences: {_normalize_text(preferences)}" if preferences else ""
+
+        user_prompt = f"{pantry_text} {pref_text} Suggest 3 high-protein recipes I can make for muscle building."
+        return await self._complete(
+            cache_key("suggest", preferences, pantry_items=items),
+            f"{SUGGEST_SYSTEM_PROMPT}\n\nUser request: {user_prompt}",
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "provider": self.provider.name if self.provider else None,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "calls": self.calls,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "cache": self.cache.stats(),
+        }
+
+
+def build_provider() -> Optional[LLMProvider]:
+    if settings.LLM_PROVIDER == "stub":
+        return StubProvider()
+    if settings.LLM_PROVIDER == "gemini" and settings.GEMINI_API_KEY:
+        return GeminiProvider(settings.GEMINI_API_KEY, settings.GEMINI_MODEL)
+    return None
+
+
+llm_service = LLMService(
+    provider=build_provider(),
+    timeout=settings.LLM_TIMEOUT_SECONDS,
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    cache=TTLCache(
+        maxsize=settings.LLM_CACHE_MAX_ENTRIES, ttl=settings.LLM_CACHE_TTL_SECONDS, maxbytes=settings.LLM_CACHE_MAX_BYTES,
+    ),
+)
+register_collector("llm", llm_service.stats)
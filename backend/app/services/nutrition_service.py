@@ -0,0 +1,215 @@
+"""
+Nutrition helpers shared by the coach dashboard, meal views and recipe filters,
+plus the daily rollup behind /api/meals/nutrition.
+
+Macros live in the free-form Recipe.nutritional_info JSON (per serving). These
+helpers extract them as SQL expressions so totals are computed in the database.
+
+Rollup: nutrition_daily holds per-user, per-day totals of the meals that have a
+recipe (one serving each). Routers call refresh_daily_totals() for the days a
+change touches, inside the same transaction, which recomputes just those rows
+from meals + recipes. rebuild_daily_totals() / check_daily_totals() back the
+nutrition_rollup.py command.
+"""
+import re
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from sqlalchemy import Float, and_, case, cast, delete, func, literal, literal_column, or_, select, true, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+from app.models.database import Meal, NutritionDaily, Recipe
+
+MACROS = ("calories", "protein", "carbs", "fat")
+
+
+def macro_expression(dialect_name: str, macro: str):
+    """Numeric macro from Recipe.nutritional_info; NULL when missing or not a number."""
+    if dialect_name == "postgresql":
+        # Keys and the type name are inlined rather than bound so the rendered
+        # expression matches the ix_recipes_user_<macro> expression indexes
+        # (migration 0005). Guard the cast - hand-edited JSON may hold "40g".
+        if macro not in MACROS:
+            raise ValueError(f"Unknown macro: {macro}")
+        value = Recipe.nutritional_info.op("->")(literal_column(f"'{macro}'"))
+        return case((func.jsonb_typeof(value) == literal_column("'number'"), cast(value, Float)))
+    return case((
+        func.json_type(Recipe.nutritional_info, f"$.{macro}").in_(("integer", "real")),
+        Recipe.nutritional_info[macro].as_float(),
+    ))
+
+
+# ============ Daily rollup ============
+
+ROLLUP_COLUMNS = ("user_id", "date", "meals", *MACROS, "updated_at")
+MAX_RANGE_DAYS = 366
+_RELATIVE_RANGE = re.compile(r"^(\d+)([dw])$")
+
+
+def daily_totals_query(dialect_name: str) -> Select:
+    """Fresh per-(user, date) meal count and macro totals from meals + recipes."""
+    return (
+        select(
+            Meal.user_id,
+            Meal.date,
+            func.count(Meal.id),
+            *[func.coalesce(func.sum(macro_expression(dialect_name, macro)), 0) for macro in MACROS],
+        )
+        .join(Recipe, Recipe.id == Meal.recipe_id)
+        .group_by(Meal.user_id, Meal.date)
+    )
+
+
+async def _replace_rows(db: AsyncSession, rollup_scope, source_scope):
+    """Upsert fresh totals for the days in scope and delete rows for days with no meals left.
+
+    Rows are never deleted and re-inserted, so two transactions refreshing the
+    same day serialize on its row instead of racing to insert it.
+    """
+    dialect_name = db.get_bind().dialect.name
+    has_meals = (
+        select(Meal.id)
+        .join(Recipe, Recipe.id == Meal.recipe_id)
+        .where(Meal.user_id == NutritionDaily.user_id, Meal.date == NutritionDaily.date)
+        .exists()
+    )
+    await db.execute(delete(NutritionDaily).where(rollup_scope, ~has_meals))
+
+    fresh = daily_totals_query(dialect_name).where(source_scope)
+    insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    stmt = insert(NutritionDaily).from_select(
+        ROLLUP_COLUMNS, fresh.add_columns(literal(datetime.utcnow(), NutritionDaily.updated_at.type))
+    )
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[NutritionDaily.user_id, NutritionDaily.date],
+        set_={name: stmt.excluded[name] for name in ROLLUP_COLUMNS[2:]},
+    ))
+
+
+async def refresh_daily_totals(db: AsyncSession, days: Union[Iterable[Tuple[int, date]], Select]):
+    """Recompute the rollup rows for (user_id, date) pairs - a list, or a select of pairs."""
+    if not isinstance(days, Select):
+        days = {(user_id, day) for user_id, day in days if user_id is not None and day is not None}
+        if not days:
+            return
+        days = list(days)
+    await db.flush()  # sessions don't autoflush; pending meal changes must be visible
+    await _replace_rows(
+        db,
+        tuple_(NutritionDaily.user_id, NutritionDaily.date).in_(days),
+        tuple_(Meal.user_id, Meal.date).in_(days),
+    )
+
+
+def recipe_days(recipe_id: int) -> Select:
+    """(user_id, date) pairs of every meal using a recipe."""
+    return select(Meal.user_id, Meal.date).where(Meal.recipe_id == recipe_id).distinct()
+
+
+async def rebuild_daily_totals(db: AsyncSession, user_id: Optional[int] = None) -> int:
+    """Recompute the rollup from scratch (all users or one); returns the row count."""
+    await _replace_rows(
+        db,
+        NutritionDaily.user_id == user_id if user_id is not None else true(),
+        Meal.user_id == user_id if user_id is not None else true(),
+    )
+    query = select(func.count()).select_from(NutritionDaily)
+    if user_id is not None:
+        query = query.where(NutritionDaily.user_id == user_id)
+    return (await db.execute(query)).scalar()
+
+
+async def check_daily_totals(db: AsyncSession, user_id: Optional[int] = None,
+                             tolerance: float = 0.01) -> List[Dict[str, Any]]:
+    """Rollup rows that disagree with a fresh aggregate: wrong, missing or stale."""
+    fresh = daily_totals_query(db.get_bind().dialect.name)
+    if user_id is not None:
+        fresh = fresh.where(Meal.user_id == user_id)
+    fresh = fresh.subquery()
+    fresh_user, fresh_date, fresh_meals, *fresh_macros = fresh.c
+
+    differs = or_(
+        NutritionDaily.user_id.is_(None),
+        NutritionDaily.meals != fresh_meals,
+        *[func.abs(getattr(NutritionDaily, macro) - column) > tolerance for macro, column in zip(MACROS, fresh_macros)],
+    )
+    join = and_(NutritionDaily.user_id == fresh_user, NutritionDaily.date == fresh_date)
+    mismatches = []
+    for row in await db.execute(
+        select(fresh_user, fresh_date, fresh_meals, NutritionDaily.meals).outerjoin(NutritionDaily, join).where(differs)
+    ):
+        mismatches.append({
+            "user_id": row[0], "date": row[1], "expected_meals": row[2],
+            "problem": "missing" if row[3] is None else "mismatch",
+        })
+
+    stale = select(NutritionDaily.user_id, NutritionDaily.date).outerjoin(fresh, join).where(fresh_user.is_(None))
+    if user_id is not None:
+        stale = stale.where(NutritionDaily.user_id == user_id)
+    for row in await db.execute(stale):
+        mismatches.append({"user_id": row[0], "date": row[1], "expected_meals": 0, "problem": "stale"})
+    return mismatches
+
+
+def parse_range(value: str, today: Optional[date] = None) -> Tuple[date, date]:
+    """'7d' / '4w' (ending today) or 'YYYY-MM-DD..YYYY-MM-DD' -> (start, end)."""
+    today = today or date.today()
+    relative = _RELATIVE_RANGE.match(value.strip())
+    if relative:
+        count, unit = int(relative.group(1)), relative.group(2)
+        days = count * 7 if unit == "w" else count
+        if days < 1:
+            raise ValueError("Range must cover at least one day")
+        start, end = today - timedelta(days=days - 1), today
+    else:
+        try:
+            start_text, end_text = value.split("..")
+            start, end = date.fromisoformat(start_text.strip()), date.fromisoformat(end_text.strip())
+        except ValueError:
+            raise ValueError("Range must look like 7d, 4w or YYYY-MM-DD..YYYY-MM-DD")
+    if end < start:
+        raise ValueError("Range end is before its start")
+    if (end - start).days + 1 > MAX_RANGE_DAYS:
+        raise ValueError(f"Range is limited to {MAX_RANGE_DAYS} days")
+    return start, end
+
+
+def _period(start: date, end: date, rows: List[NutritionDaily]) -> Dict[str, Any]:
+    period = {"start_date": start, "end_date": end, "meals": sum(r.meals for r in rows)}
+    for macro in MACROS:
+        period[macro] = round(sum(getattr(r, macro) for r in rows), 1)
+    return period
+
+
+async def nutrition_summary(db: AsyncSession, user_id: int, start: date, end: date, group: str = "day") -> Dict[str, Any]:
+    """Daily or weekly (Monday-based) totals for a date range, read from the rollup."""
+    result = await db.execute(
+        select(NutritionDaily)
+        .where(NutritionDaily.user_id == user_id, NutritionDaily.date >= start, NutritionDaily.date <= end)
+        .order_by(NutritionDaily.date)
+    )
+    by_day = {row.date: row for row in result.scalars()}
+
+    periods = []
+    period_start = start
+    while period_start <= end:
+        if group == "week":
+            period_end = min(period_start + timedelta(days=6 - period_start.weekday()), end)
+        else:
+            period_end = period_start
+        rows = [by_day[d] for d in by_day if period_start <= d <= period_end]
+        periods.append(_period(period_start, period_end, rows))
+        period_start = period_end + timedelta(days=1)
+
+    totals = _period(start, end, list(by_day.values()))
+    days = (end - start).days + 1
+    return {
+        "start_date": start,
+        "end_date": end,
+        "group": group,
+        "periods": periods,
+        "totals": totals,
+        "daily_average": {macro: round(totals[macro] / days, 1) for macro in MACROS},
+    }
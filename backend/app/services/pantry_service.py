@@ -0,0 +1,252 @@
+"""
+Pantry-to-recipe matching: which saved recipes can be cooked from what's in the
+pantry, favouring ones that use up items about to expire.
+
+Each user's recipes are indexed once per `recipes` collection version (see
+recipe_index) as bitsets: every normalized ingredient name maps to a Python int with
+bit i set when recipe i uses it. Matching a pantry then works on whole bitsets -
+covered ingredient masks are summed into bit-sliced counters, and recipes are
+ranked by walking (points, size) buckets best-first - so a query touches each
+relevant ingredient once instead of looping over every recipe.
+
+Score = (2 * covered + expiring) / (2 * size): 1.0 means every ingredient is in
+the pantry; each covered ingredient that is expiring soon adds a half point.
+"""
+import re
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.database import GroceryItem, Recipe
+from app.services.recipe_index import RecipeIndexCache, fold_plural
+
+_WORD = re.compile(r"[a-z]+")
+_PARENTHETICAL = re.compile(r"\([^)]*\)")
+# Preparation/size words that don't change what the ingredient is
+DESCRIPTORS = frozenset(
+    "fresh frozen chopped diced sliced minced grated shredded boneless skinless large small medium "
+    "organic raw cooked whole of a an and or to taste optional".split()
+)
+
+
+def normalize_ingredient(name: Optional[str]) -> str:
+    """'Boneless Chicken Breasts (diced)' -> 'chicken breast'."""
+    words = _WORD.findall(_PARENTHETICAL.sub(" ", (name or "").lower()))
+    return " ".join(fold_plural(w) for w in words if w not in DESCRIPTORS)
+
+
+def _add(planes: List[int], mask: int, start: int = 0):
+    """Add `mask` (weighted 2**start) into the bit-sliced counters `planes`."""
+    carry, i = mask, start
+    while carry:
+        while len(planes) <= i:
+            planes.append(0)
+        planes[i], carry = planes[i] ^ carry, planes[i] & carry
+        i += 1
+
+
+def _equal(planes: List[int], value: int, universe: int) -> int:
+    """Mask of positions whose counter equals `value`."""
+    if value >> len(planes):
+        return 0
+    mask = universe
+    for i, plane in enumerate(planes):
+        mask &= plane if value >> i & 1 else ~plane
+        if not mask:
+            break
+    return mask
+
+
+def _positions(mask: int) -> Iterable[int]:
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+@dataclass
+class Match:
+    recipe_id: int
+    score: float
+    coverage: float
+    matched: List[str] = field(default_factory=list)
+    missing: List[str] = field(default_factory=list)
+    expiring: List[str] = field(default_factory=list)
+
+
+class PantryIndex:
+    """Bitset index of one user's recipes by normalized ingredient name."""
+
+    def __init__(self):
+        self.recipe_ids: List[int] = []
+        self.recipe_names: List[Tuple[str, ...]] = []
+        self.names: Dict[str, int] = {}          # ingredient -> recipe bitset
+        self.tokens: Dict[str, Set[str]] = {}    # word -> ingredients containing it
+        self.sizes: Dict[int, int] = {}          # ingredient count -> recipe bitset
+        self._bucket_order = None
+
+    def __len__(self) -> int:
+        return len(self.recipe_ids)
+
+    def add(self, recipe_id: int, ingredients: Optional[list]):
+        names = tuple(dict.fromkeys(
+            n for n in (normalize_ingredient(i.get("name")) for i in ingredients or [] if isinstance(i, dict)) if n
+        ))
+        if not names:
+            return  # nothing to match against
+        bit = 1 << len(self.recipe_ids)
+        self.recipe_ids.append(recipe_id)
+        self.recipe_names.append(names)
+        for name in names:
+            self.names[name] = self.names.get(name, 0) | bit
+            for word in name.split():
+                self.tokens.setdefault(word, set()).add(name)
+        if len(names) not in self.sizes:
+            self._bucket_order = None
+        self.sizes[len(names)] = self.sizes.get(len(names), 0) | bit
+
+    def covered(self, pantry_item: str) -> Set[str]:
+        """Recipe ingredients a pantry item stands in for: 'chicken' covers 'chicken thigh'."""
+        words = normalize_ingredient(pantry_item).split()
+        if not words:
+            return set()
+        found = set(self.tokens.get(words[0], ()))
+        for word in words[1:]:
+            found &= self.tokens.get(word, set())
+        return found
+
+    def match(self, pantry: Iterable[str], expiring: Iterable[str] = (), limit: int = 10,
+              min_coverage: float = 0.0) -> List[Match]:
+        covered: Set[str] = set()
+        for item in pantry:
+            covered |= self.covered(item)
+        expiring_covered: Set[str] = set()
+        for item in expiring:
+            expiring_covered |= self.covered(item)
+        covered |= expiring_covered
+        if not covered or not self.recipe_ids:
+            return []
+
+        # points(recipe) = 2 * covered + expiring, as bit-sliced counters
+        planes: List[int] = []
+        for name in covered:
+            _add(planes, self.names[name], start=1)
+        for name in expiring_covered:
+            _add(planes, self.names[name])
+        candidates = 0
+        for plane in planes:
+            candidates |= plane
+
+        # Walk (points, size) buckets from the best score down. score >= coverage,
+        # so buckets below min_coverage can't hold a qualifying recipe.
+        members_by_size = {size: self.sizes[size] & candidates for size in self.sizes}
+        results: List[Match] = []
+        for score, points, size in self._buckets():
+            if len(results) >= limit or score < min_coverage:
+                break
+            members = members_by_size[size]
+            if not members:
+                continue
+            for position in _positions(_equal(planes, points, members)):
+                match = self._describe(position, covered, expiring_covered, score)
+                if match.coverage >= min_coverage:
+                    results.append(match)
+                if len(results) >= limit:
+                    break
+        return results
+
+    def _buckets(self) -> List[Tuple[float, int, int]]:
+        """Every reachable (score, points, size), best score first; smaller recipes win ties."""
+        if self._bucket_order is None:
+            self._bucket_order = sorted(
+                ((points / (2 * size), points, size) for size in self.sizes for points in range(1, 3 * size + 1)),
+                key=lambda bucket: (-bucket[0], bucket[2]),
+            )
+        return self._bucket_order
+
+    def _describe(self, position: int, covered: Set[str], expiring: Set[str], score: float) -> Match:
+        names = self.recipe_names[position]
+        matched = [n for n in names if n in covered]
+        return Match(
+            recipe_id=self.recipe_ids[position],
+            score=round(score, 4),
+            coverage=round(len(matched) / len(names), 4),
+            matched=matched,
+            missing=[n for n in names if n not in covered],
+            expiring=[n for n in names if n in expiring],
+        )
+
+
+async def _build_index(db: AsyncSession, user_id: int) -> PantryIndex:
+    index = PantryIndex()
+    result = await db.execute(
+        select(Recipe.id, Recipe.ingredients).where(Recipe.user_id == user_id).order_by(Recipe.id)
+    )
+    for recipe_id, ingredients in result:
+        index.add(recipe_id, ingredients)
+    return index
+
+
+# user_id -> PantryIndex of that user's recipes at their current recipes version
+_user_indexes = RecipeIndexCache(_build_index)
+
+
+async def get_pantry_index(db: AsyncSession, user_id: int) -> PantryIndex:
+    return await _user_indexes.get(db, user_id)
+
+
+async def load_pantry(db: AsyncSession, user_id: int) -> Tuple[List[str], List[str]]:
+    """(in-date item names, names expiring within MATCH_EXPIRING_DAYS) from the user's groceries."""
+    today = date.today()
+    soon = today + timedelta(days=settings.MATCH_EXPIRING_DAYS)
+    result = await db.execute(
+        select(GroceryItem.name, GroceryItem.expiration_date).where(GroceryItem.user_id == user_id)
+    )
+    pantry, expiring = [], []
+    for name, expiration_date in result:
+        if expiration_date is None or expiration_date > soon:
+            pantry.append(name)
+        elif expiration_date >= today:
+            expiring.append(name)
+    return pantry, expiring
+
+
+async def match_recipes(db: AsyncSession, user_id: int, pantry_items: Optional[List[str]] = None,
+                        limit: int = 10, min_coverage: float = 0.0) -> List[Match]:
+    """Best recipes for the user's groceries (or an explicit pantry list), best first."""
+    if pantry_items:
+        pantry, expiring = pantry_items, []
+    else:
+        pantry, expiring = await load_pantry(db, user_id)
+    index = await get_pantry_index(db, user_id)
+    return index.match(pantry, expiring, limit=limit, min_coverage=min_coverage)
+
+
+async def load_matched_recipes(db: AsyncSession, matches: List[Match]) -> List[Tuple[Recipe, Match]]:
+    """Fetch the recipes behind `matches`, keeping their order."""
+    if not matches:
+        return []
+    result = await db.execute(select(Recipe).where(Recipe.id.in_([m.recipe_id for m in matches])))
+    recipes = {r.id: r for r in result.scalars()}
+    return [(recipes[m.recipe_id], m) for m in matches if m.recipe_id in recipes]
+
+
+async def pantry_suggestions(db: AsyncSession, user_id: int, pantry_items: Optional[List[str]] = None,
+                             limit: int = 3) -> List[Dict[str, Any]]:
+    """Top pantry matches in the shape of AI suggestions (the tier before the LLM)."""
+    suggestions = []
+    for recipe, match in await load_matched_recipes(db, await match_recipes(db, user_id, pantry_items, limit)):
+        protein = (recipe.nutritional_info or {}).get("protein")
+        suggestions.append({
+            "title": recipe.title,
+            "description": recipe.description,
+            "protein_estimate": f"{protein}g" if isinstance(protein, (int, float)) else protein,
+            "recipe_id": recipe.id,
+            "coverage": match.coverage,
+            "missing": match.missing,
+        })
+    return suggestions
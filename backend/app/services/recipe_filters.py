@@ -0,0 +1,65 @@
+"""
+Structured recipe filters: tags, ingredient names and macro ranges.
+
+Each helper returns a single WHERE clause. On Postgres they are JSONB
+containment/existence predicates and comparisons on macro expressions, all
+served by the indexes from migration 0005. Elsewhere (SQLite) they fall back to
+json_each subqueries with the same semantics.
+"""
+from typing import List, Optional
+
+from sqlalchemy import and_, exists, func, literal, literal_column, select, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB, array
+
+from app.models.database import Recipe
+from app.services.nutrition_service import macro_expression
+
+# Lower-cased ingredient names as a JSONB array, e.g. ["chicken", "rice"].
+# Must stay textually identical to the ix_recipes_ingredient_names index.
+INGREDIENT_NAMES_SQL = "(lower(jsonb_path_query_array(recipes.ingredients, '$[*].name')::text)::jsonb)"
+
+
+def split_terms(value: Optional[str], lower: bool = False) -> List[str]:
+    """Comma-separated query parameter to a de-duplicated list of terms."""
+    terms = []
+    for term in (value or "").split(","):
+        term = term.strip().lower() if lower else term.strip()
+        if term and term not in terms:
+            terms.append(term)
+    return terms
+
+
+def _json_each_match(column, terms: List[str], match_all: bool, key: Optional[str] = None):
+    elements = func.json_each(column).table_valued("value")
+    value = func.lower(func.json_extract(elements.c.value, f"$.{key}")) if key else elements.c.value
+    if not match_all:
+        return exists(select(literal_column("1")).select_from(elements).where(value.in_(terms)))
+    matched = select(func.count(func.distinct(value))).select_from(elements).where(value.in_(terms))
+    return matched.scalar_subquery() == len(terms)
+
+
+def tag_filter(dialect_name: str, tags: List[str], match: str = "all"):
+    """Recipes tagged with all (or any) of `tags`."""
+    if dialect_name == "postgresql":
+        column = type_coerce(Recipe.tags, JSONB)
+        # tags @> '["a","b"]' / tags ?| array['a','b'] - both use the GIN index
+        return column.contains(tags) if match == "all" else column.has_any(array(tags))
+    return _json_each_match(Recipe.tags, tags, match == "all")
+
+
+def ingredient_filter(dialect_name: str, names: List[str]):
+    """Recipes whose ingredient list names every entry of `names` (case-insensitive)."""
+    if dialect_name == "postgresql":
+        return literal_column(INGREDIENT_NAMES_SQL, type_=JSONB).contains(literal(names, JSONB))
+    return _json_each_match(Recipe.ingredients, names, True, key="name")
+
+
+def macro_range_filter(dialect_name: str, macro: str, minimum: Optional[float], maximum: Optional[float]):
+    """Per-serving macro within [minimum, maximum]; recipes without the macro never match."""
+    value = macro_expression(dialect_name, macro)
+    clauses = []
+    if minimum is not None:
+        clauses.append(value >= minimum)
+    if maximum is not None:
+        clauses.append(value <= maximum)
+    return and_(*clauses)
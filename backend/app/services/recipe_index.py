@@ -0,0 +1,52 @@
+"""
+Per-user in-process indexes over a user's recipes (pantry matching, the search
+fallback) and the plural folding their tokenizers share.
+
+An index is cached together with the user's `recipes` collection version it
+was built at, and reused only while that version is current. Every recipe
+write bumps the version in its own transaction (`bump_versions`), so a write
+committed by any worker or background job retires the index in every process
+on its next use - one primary-key lookup, no mapper events, no flush timing.
+"""
+from typing import Awaitable, Callable, Generic, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.http_cache import collection_version
+
+T = TypeVar("T")
+
+
+def fold_plural(word: str) -> str:
+    """Light plural folding: eggs -> egg, tomatoes -> tomato, berries -> berry."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 4 and word.endswith("oes"):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+class RecipeIndexCache(Generic[T]):
+    """user_id -> (recipes version, index), rebuilt by `build(db, user_id)` when the version moves."""
+
+    def __init__(self, build: Callable[[AsyncSession, int], Awaitable[T]], maxsize: int = 256, ttl: float = 3600):
+        self.build = build
+        # The TTL only retires idle users' indexes - freshness comes from the version
+        self._indexes = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, db: AsyncSession, user_id: int) -> T:
+        # Read the version before the recipes: a write landing in between makes
+        # the index newer than its version, which only costs one extra rebuild
+        version, _ = await collection_version(db, user_id, "recipes")
+        entry = self._indexes.get(user_id)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        index = await self.build(db, user_id)
+        self._indexes.set(user_id, (version, index))
+        return index
+
+    def clear(self):
+        self._indexes.clear()
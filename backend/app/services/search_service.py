@@ -0,0 +1,210 @@
+"""
+Recipe search: ranked full-text matches with typo tolerance and highlighted snippets.
+
+Postgres: a generated `search_vector` tsvector (title > tags/ingredient names >
+description) with a GIN index, plus pg_trgm similarity on the title for typos.
+See migration 0004.
+
+Other databases (SQLite tests/local runs): an in-process inverted index per user,
+built from their recipes on first search and rebuilt when their recipes
+collection version moves (see recipe_index).
+"""
+import heapq
+import math
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import func, literal_column, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.database import Recipe
+from app.services.recipe_index import RecipeIndexCache, fold_plural
+
+SNIPPET_START, SNIPPET_STOP = "<mark>", "</mark>"
+
+# ============ Postgres ============
+
+search_vector = literal_column("recipes.search_vector")
+
+
+def ts_query(q: str):
+    return func.websearch_to_tsquery(settings.SEARCH_LANGUAGE, q)
+
+
+def search_predicate(q: str):
+    """Index-backed match: full-text on the tsvector OR trigram-similar title."""
+    return or_(search_vector.op("@@")(ts_query(q)), Recipe.title.op("%")(q))
+
+
+async def _search_postgres(db: AsyncSession, user_id: int, q: str, limit: int) -> List[Tuple[Recipe, float, Optional[str]]]:
+    tsq = ts_query(q)
+    rank = (func.ts_rank_cd(search_vector, tsq) + 0.5 * func.similarity(Recipe.title, q)).label("rank")
+    ranked = (
+        select(Recipe.id, rank)
+        .where(Recipe.user_id == user_id, search_predicate(q))
+        .order_by(rank.desc(), Recipe.id.desc())
+        .limit(limit)
+        .subquery()
+    )
+    # ts_headline is expensive - only run it for the rows on this page
+    snippet = func.ts_headline(
+        settings.SEARCH_LANGUAGE,
+        func.coalesce(Recipe.description, Recipe.title),
+        tsq,
+        f"StartSel={SNIPPET_START}, StopSel={SNIPPET_STOP}, MaxFragments=2, MaxWords=20, MinWords=5",
+    )
+    result = await db.execute(
+        select(Recipe, ranked.c.rank, snippet)
+        .join(ranked, ranked.c.id == Recipe.id)
+        .order_by(ranked.c.rank.desc(), Recipe.id.desc())
+    )
+    return [(recipe, float(score), headline) for recipe, score, headline in result.all()]
+
+
+# ============ In-process fallback ============
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("a an and or the of with in on for to from by at is are".split())
+FIELD_WEIGHTS = {"title": 3.0, "tags": 2.0, "ingredients": 1.5, "description": 1.0}
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return [fold_plural(t) for t in _TOKEN.findall((text or "").lower()) if t not in STOPWORDS]
+
+
+def _trigrams(token: str) -> Set[str]:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def recipe_fields(recipe) -> Dict[str, str]:
+    ingredients = recipe.ingredients or []
+    return {
+        "title": recipe.title or "",
+        "tags": " ".join(recipe.tags or []),
+        "ingredients": " ".join(str(i.get("name", "")) for i in ingredients if isinstance(i, dict)),
+        "description": recipe.description or "",
+    }
+
+
+class InvertedIndex:
+    """Weighted term index with tf-idf ranking and trigram typo expansion."""
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self.doc_terms: Dict[int, Set[str]] = {}
+        self.doc_length: Dict[int, float] = {}
+        self.trigram_terms: Dict[str, Set[str]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self.doc_terms)
+
+    def add(self, doc_id: int, fields: Dict[str, str]):
+        if doc_id in self.doc_terms:
+            self.remove(doc_id)
+        weights: Dict[str, float] = defaultdict(float)
+        for field, text in fields.items():
+            for token in tokenize(text):
+                weights[token] += FIELD_WEIGHTS.get(field, 1.0)
+        for token, weight in weights.items():
+            if token not in self.postings:
+                for trigram in _trigrams(token):
+                    self.trigram_terms[trigram].add(token)
+            self.postings[token][doc_id] = weight
+        self.doc_terms[doc_id] = set(weights)
+        self.doc_length[doc_id] = sum(weights.values()) or 1.0
+
+    def remove(self, doc_id: int):
+        for token in self.doc_terms.pop(doc_id, ()):
+            docs = self.postings[token]
+            docs.pop(doc_id, None)
+            if not docs:
+                del self.postings[token]
+                for trigram in _trigrams(token):
+                    self.trigram_terms[trigram].discard(token)
+        self.doc_length.pop(doc_id, None)
+
+    def expand(self, token: str, threshold: float = 0.4, max_terms: int = 3) -> List[Tuple[str, float]]:
+        """The token itself if indexed, else the closest vocabulary terms by trigram similarity."""
+        if token in self.postings:
+            return [(token, 1.0)]
+        grams = _trigrams(token)
+        shared: Dict[str, int] = defaultdict(int)
+        for trigram in grams:
+            for term in self.trigram_terms.get(trigram, ()):
+                shared[term] += 1
+        candidates = []
+        for term, count in shared.items():
+            similarity = count / (len(grams) + len(_trigrams(term)) - count)
+            if similarity >= threshold:
+                candidates.append((term, similarity))
+        return heapq.nlargest(max_terms, candidates, key=lambda c: c[1])
+
+    def search(self, query: str, limit: int) -> List[Tuple[int, float, List[str]]]:
+        """Top documents as (doc_id, score, matched terms)."""
+        total = len(self.doc_terms)
+        scores: Dict[int, float] = defaultdict(float)
+        matched: Dict[int, List[str]] = defaultdict(list)
+        for token in tokenize(query):
+            for term, similarity in self.expand(token):
+                docs = self.postings[term]
+                idf = math.log(1 + total / len(docs))
+                for doc_id, weight in docs.items():
+                    scores[doc_id] += similarity * idf * weight / math.sqrt(self.doc_length[doc_id])
+                    matched[doc_id].append(term)
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], item[0]))
+        return [(doc_id, score, matched[doc_id]) for doc_id, score in top]
+
+
+def highlight(text: Optional[str], terms: Iterable[str], width: int = 120) -> Optional[str]:
+    """Window of `text` around the first matched term, matches wrapped in <mark>."""
+    if not text:
+        return None
+    terms = [t for t in terms if t]
+    if not terms:
+        return text[:width]
+    pattern = re.compile(r"\b(" + "|".join(re.escape(t) for t in terms) + r")\w*", re.IGNORECASE)
+    match = pattern.search(text)
+    if not match:
+        return text[:width]
+    start = max(0, match.start() - width // 3)
+    window = text[start:start + width]
+    snippet = pattern.sub(lambda m: f"{SNIPPET_START}{m.group(0)}{SNIPPET_STOP}", window)
+    return ("..." if start else "") + snippet + ("..." if start + width < len(text) else "")
+
+
+async def _build_index(db: AsyncSession, user_id: int) -> InvertedIndex:
+    index = InvertedIndex()
+    for recipe in (await db.execute(select(Recipe).where(Recipe.user_id == user_id))).scalars():
+        index.add(recipe.id, recipe_fields(recipe))
+    return index
+
+
+# user_id -> InvertedIndex of that user's recipes at their current recipes version
+_user_indexes = RecipeIndexCache(_build_index)
+
+
+async def _search_in_process(db: AsyncSession, user_id: int, q: str, limit: int) -> List[Tuple[Recipe, float, Optional[str]]]:
+    index = await _user_indexes.get(db, user_id)
+    hits = index.search(q, limit)
+    if not hits:
+        return []
+    recipes = {r.id: r for r in (await db.execute(
+        select(Recipe).where(Recipe.id.in_([doc_id for doc_id, _, _ in hits]))
+    )).scalars()}
+
+    results = []
+    for doc_id, score, terms in hits:
+        recipe = recipes.get(doc_id)
+        if recipe is not None:
+            results.append((recipe, score, highlight(recipe.description or recipe.title, terms)))
+    return results
+
+
+async def search_recipes(db: AsyncSession, user_id: int, q: str, limit: int) -> List[Tuple[Recipe, float, Optional[str]]]:
+    """Ranked (recipe, score, snippet) matches for a user's recipes, best first."""
+    if db.get_bind().dialect.name == "postgresql":
+        return await _search_postgres(db, user_id, q, limit)
+    return await _search_in_process(db, user_id, q, limit)
@@ -0,0 +1,150 @@
+"""
+Shopping lists from a meal plan: what to buy for every planned meal in a date
+range, minus what's already in the pantry, grouped by aisle category.
+
+Work is grouped rather than done per meal: the database counts meals per recipe
+for the range (one query, joined to the recipes), each distinct recipe's
+ingredients are scaled once by (meals / servings), and amounts are summed per
+(ingredient, dimension) in base units - grams, millilitres or a plain count.
+"""
+from collections import defaultdict
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.database import GroceryItem, Meal, Recipe, User
+from app.services.pantry_service import normalize_ingredient
+
+# unit -> (dimension, factor to the base unit)
+UNITS: Dict[str, Tuple[str, float]] = {
+    "mg": ("mass", 0.001), "g": ("mass", 1.0), "gram": ("mass", 1.0), "grams": ("mass", 1.0),
+    "kg": ("mass", 1000.0), "kilogram": ("mass", 1000.0), "kilograms": ("mass", 1000.0),
+    "oz": ("mass", 28.3495), "ounce": ("mass", 28.3495), "ounces": ("mass", 28.3495),
+    "lb": ("mass", 453.592), "lbs": ("mass", 453.592), "pound": ("mass", 453.592), "pounds": ("mass", 453.592),
+    "ml": ("volume", 1.0), "millilitre": ("volume", 1.0), "milliliter": ("volume", 1.0),
+    "l": ("volume", 1000.0), "litre": ("volume", 1000.0), "liter": ("volume", 1000.0),
+    "litres": ("volume", 1000.0), "liters": ("volume", 1000.0),
+    "tsp": ("volume", 5.0), "teaspoon": ("volume", 5.0), "teaspoons": ("volume", 5.0),
+    "tbsp": ("volume", 15.0), "tablespoon": ("volume", 15.0), "tablespoons": ("volume", 15.0),
+    "cup": ("volume", 240.0), "cups": ("volume", 240.0), "fl oz": ("volume", 29.5735),
+    "": ("count", 1.0), "pc": ("count", 1.0), "pcs": ("count", 1.0), "piece": ("count", 1.0),
+    "pieces": ("count", 1.0), "whole": ("count", 1.0), "x": ("count", 1.0),
+}
+
+# First matching keyword wins; ingredient or pantry categories take precedence
+CATEGORY_KEYWORDS = [
+    ("Protein", "chicken beef steak pork turkey salmon tuna cod shrimp fish tofu tempeh egg whey".split()),
+    ("Dairy", "milk yogurt yoghurt cheese butter cream".split()),
+    ("Produce", "broccoli spinach kale pepper onion garlic tomato carrot zucchini mushroom avocado banana "
+                "berry blueberry apple lemon lime lettuce cucumber potato".split()),
+    ("Grains", "rice quinoa oat pasta bread tortilla noodle couscous flour".split()),
+    ("Pantry", "oil sauce honey bean lentil chickpea nut butter salt spice vinegar".split()),
+]
+
+
+def to_base(quantity, unit: Optional[str]) -> Tuple[str, float]:
+    """(dimension, amount in base units); unknown units become their own dimension."""
+    key = (unit or "").strip().lower().rstrip(".")
+    dimension, factor = UNITS.get(key, (f"unit:{key}", 1.0))
+    try:
+        amount = float(quantity if quantity is not None else 1)
+    except (TypeError, ValueError):
+        amount = 1.0
+    return dimension, amount * factor
+
+
+def from_base(dimension: str, amount: float) -> Tuple[float, Optional[str]]:
+    """Readable quantity and unit: 1500 g -> 1.5 kg, 250 ml stays ml."""
+    if dimension == "mass":
+        return (round(amount / 1000, 2), "kg") if amount >= 1000 else (round(amount, 1), "g")
+    if dimension == "volume":
+        return (round(amount / 1000, 2), "l") if amount >= 1000 else (round(amount, 1), "ml")
+    if dimension == "count":
+        return round(amount, 2), None
+    return round(amount, 2), dimension[len("unit:"):]
+
+
+def categorize(name: str) -> str:
+    words = set(name.split())
+    for category, keywords in CATEGORY_KEYWORDS:
+        if words.intersection(keywords):
+            return category
+    return "Other"
+
+
+async def _member_ids(db: AsyncSession, user_id: int, family_id: Optional[int]) -> List[int]:
+    if family_id is None:
+        return [user_id]
+    result = await db.execute(select(User.id).where(User.family_id == family_id))
+    return list(result.scalars().all()) or [user_id]
+
+
+async def build_shopping_list(db: AsyncSession, user_id: int, start_date: date, end_date: date,
+                              family_id: Optional[int] = None, servings_per_meal: float = 1.0) -> Dict:
+    """Consolidated list for the planned meals of a user (or their whole family)."""
+    members = await _member_ids(db, user_id, family_id)
+
+    # One round trip: planned meals per recipe in the range, with the recipe rows
+    meal_counts = (
+        select(Meal.recipe_id, func.count(Meal.id).label("meals"))
+        .where(Meal.user_id.in_(members), Meal.date >= start_date, Meal.date <= end_date,
+               Meal.recipe_id.is_not(None))
+        .group_by(Meal.recipe_id)
+        .subquery()
+    )
+    recipes = (await db.execute(
+        select(Recipe.servings, Recipe.ingredients, meal_counts.c.meals)
+        .join(meal_counts, meal_counts.c.recipe_id == Recipe.id)
+    )).all()
+
+    needed: Dict[Tuple[str, str], float] = defaultdict(float)
+    categories: Dict[str, str] = {}
+    for servings, ingredients, meals in recipes:
+        scale = meals * servings_per_meal / (servings or 1)
+        for ingredient in ingredients or []:
+            if not isinstance(ingredient, dict):
+                continue
+            name = normalize_ingredient(ingredient.get("name"))
+            if not name:
+                continue
+            dimension, amount = to_base(ingredient.get("quantity", ingredient.get("amount")), ingredient.get("unit"))
+            needed[(name, dimension)] += amount * scale
+            if ingredient.get("category"):
+                categories.setdefault(name, ingredient["category"])
+
+    stock: Dict[Tuple[str, str], float] = defaultdict(float)
+    pantry = await db.execute(
+        select(GroceryItem.name, GroceryItem.quantity, GroceryItem.unit, GroceryItem.category)
+        .where(GroceryItem.user_id.in_(members))
+        .where((GroceryItem.expiration_date.is_(None)) | (GroceryItem.expiration_date >= start_date))
+    )
+    for name, quantity, unit, category in pantry:
+        name = normalize_ingredient(name)
+        dimension, amount = to_base(quantity, unit)
+        stock[(name, dimension)] += amount
+        if category:
+            categories.setdefault(name, category)
+
+    grouped: Dict[str, List[Dict]] = defaultdict(list)
+    for (name, dimension), amount in sorted(needed.items()):
+        in_stock = min(stock.get((name, dimension), 0.0), amount)
+        if amount - in_stock <= 1e-9:
+            continue
+        quantity, unit = from_base(dimension, amount - in_stock)
+        category = categories.get(name) or categorize(name)
+        grouped[category].append({
+            "name": name,
+            "quantity": quantity,
+            "unit": unit,
+            "category": category,
+            "in_stock": round(in_stock / UNITS.get(unit or "", (dimension, 1.0))[1], 2),  # same unit as quantity
+        })
+
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "meals": sum(meals for _, _, meals in recipes),
+        "categories": dict(sorted(grouped.items())),
+    }
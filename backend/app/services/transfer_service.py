@@ -0,0 +1,265 @@
+"""
+Streaming export and import of a user's recipes, meals and groceries.
+
+Exports read through a server-side cursor (`yield_per`) and yield NDJSON or CSV
+one chunk at a time, so memory stays flat however long the history is. They
+open their own session: FastAPI closes request-scoped dependencies before a
+streaming body is sent.
+
+Imports parse the request body as it arrives, validate each record with the
+same Create schemas the REST endpoints use, and write/commit every
+IMPORT_BATCH_SIZE records. Bad records are skipped and reported by line.
+"""
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Type
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.http_cache import bump_versions
+from app.models.database import AsyncSessionLocal, GroceryItem, Meal, Recipe
+from app.schemas.schemas import (
+    GroceryItemCreate, GroceryItemResponse, MealCreate, MealResponse, RecipeCreate, RecipeResponse,
+)
+from app.services.grocery_service import upsert_grocery_items
+from app.services.nutrition_service import refresh_daily_totals
+
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+MAX_REPORTED_ERRORS = 100
+# List/dict fields; CSV carries them as JSON text
+JSON_FIELDS = frozenset({"tags", "ingredients", "nutritional_info"})
+
+
+@dataclass(frozen=True)
+class Dataset:
+    model: Any
+    response_schema: Type[BaseModel]
+    create_schema: Type[BaseModel]
+    order_by: Tuple
+    exclude: frozenset = frozenset()
+
+
+DATASETS: Dict[str, Dataset] = {
+    "recipes": Dataset(Recipe, RecipeResponse, RecipeCreate, (Recipe.id,)),
+    "meals": Dataset(Meal, MealResponse, MealCreate, (Meal.date, Meal.id), frozenset({"recipe"})),
+    "groceries": Dataset(GroceryItem, GroceryItemResponse, GroceryItemCreate, (GroceryItem.id,)),
+}
+
+
+def export_fields(dataset: Dataset) -> List[str]:
+    return [name for name in dataset.response_schema.model_fields if name not in dataset.exclude]
+
+
+def _csv_cell(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(",", ":"))
+    return "" if value is None else value
+
+
+async def export_rows(kind: str, user_id: int, fmt: str) -> AsyncIterator[str]:
+    """NDJSON lines or CSV rows (with a header) for one of a user's datasets."""
+    dataset = DATASETS[kind]
+    fields = export_fields(dataset)
+    table = dataset.model.__table__
+    query = (
+        select(*[table.c[name] for name in fields])
+        .where(table.c.user_id == user_id)
+        .order_by(*dataset.order_by)
+        .execution_options(yield_per=settings.EXPORT_CHUNK_SIZE)
+    )
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == "csv":
+        writer.writerow(fields)
+
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query)
+        async for chunk in result.mappings().partitions():
+            for row in chunk:
+                record = dataset.response_schema.model_construct(**row).model_dump(mode="json", include=set(fields))
+                if fmt == "csv":
+                    writer.writerow([_csv_cell(record[name]) for name in fields])
+                else:
+                    buffer.write(json.dumps(record, separators=(",", ":")))
+                    buffer.write("\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_response(kind: str, user_id: int, fmt: str, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        export_rows(kind, user_id, fmt),
+        media_type=FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
+
+
+# ============ Import ============
+
+def _too_long() -> ValueError:
+    return ValueError(f"Record is longer than {settings.IMPORT_MAX_LINE_BYTES} bytes")
+
+
+async def _lines(body: AsyncIterator[bytes]) -> AsyncIterator[Optional[str]]:
+    """Decode a byte stream into text lines, holding at most one partial line.
+
+    Each chunk is scanned once; only its unterminated tail is carried over. A
+    line longer than IMPORT_MAX_LINE_BYTES is discarded as it arrives and
+    yielded as None.
+    """
+    limit = settings.IMPORT_MAX_LINE_BYTES
+    pending = bytearray()
+    overlong = False
+    async for chunk in body:
+        start = 0
+        while (end := chunk.find(b"\n", start)) >= 0:
+            if overlong or len(pending) + end - start > limit:
+                yield None
+            else:
+                pending += chunk[start:end]
+                yield pending.decode("utf-8-sig").rstrip("\r")
+            pending.clear()
+            overlong = False
+            start = end + 1
+        if not overlong:
+            pending += chunk[start:]
+            if len(pending) > limit:
+                overlong = True
+                pending.clear()
+    if overlong:
+        yield None
+    elif pending:
+        yield pending.decode("utf-8-sig").rstrip("\r")
+
+
+async def _ndjson_records(body: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    number = 0
+    async for line in _lines(body):
+        number += 1
+        if line is None:
+            yield number, _too_long()
+        elif line.strip():
+            try:
+                yield number, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield number, ValueError(f"Invalid JSON: {e.msg}")
+
+
+async def _csv_records(body: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    """CSV rows as dicts; quoted cells may span lines (a record ends when quotes balance)."""
+    header: Optional[List[str]] = None
+    record, start, number, size, quotes = [], 0, 0, 0, 0
+    async for line in _lines(body):
+        number += 1
+        if not record:
+            start, size, quotes = number, 0, 0
+        if line is None or size + len(line) > settings.IMPORT_MAX_LINE_BYTES:
+            record = []
+            yield start, _too_long()
+            continue
+        record.append(line)
+        size += len(line) + 1
+        quotes += line.count('"')
+        if quotes % 2:
+            continue  # inside a quoted cell
+        text = "\n".join(record)
+        record = []
+        if not text.strip():
+            continue
+        cells = next(csv.reader([text]))
+        if header is None:
+            header = [cell.strip() for cell in cells]
+            continue
+        row: Dict[str, Any] = {}
+        for name, value in zip(header, cells):
+            if value == "":
+                continue  # empty cell = schema default
+            if name in JSON_FIELDS:
+                try:
+                    value = json.loads(value)
+                except json.JSONDecodeError:
+                    pass  # left as text; validation reports it
+            row[name] = value
+        yield start, row
+
+
+@dataclass
+class ImportReport:
+    imported: int = 0
+    skipped: int = 0
+    batches: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+
+    def reject(self, line: int, message: str):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+
+async def _write_batch(db: AsyncSession, kind: str, user_id: int, batch: List[Tuple[int, BaseModel]],
+                       report: ImportReport):
+    items = [item for _, item in batch]
+    if kind == "groceries":
+        await upsert_grocery_items(db, user_id, items)
+    elif kind == "recipes":
+        db.add_all([Recipe(**item.model_dump(), user_id=user_id) for item in items])
+    else:
+        recipe_ids = {item.recipe_id for item in items if item.recipe_id}
+        known = set()
+        if recipe_ids:
+            known = set((await db.execute(select(Recipe.id).where(Recipe.id.in_(recipe_ids)))).scalars())
+        meals = []
+        for line, item in batch:
+            if item.recipe_id and item.recipe_id not in known:
+                report.reject(line, "Recipe not found")
+                continue
+            meals.append(Meal(**item.model_dump(), user_id=user_id))
+        db.add_all(meals)
+        await refresh_daily_totals(db, [(user_id, meal.date) for meal in meals])
+        items = meals
+    await bump_versions(db, user_id, kind)
+    await db.commit()
+    report.imported += len(items)
+    report.batches += 1
+
+
+async def import_rows(db: AsyncSession, kind: str, user_id: int, fmt: str, body: AsyncIterator[bytes],
+                      report: Optional[ImportReport] = None) -> Dict[str, Any]:
+    """Validate and store records from a streamed NDJSON/CSV body, committing in batches.
+
+    Pass `report` to see what was committed even if a later batch fails.
+    """
+    schema = DATASETS[kind].create_schema
+    records = _ndjson_records(body) if fmt == "ndjson" else _csv_records(body)
+
+    report = report if report is not None else ImportReport()
+    batch: List[Tuple[int, BaseModel]] = []
+    async for line, record in records:
+        if isinstance(record, Exception):
+            report.reject(line, str(record))
+            continue
+        if not isinstance(record, dict):
+            report.reject(line, "Expected an object")
+            continue
+        try:
+            batch.append((line, schema.model_validate(record)))
+        except ValidationError as e:
+            first = e.errors()[0]
+            report.reject(line, f"{'.'.join(str(p) for p in first['loc']) or 'record'}: {first['msg']}")
+            continue
+        if len(batch) >= settings.IMPORT_BATCH_SIZE:
+            await _write_batch(db, kind, user_id, batch, report)
+            batch = []
+    if batch:
+        await _write_batch(db, kind, user_id, batch, report)
+    return {"imported": report.imported, "skipped": report.skipped, "batches": report.batches, "errors": report.errors}
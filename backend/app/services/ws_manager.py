@@ -0,0 +1,290 @@
+"""
+This node's WebSocket connections per family, and how messages reach them.
+
+Broadcasts are serialized once and published through the backplane; every node
+with members of the family enqueues the same text on each of its sockets. Each
+connection has a bounded outbound queue drained by its own sender task, so a
+slow phone never holds up the rest of the family. When a queue is full the
+slow-consumer policy applies:
+
+- drop:     close the socket (1013, try again later); the client reconnects
+- coalesce: discard the backlog and send one {"type": "resync"} in its place,
+            telling the client to refetch instead of replaying every message
+
+Idle connections get a {"type": "ping"} every WS_HEARTBEAT_SECONDS; a send that
+takes longer than WS_SEND_TIMEOUT_SECONDS closes the socket. New connections are
+admitted at WS_ACCEPT_RATE per second per worker (bursts up to WS_ACCEPT_BURST);
+the rest are closed with 1013 so a reconnect storm backs off instead of piling up.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+from fastapi import WebSocket
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import register_collector
+from app.services.backplane import Backplane, backplane
+
+logger = logging.getLogger(__name__)
+
+PING = json.dumps({"type": "ping"})
+TRY_AGAIN_LATER = 1013
+
+
+class AcceptLimiter:
+    """Token bucket: `rate` connections per second, up to `burst` at once."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.accepted = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            self.rejected += 1
+            return False
+        self.tokens -= 1
+        self.accepted += 1
+        return True
+
+    def stats(self) -> Dict:
+        return {"rate": self.rate, "burst": self.burst, "accepted": self.accepted, "rejected": self.rejected}
+
+
+class FamilyStats:
+    """Send counters for one family's sockets on this node."""
+
+    def __init__(self):
+        self.sent = 0
+        self.send_seconds_total = 0.0
+        self.send_seconds_max = 0.0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def record(self, seconds: float):
+        self.sent += 1
+        self.send_seconds_total += seconds
+        self.send_seconds_max = max(self.send_seconds_max, seconds)
+
+
+class Connection:
+    """One socket's outbound side: a bounded queue and the task that drains it."""
+
+    def __init__(self, websocket: WebSocket, family_id: str, stats: FamilyStats,
+                 on_close: Callable[["Connection", int], Awaitable[None]]):
+        self.websocket = websocket
+        self.family_id = family_id
+        self.stats = stats
+        self.on_close = on_close
+        self.queue: Deque[str] = deque()
+        self.skipped = 0  # messages coalesced away since the last resync notice
+        self.closed = False
+        self.dropping = False  # over the limit under the drop policy; being closed
+        self.held: Optional[List[str]] = None  # live messages parked while a resume is sent
+        self._wakeup = asyncio.Event()
+        self._sender: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._sender = asyncio.create_task(self._run())
+
+    def enqueue(self, payload: str) -> bool:
+        """Queue a serialized message; False when the queue is full and the policy is drop."""
+        if self.closed or self.dropping:
+            return True
+        if self.held is not None:
+            self.held.append(payload)
+            return True
+        if len(self.queue) >= settings.WS_QUEUE_SIZE:
+            if settings.WS_SLOW_CONSUMER_POLICY != "coalesce":
+                self.dropping = True
+                return False
+            self.skipped += len(self.queue)
+            self.stats.coalesced += len(self.queue)
+            self.queue.clear()
+        self.queue.append(payload)
+        self._wakeup.set()
+        return True
+
+    def hold(self):
+        """Park live messages until release(), so a replay goes out ahead of them."""
+        self.held = []
+
+    def release(self, messages: List[str], up_to_seq: int):
+        """Queue `messages`, then the parked live ones not already covered by them."""
+        held, self.held = self.held or [], None
+        for payload in messages:
+            self.enqueue(payload)
+        for payload in held:
+            if json.loads(payload).get("seq", up_to_seq + 1) > up_to_seq:
+                self.enqueue(payload)
+
+    async def _run(self):
+        try:
+            while True:
+                if not self.queue and not self.skipped:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), settings.WS_HEARTBEAT_SECONDS)
+                    except asyncio.TimeoutError:
+                        await self._send(PING)
+                    continue
+                if self.skipped:
+                    payload = json.dumps({"type": "resync", "skipped": self.skipped})
+                    self.skipped = 0
+                else:
+                    payload = self.queue.popleft()
+                await self._send(payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info("Closing WebSocket for family %s after failed send: %r", self.family_id, e)
+            await self.on_close(self, TRY_AGAIN_LATER)
+
+    async def _send(self, payload: str):
+        start = time.perf_counter()
+        await asyncio.wait_for(self.websocket.send_text(payload), settings.WS_SEND_TIMEOUT_SECONDS)
+        self.stats.record(time.perf_counter() - start)
+
+    async def close(self, code: int = 1000):
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.clear()
+        if self._sender is not None and self._sender is not asyncio.current_task():
+            self._sender.cancel()
+        try:
+            await asyncio.wait_for(self.websocket.close(code=code), settings.WS_SEND_TIMEOUT_SECONDS)
+        except Exception:
+            pass  # already gone
+
+
+class ConnectionManager:
+    """
+    This node's sockets per family. Broadcasts go through the backplane so every
+    worker/task with members of the family delivers them to its own sockets.
+    """
+
+    def __init__(self, backplane: Backplane):
+        self.backplane = backplane
+        self.active_connections: Dict[str, List[Connection]] = {}
+        self.family_stats: Dict[str, FamilyStats] = {}
+        self.totals = FamilyStats()  # families that have left this node
+        self.accept_limiter = AcceptLimiter(settings.WS_ACCEPT_RATE, settings.WS_ACCEPT_BURST)
+        self._started = False
+        self._start_lock = asyncio.Lock()
+        self._closing: Set[asyncio.Task] = set()
+
+    async def start(self):
+        async with self._start_lock:
+            if not self._started:
+                await self.backplane.start(self.deliver)
+                self._started = True
+
+    async def stop(self):
+        if self._started:
+            for connections in list(self.active_connections.values()):
+                for connection in connections:
+                    await connection.close(1001)  # going away
+            await self.backplane.stop()
+            self._started = False
+
+    async def connect(self, websocket: WebSocket, family_id: str, hold: bool = False) -> Connection:
+        """Accept and register a socket; with `hold`, live messages wait for Connection.release()."""
+        await self.start()
+        await websocket.accept()
+        stats = self.family_stats.setdefault(family_id, FamilyStats())
+        connection = Connection(websocket, family_id, stats, self.disconnect)
+        if hold:
+            connection.hold()
+        connection.start()
+        first = family_id not in self.active_connections
+        self.active_connections.setdefault(family_id, []).append(connection)
+        if first:
+            await self.backplane.subscribe(family_id)
+        return connection
+
+    def _remove(self, connection: Connection) -> bool:
+        """Forget a connection; True when it was the family's last one on this node."""
+        family_id = connection.family_id
+        connections = self.active_connections.get(family_id)
+        if connections and connection in connections:
+            connections.remove(connection)
+        if family_id not in self.active_connections or connections:
+            return False
+        del self.active_connections[family_id]
+        stats = self.family_stats.pop(family_id, None)
+        if stats:
+            self.totals.sent += stats.sent
+            self.totals.send_seconds_total += stats.send_seconds_total
+            self.totals.send_seconds_max = max(self.totals.send_seconds_max, stats.send_seconds_max)
+            self.totals.coalesced += stats.coalesced
+            self.totals.dropped += stats.dropped
+        return True
+
+    async def disconnect(self, connection: Connection, code: int = 1000):
+        last = self._remove(connection)
+        await connection.close(code)
+        if last:
+            await self.backplane.unsubscribe(connection.family_id)
+
+    async def broadcast(self, message: dict, family_id: str):
+        await self.backplane.publish(family_id, json.dumps(message, default=str))
+
+    async def broadcast_on_commit(self, db: AsyncSession, message: dict, family_id: str) -> bool:
+        """Broadcast when `db` commits, if the backplane can; False means broadcast() after the commit."""
+        return await self.backplane.publish_on_commit(db, family_id, json.dumps(message, default=str))
+
+    async def deliver(self, family_id: str, payload: str):
+        """Queue an already-serialized message on this node's sockets for the family."""
+        for connection in list(self.active_connections.get(family_id, [])):
+            if not connection.enqueue(payload):
+                connection.stats.dropped += 1
+                logger.info("Dropping slow WebSocket consumer in family %s", family_id)
+                # Closing may block on the same full socket - don't hold up delivery
+                task = asyncio.create_task(self.disconnect(connection, TRY_AGAIN_LATER))
+                self._closing.add(task)
+                task.add_done_callback(self._closing.discard)
+
+    def snapshot(self) -> Dict:
+        families = {}
+        for family_id, connections in self.active_connections.items():
+            stats = self.family_stats[family_id]
+            depths = [len(c.queue) for c in connections]
+            families[family_id] = {
+                "connections": len(connections),
+                "queue_depth": sum(depths),
+                "queue_depth_max": max(depths, default=0),
+                "sent": stats.sent,
+                "send_seconds_avg": round(stats.send_seconds_total / stats.sent, 6) if stats.sent else 0.0,
+                "send_seconds_max": round(stats.send_seconds_max, 6),
+                "coalesced": stats.coalesced,
+                "dropped": stats.dropped,
+            }
+        every = [self.totals, *self.family_stats.values()]
+        sent = sum(s.sent for s in every)
+        return {
+            "policy": settings.WS_SLOW_CONSUMER_POLICY,
+            "connections": sum(len(c) for c in self.active_connections.values()),
+            "sent": sent,
+            "send_seconds_avg": round(sum(s.send_seconds_total for s in every) / sent, 6) if sent else 0.0,
+            "send_seconds_max": round(max(s.send_seconds_max for s in every), 6),
+            "coalesced": sum(s.coalesced for s in every),
+            "dropped": sum(s.dropped for s in every),
+            "accepts": self.accept_limiter.stats(),
+            "families": families,
+        }
+
+
+manager = ConnectionManager(backplane)
+register_collector("websocket", manager.snapshot)
@@ -0,0 +1,44 @@
+"""
+Celery worker for background jobs (JOB_BACKEND=celery).
+
+Run with:
+    celery -A app.worker worker --loglevel=info
+"""
+import asyncio
+import logging
+import time
+
+from celery import Celery
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+celery_app = Celery("gymfuel", broker=settings.celery_broker_url, backend=settings.celery_result_backend)
+celery_app.conf.update(
+    task_track_started=True,
+    result_expires=settings.JOB_RESULT_TTL_SECONDS,
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,
+)
+
+# One event loop per worker process, so the async DB pool and HTTP clients
+# stay bound to the loop they were created on across tasks
+_loop = None
+
+
+def _run(coro):
+    global _loop
+    if _loop is None:
+        _loop = asyncio.new_event_loop()
+    return _loop.run_until_complete(coro)
+
+
+@celery_app.task(name="gymfuel.run_job")
+def run_job_task(kind: str, payload: dict, user_id: int, submitted_at: float):
+    from app.services.jobs import job_stats, run_job
+
+    result = _run(run_job(kind, payload, submitted_at))
+    stats = job_stats.kinds[kind]
+    logger.info(f"Job {kind} done: queued {time.time() - submitted_at:.2f}s, totals {stats}")
+    return {"kind": kind, "user_id": user_id, "result": result}
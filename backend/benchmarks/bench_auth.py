@@ -0,0 +1,62 @@
+"""
+Micro-benchmark: cost of resolving the authenticated user per request.
+
+Compares the paths of the auth dependencies:
+- db:     user query on every request (cache cleared before each call)
+- cache:  get_current_user served from the in-process user cache
+- token:  get_token_user, the principal checked against the cached user
+
+Runs against a throwaway SQLite database unless DATABASE_URL is set.
+
+Usage:
+    python -m benchmarks.bench_auth --iterations 5000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.gettempdir()}/gymfuel_bench_auth.db")
+
+from app.api.auth import create_access_token, get_current_user, get_token_user, user_cache  # noqa: E402
+from app.models.database import AsyncSessionLocal, Base, User, engine  # noqa: E402
+
+
+async def bench(label: str, call, iterations: int, before=None):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        if before:
+            before()
+        await call()
+    elapsed = time.perf_counter() - start
+    print(f"{label:>7}: {elapsed / iterations * 1e6:9.1f} us/request")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    async with AsyncSessionLocal() as db:
+        user = User(email="bench@gymfuel.dev", username="bench", hashed_password="x", role="client")
+        db.add(user)
+        await db.commit()
+        try:
+            legacy_token = create_access_token({"sub": user.email})
+            claims_token = create_access_token(
+                {"sub": user.email, "user_id": user.id, "role": user.role, "family_id": user.family_id}
+            )
+
+            await bench("db", lambda: get_current_user(legacy_token, db), args.iterations, before=user_cache.clear)
+            await bench("cache", lambda: get_current_user(legacy_token, db), args.iterations)
+            await bench("token", lambda: get_token_user(claims_token, db), args.iterations)
+            print(user_cache.stats())
+        finally:
+            await db.delete(user)
+            await db.commit()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
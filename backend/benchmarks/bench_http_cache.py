@@ -0,0 +1,114 @@
+"""
+Benchmark: polling list endpoints with and without conditional GETs.
+
+Seeds one user with --meals planned meals (this week and beyond), --groceries
+pantry items and --recipes recipes, then polls /api/meals/week, /api/groceries/
+and /api/recipes/ in-process through the full app:
+- full: a plain GET every time - list query, serialization, body
+- 304:  If-None-Match with the previous ETag - one version lookup, no body
+
+Reports requests/s, median and p99 latency and bytes per response.
+
+Runs against a throwaway SQLite database unless DATABASE_URL is set.
+
+Usage:
+    python -m benchmarks.bench_http_cache --requests 500
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import date, timedelta
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.gettempdir()}/gymfuel_bench_http_cache.db")
+
+import httpx  # noqa: E402
+from sqlalchemy import delete, insert  # noqa: E402
+
+from app.api.auth import create_access_token  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.database import (  # noqa: E402
+    AsyncSessionLocal, Base, CollectionVersion, GroceryItem, Meal, Recipe, User, engine,
+)
+
+ENDPOINTS = ["/api/meals/week", "/api/groceries/", "/api/recipes/"]
+
+
+async def seed(args):
+    rng = random.Random(5)
+    tag = uuid.uuid4().hex[:8]
+    async with AsyncSessionLocal() as db:
+        user = User(email=f"etag-{tag}@gymfuel.dev", username=f"etag-{tag}", hashed_password="x", role="client")
+        db.add(user)
+        await db.flush()
+        recipe_ids = (await db.execute(insert(Recipe).returning(Recipe.id), [
+            {"title": f"Bench recipe {i}", "instructions": "x", "servings": 2, "user_id": user.id,
+             "ingredients": [{"name": "rice", "quantity": 1, "unit": "cup"}],
+             "nutritional_info": {"calories": 500, "protein": 30}}
+            for i in range(args.recipes)
+        ])).scalars().all()
+        monday = date.today() - timedelta(days=date.today().weekday())
+        await db.execute(insert(Meal), [
+            {"date": monday + timedelta(days=i // 4), "meal_type": ("breakfast", "lunch", "dinner", "snack")[i % 4],
+             "recipe_id": rng.choice(recipe_ids), "user_id": user.id}
+            for i in range(args.meals)
+        ])
+        await db.execute(insert(GroceryItem), [
+            {"name": f"item {i}", "quantity": 1, "unit": "g", "user_id": user.id,
+             "expiration_date": date.today() + timedelta(days=rng.randint(0, 30))}
+            for i in range(args.groceries)
+        ])
+        await db.commit()
+        token = create_access_token({"sub": user.email, "user_id": user.id, "role": user.role, "family_id": None})
+        return user.id, token
+
+
+async def drop(user_id: int):
+    async with AsyncSessionLocal() as db:
+        for model in (Meal, GroceryItem, Recipe, CollectionVersion):
+            await db.execute(delete(model).where(model.user_id == user_id))
+        await db.execute(delete(User).where(User.id == user_id))
+        await db.commit()
+
+
+async def poll(client: httpx.AsyncClient, url: str, headers: dict, requests: int, conditional: bool):
+    etag = (await client.get(url, headers=headers)).headers["etag"]
+    samples, sizes = [], []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = await client.get(url, headers={**headers, "If-None-Match": etag} if conditional else headers)
+        samples.append(time.perf_counter() - start)
+        sizes.append(len(response.content))
+        assert response.status_code == (304 if conditional else 200), response.status_code
+    samples.sort()
+    label = f"{url} {'304' if conditional else 'full'}"
+    print(f"{label:>26}: {len(samples) / sum(samples):8.0f} req/s  p50 {statistics.median(samples) * 1000:6.2f} ms  "
+          f"p99 {samples[int(len(samples) * 0.99)] * 1000:6.2f} ms  {statistics.mean(sizes):8.0f} B")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--meals", type=int, default=28)
+    parser.add_argument("--groceries", type=int, default=100)
+    parser.add_argument("--recipes", type=int, default=100)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    user_id, token = await seed(args)
+    headers = {"Authorization": f"Bearer {token}"}
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            for url in ENDPOINTS:
+                await poll(client, url, headers, args.requests, conditional=False)
+                await poll(client, url, headers, args.requests, conditional=True)
+    finally:
+        await drop(user_id)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
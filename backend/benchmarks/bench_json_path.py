@@ -0,0 +1,137 @@
+"""
+Benchmark: serializing a coach's view of a client's meal history, 10k rows.
+
+Seeds a client with --meals meals spread over --recipes recipes, then times the
+same list two ways:
+- orm:     what `response_model=List[MealResponse]` did - load Meal entities with
+           selectinload(Meal.recipe), validate each through from_attributes
+           (nested RecipeResponse too), jsonable_encoder, stdlib json
+           (FastAPI's own serialize_response + JSONResponse)
+- fast:    app.core.fast_json - select() the schema's columns, rows to dicts
+           with each distinct recipe fetched and built once, orjson
+
+and checks that both produce the same JSON. Reports the median total, split
+into load (queries, entities or dicts) and serialization.
+
+Runs against a throwaway SQLite database unless DATABASE_URL is set.
+
+Usage:
+    python -m benchmarks.bench_json_path --meals 10000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import date, timedelta
+from typing import List
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.gettempdir()}/gymfuel_bench_json_path.db")
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_model_field  # noqa: E402
+from sqlalchemy import delete, insert, select  # noqa: E402
+from sqlalchemy.orm import selectinload  # noqa: E402
+
+from app.core.fast_json import json_response, meal_records, select_meals  # noqa: E402
+from app.models.database import AsyncSessionLocal, Base, Meal, Recipe, User, engine  # noqa: E402
+from app.schemas.schemas import MealResponse  # noqa: E402
+
+MEALS_FIELD = create_model_field(name="Response_bench", type_=List[MealResponse], mode="serialization")
+
+
+async def seed(args) -> int:
+    rng = random.Random(11)
+    tag = uuid.uuid4().hex[:8]
+    async with AsyncSessionLocal() as db:
+        client = User(email=f"json-{tag}@gymfuel.dev", username=f"json-{tag}", hashed_password="x", role="client")
+        db.add(client)
+        await db.flush()
+        recipe_ids = (await db.execute(insert(Recipe).returning(Recipe.id), [
+            {"title": f"Bench recipe {i}", "instructions": "Cook it. " * 30, "servings": 2, "user_id": client.id,
+             "prep_time": 10, "cook_time": 20, "difficulty": "easy", "tags": ["high-protein", "quick"],
+             "ingredients": [{"name": f"ingredient {j}", "quantity": 100, "unit": "g"} for j in range(8)],
+             "nutritional_info": {"calories": 550, "protein": 42, "carbs": 50, "fat": 18}}
+            for i in range(args.recipes)
+        ])).scalars().all()
+        start = date(2020, 1, 1)
+        await db.execute(insert(Meal), [
+            {"date": start + timedelta(days=i // 4), "meal_type": ("breakfast", "lunch", "dinner", "snack")[i % 4],
+             "recipe_id": rng.choice(recipe_ids) if i % 10 else None, "notes": "logged", "user_id": client.id}
+            for i in range(args.meals)
+        ])
+        await db.commit()
+        return client.id
+
+
+async def drop(user_id: int):
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(Meal).where(Meal.user_id == user_id))
+        await db.execute(delete(Recipe).where(Recipe.user_id == user_id))
+        await db.execute(delete(User).where(User.id == user_id))
+        await db.commit()
+
+
+async def orm_path(user_id: int) -> tuple:
+    async with AsyncSessionLocal() as db:
+        start = time.perf_counter()
+        result = await db.execute(
+            select(Meal).options(selectinload(Meal.recipe)).where(Meal.user_id == user_id)
+            .order_by(Meal.date.desc(), Meal.id.desc())
+        )
+        rows = result.scalars().all()
+        queried = time.perf_counter()
+        content = await serialize_response(field=MEALS_FIELD, response_content=rows)
+        body = JSONResponse(content).body
+        return body, queried - start, time.perf_counter() - start
+
+
+async def fast_path(user_id: int) -> tuple:
+    async with AsyncSessionLocal() as db:
+        start = time.perf_counter()
+        result = await db.execute(
+            select_meals().where(Meal.user_id == user_id).order_by(Meal.date.desc(), Meal.id.desc())
+        )
+        records = await meal_records(db, result.mappings())
+        queried = time.perf_counter()
+        body = json_response(None, records).body
+        return body, queried - start, time.perf_counter() - start
+
+
+async def timed(label: str, path, user_id: int, repeat: int) -> bytes:
+    queries, totals = [], []
+    for _ in range(repeat):
+        body, query, total = await path(user_id)
+        queries.append(query)
+        totals.append(total)
+    total, query = statistics.median(totals), statistics.median(queries)
+    print(f"{label:>5}: {total * 1000:8.1f} ms median  (load {query * 1000:7.1f} ms, "
+          f"serialization {(total - query) * 1000:7.1f} ms)  {len(body) / 1e6:5.1f} MB")
+    return body
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--meals", type=int, default=10000)
+    parser.add_argument("--recipes", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    user_id = await seed(args)
+    try:
+        print(f"{args.meals} meals, {args.recipes} recipes")
+        orm = await timed("orm", orm_path, user_id, args.repeat)
+        fast = await timed("fast", fast_path, user_id, args.repeat)
+        assert json.loads(orm) == json.loads(fast), "fast path JSON differs"
+    finally:
+        await drop(user_id)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+"""
+Benchmark: pantry-to-recipe matching over a synthetic recipe book.
+
+Builds a PantryIndex for --size recipes (100k by default) and times top-10
+matching for small, medium and large pantries, next to a naive per-recipe loop
+doing the same scoring for comparison.
+
+Usage:
+    python -m benchmarks.bench_match --size 100000
+"""
+import argparse
+import random
+import statistics
+import time
+
+from app.services.pantry_service import PantryIndex, normalize_ingredient
+
+INGREDIENTS = [
+    "chicken breast", "chicken thigh", "ground beef", "steak", "salmon", "tuna", "cod", "shrimp", "tofu", "tempeh",
+    "egg", "greek yogurt", "cottage cheese", "cheddar", "milk", "whey protein", "rice", "brown rice", "quinoa",
+    "oats", "pasta", "potato", "sweet potato", "bread", "tortilla", "black bean", "chickpea", "lentil", "broccoli",
+    "spinach", "kale", "bell pepper", "onion", "garlic", "tomato", "carrot", "zucchini", "mushroom", "avocado",
+    "banana", "blueberry", "peanut butter", "almond", "olive oil", "soy sauce", "honey", "lime", "lemon",
+]
+# Long tail so the index has realistic vocabulary size
+INGREDIENTS += [f"spice {a}{b}{c}" for a in "abcdefgh" for b in "aeiou" for c in "klmnprst"]
+
+
+def naive_match(recipes, pantry, expiring, limit):
+    covered = {normalize_ingredient(p) for p in pantry}
+    soon = {normalize_ingredient(p) for p in expiring}
+    scored = []
+    for recipe_id, names in recipes:
+        hits = sum(1 for n in names if any(c in n for c in covered | soon))
+        bonus = sum(1 for n in names if any(c in n for c in soon))
+        if hits:
+            scored.append(((2 * hits + bonus) / (2 * len(names)), recipe_id))
+    return sorted(scored, reverse=True)[:limit]
+
+
+def timed(label, fn, repeat=7):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        hits = fn()
+        samples.append(time.perf_counter() - start)
+    print(f"  {label:<32} {statistics.median(samples) * 1000:9.2f} ms median  ({len(hits)} results)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    common = INGREDIENTS[:48]
+    recipes = [
+        (i, rng.sample(common, rng.randint(3, 8)) + rng.sample(INGREDIENTS[48:], rng.randint(0, 4)))
+        for i in range(1, args.size + 1)
+    ]
+
+    start = time.perf_counter()
+    index = PantryIndex()
+    for recipe_id, names in recipes:
+        index.add(recipe_id, [{"name": n} for n in names])
+    print(f"index: {len(index)} recipes, {len(index.names)} ingredients, built in {time.perf_counter() - start:.2f}s")
+
+    normalized = [(i, [normalize_ingredient(n) for n in names]) for i, names in recipes]
+    pantries = {
+        "small (5 items)": rng.sample(common, 5),
+        "medium (15 items)": rng.sample(common, 15),
+        "large (30 items)": rng.sample(common, 30),
+    }
+    for label, pantry in pantries.items():
+        expiring = pantry[:2]
+        print(label)
+        timed("bitset index", lambda: index.match(pantry[2:], expiring, limit=10))
+        timed("bitset index, min_coverage=0.8", lambda: index.match(pantry[2:], expiring, limit=10, min_coverage=0.8))
+        timed("naive loop", lambda: naive_match(normalized, pantry[2:], expiring, 10), repeat=1)
+
+
+if __name__ == "__main__":
+    main()
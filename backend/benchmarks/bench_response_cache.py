@@ -0,0 +1,127 @@
+"""
+Benchmark: hot list endpoints with and without the response cache.
+
+Seeds a client with a week of meals, --groceries pantry items and --recipes
+recipes, links a coach, then times through the full app (in-process):
+- /api/meals/week, /api/groceries/expiring-soon (the client)
+- /api/coach/clients/{id}/recipes (the coach)
+
+Each endpoint runs cold (response cache cleared before every request, so the
+list is queried and serialized each time) and warm (served from the cache).
+
+Runs against a throwaway SQLite database unless DATABASE_URL is set.
+
+Usage:
+    python -m benchmarks.bench_response_cache --requests 500
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import date, timedelta
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.gettempdir()}/gymfuel_bench_response_cache.db")
+
+import httpx  # noqa: E402
+from sqlalchemy import delete, insert  # noqa: E402
+
+from app.api.auth import create_access_token  # noqa: E402
+from app.core.response_cache import MemoryResponseCache, response_cache  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.database import (  # noqa: E402
+    AsyncSessionLocal, Base, CoachClient, CollectionVersion, GroceryItem, Meal, Recipe, User, engine,
+)
+
+
+def token(user: User) -> dict:
+    claims = {"sub": user.email, "user_id": user.id, "role": user.role, "family_id": None}
+    return {"Authorization": f"Bearer {create_access_token(claims)}"}
+
+
+async def seed(args):
+    rng = random.Random(7)
+    tag = uuid.uuid4().hex[:8]
+    async with AsyncSessionLocal() as db:
+        client = User(email=f"rc-{tag}@gymfuel.dev", username=f"rc-{tag}", hashed_password="x", role="client")
+        coach = User(email=f"rc-coach-{tag}@gymfuel.dev", username=f"rc-coach-{tag}", hashed_password="x",
+                     role="coach")
+        db.add_all([client, coach])
+        await db.flush()
+        db.add(CoachClient(coach_id=coach.id, client_id=client.id))
+        recipe_ids = (await db.execute(insert(Recipe).returning(Recipe.id), [
+            {"title": f"Bench recipe {i}", "instructions": "x" * 400, "servings": 2, "user_id": client.id,
+             "tags": ["high-protein"], "ingredients": [{"name": "rice", "quantity": 1, "unit": "cup"}] * 8,
+             "nutritional_info": {"calories": 500, "protein": 30}}
+            for i in range(args.recipes)
+        ])).scalars().all()
+        monday = date.today() - timedelta(days=date.today().weekday())
+        await db.execute(insert(Meal), [
+            {"date": monday + timedelta(days=d), "meal_type": meal_type, "recipe_id": rng.choice(recipe_ids),
+             "user_id": client.id}
+            for d in range(7) for meal_type in ("breakfast", "lunch", "dinner", "snack")
+        ])
+        await db.execute(insert(GroceryItem), [
+            {"name": f"item {i}", "quantity": 1, "unit": "g", "user_id": client.id,
+             "expiration_date": date.today() + timedelta(days=rng.randint(0, 10))}
+            for i in range(args.groceries)
+        ])
+        await db.commit()
+        return client, coach
+
+
+async def drop(client: User, coach: User):
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(CoachClient).where(CoachClient.coach_id == coach.id))
+        for model in (Meal, GroceryItem, Recipe, CollectionVersion):
+            await db.execute(delete(model).where(model.user_id == client.id))
+        await db.execute(delete(User).where(User.id.in_([client.id, coach.id])))
+        await db.commit()
+
+
+async def bench(http: httpx.AsyncClient, label: str, url: str, headers: dict, requests: int, warm: bool):
+    await http.get(url, headers=headers)
+    samples = []
+    for _ in range(requests):
+        if not warm:
+            response_cache.clear()
+        start = time.perf_counter()
+        response = await http.get(url, headers=headers)
+        samples.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.text
+    samples.sort()
+    print(f"{label:>24} {'warm' if warm else 'cold'}: {len(samples) / sum(samples):7.0f} req/s  "
+          f"p50 {statistics.median(samples) * 1000:6.2f} ms  p99 {samples[int(len(samples) * 0.99)] * 1000:6.2f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--groceries", type=int, default=200)
+    parser.add_argument("--recipes", type=int, default=100)
+    args = parser.parse_args()
+    if not isinstance(response_cache, MemoryResponseCache):
+        raise SystemExit("Run with RESPONSE_CACHE_BACKEND=memory")
+
+    Base.metadata.create_all(bind=engine)
+    client, coach = await seed(args)
+    endpoints = [
+        ("meals/week", "/api/meals/week", token(client)),
+        ("groceries/expiring-soon", "/api/groceries/expiring-soon", token(client)),
+        ("coach client recipes", f"/api/coach/clients/{client.id}/recipes?limit=50", token(coach)),
+    ]
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as http:
+            for label, url, headers in endpoints:
+                await bench(http, label, url, headers, args.requests, warm=False)
+                await bench(http, label, url, headers, args.requests, warm=True)
+        print("response_cache:", response_cache.snapshot())
+    finally:
+        await drop(client, coach)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
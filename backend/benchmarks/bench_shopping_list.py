@@ -0,0 +1,125 @@
+"""
+Benchmark: shopping list for a family planning 4 weeks of meals.
+
+Seeds a family of --members users sharing --recipes recipes, each with four
+planned meals a day for --weeks weeks, then times:
+- grouped:  build_shopping_list (meals counted per recipe in SQL, one pass per recipe)
+- per-meal: the hand-rolled way - load every meal with joinedload(Meal.recipe)
+            and add up ingredients meal by meal
+
+Runs against a throwaway SQLite database unless DATABASE_URL is set.
+
+Usage:
+    python -m benchmarks.bench_shopping_list --members 5 --weeks 4
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.gettempdir()}/gymfuel_bench_shopping.db")
+
+from sqlalchemy import delete, insert, select  # noqa: E402
+from sqlalchemy.orm import joinedload  # noqa: E402
+
+from app.models.database import (  # noqa: E402
+    AsyncSessionLocal, Base, Family, GroceryItem, Meal, Recipe, User, engine,
+)
+from app.services.pantry_service import normalize_ingredient  # noqa: E402
+from app.services.shopping_service import build_shopping_list, to_base  # noqa: E402
+
+INGREDIENTS = [
+    ("chicken breast", "g"), ("ground beef", "g"), ("salmon", "g"), ("egg", None), ("rice", "cup"), ("oats", "g"),
+    ("milk", "ml"), ("greek yogurt", "g"), ("broccoli", "g"), ("spinach", "g"), ("olive oil", "tbsp"),
+    ("sweet potato", "g"), ("pasta", "g"), ("tomato", None), ("onion", None), ("garlic", None), ("whey protein", "g"),
+]
+
+
+async def per_meal(db, member_ids, start, end):
+    result = await db.execute(
+        select(Meal).options(joinedload(Meal.recipe))
+        .where(Meal.user_id.in_(member_ids), Meal.date >= start, Meal.date <= end)
+    )
+    totals = defaultdict(float)
+    for meal in result.scalars():
+        for ingredient in meal.recipe.ingredients:
+            dimension, amount = to_base(ingredient.get("quantity"), ingredient.get("unit"))
+            totals[(normalize_ingredient(ingredient["name"]), dimension)] += amount / (meal.recipe.servings or 1)
+    return totals
+
+
+async def timed(label, fn, repeat=5):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    print(f"{label:>9}: {statistics.median(samples) * 1000:8.1f} ms median")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, default=5)
+    parser.add_argument("--weeks", type=int, default=4)
+    parser.add_argument("--recipes", type=int, default=60)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    Base.metadata.create_all(bind=engine)
+    start = date(2026, 1, 5)
+    end = start + timedelta(weeks=args.weeks) - timedelta(days=1)
+    async with AsyncSessionLocal() as db:
+        family = Family(name="Bench family")
+        db.add(family)
+        await db.flush()
+        members = [
+            User(email=f"shop-bench-{i}@gymfuel.dev", username=f"shop-bench-{i}", hashed_password="x",
+                 family_id=family.id)
+            for i in range(args.members)
+        ]
+        db.add_all(members)
+        await db.flush()
+        member_ids = [m.id for m in members]
+        recipe_ids = (await db.execute(insert(Recipe).returning(Recipe.id), [
+            {
+                "title": f"Bench recipe {i}", "instructions": "x", "servings": rng.randint(1, 4),
+                "user_id": member_ids[0],
+                "ingredients": [
+                    {"name": name, "quantity": rng.choice([1, 2, 100, 150, 250]), "unit": unit}
+                    for name, unit in rng.sample(INGREDIENTS, rng.randint(4, 9))
+                ],
+            }
+            for i in range(args.recipes)
+        ])).scalars().all()
+        days = (end - start).days + 1
+        await db.execute(insert(Meal), [
+            {"date": start + timedelta(days=d), "meal_type": meal_type, "recipe_id": rng.choice(recipe_ids),
+             "user_id": user_id}
+            for user_id in member_ids for d in range(days) for meal_type in ("breakfast", "lunch", "dinner", "snack")
+        ])
+        await db.execute(insert(GroceryItem), [
+            {"name": name, "quantity": 500, "unit": "g", "user_id": rng.choice(member_ids)}
+            for name, _ in INGREDIENTS[::3]
+        ])
+        await db.commit()
+        print(f"{args.members} members x {args.weeks} weeks: {args.members * days * 4} meals, {args.recipes} recipes")
+
+        try:
+            await timed("grouped", lambda: build_shopping_list(db, member_ids[0], start, end, family_id=family.id))
+            await timed("per-meal", lambda: per_meal(db, member_ids, start, end))
+        finally:
+            await db.execute(delete(Meal).where(Meal.user_id.in_(member_ids)))
+            await db.execute(delete(GroceryItem).where(GroceryItem.user_id.in_(member_ids)))
+            await db.execute(delete(Recipe).where(Recipe.user_id.in_(member_ids)))
+            await db.execute(delete(User).where(User.id.in_(member_ids)))
+            await db.execute(delete(Family).where(Family.id == family.id))
+            await db.commit()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
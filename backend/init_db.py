@@ -1,8 +1,72 @@
-"""Initialize database tables"""
-from app.models.database import Base, engine
+"""
+Bring the database schema up to date (runs before uvicorn on every container start).
+
+Fast path: one query compares alembic_version with the migration head, so a task
+launch against an up-to-date database doesn't reflect metadata or run Alembic.
+Otherwise migrations run under a Postgres advisory lock, so tasks starting
+together don't race each other.
+"""
+import os
+
+from alembic import command
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect, text
+
+from app.models.database import engine
+
+# Databases created by the old create_all boot already match this revision
+BASELINE_REVISION = "0001"
+MIGRATION_LOCK_ID = 4812001
+
+
+def alembic_config() -> Config:
+    return Config(os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini"))
+
+
+def current_revision(connection):
+    if not inspect(connection).has_table("alembic_version"):
+        return None
+    return connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+
+
+def migrate():
+    config = alembic_config()
+    head = ScriptDirectory.from_config(config).get_current_head()
+
+    with engine.connect() as connection:
+        if current_revision(connection) == head:
+            print(f"Database schema is current (revision {head})")
+            return
+
+    with engine.connect() as connection:
+        is_postgres = connection.dialect.name == "postgresql"
+        if is_postgres:
+            connection.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        try:
+            revision = current_revision(connection)
+            legacy_schema = revision is None and inspect(connection).has_table("users")
+            # Alembic must own its transactions (0003 builds indexes outside one)
+            connection.commit()
+            if revision == head:
+                print(f"Database schema is current (revision {head})")
+                return
+
+            config.attributes["connection"] = connection
+            if legacy_schema:
+                print(f"Existing schema without migration history, stamping {BASELINE_REVISION}")
+                command.stamp(config, BASELINE_REVISION)
+                connection.commit()
+
+            print(f"Migrating database schema {revision or 'empty'} -> {head}...")
+            command.upgrade(config, "head")
+            connection.commit()
+            print("Database schema migrated successfully!")
+        finally:
+            if is_postgres:
+                connection.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+                connection.commit()
+
 
 if __name__ == "__main__":
-    print("Creating database tables...")
-    # create_all is safe: it only creates tables that don't exist
-    Base.metadata.create_all(bind=engine)
-    print("Database tables created successfully!")
+    migrate()
@@ -0,0 +1,55 @@
+"""
+Maintenance for the nutrition_daily rollup (see app.services.nutrition_service).
+
+    python nutrition_rollup.py check [--user ID] [--fix]   # exit 1 if rows disagree with meals
+    python nutrition_rollup.py rebuild [--user ID]         # recompute from scratch (backfills)
+"""
+import argparse
+import asyncio
+import sys
+
+from app.models.database import AsyncSessionLocal
+from app.services.nutrition_service import check_daily_totals, rebuild_daily_totals, refresh_daily_totals
+
+
+async def check(user_id, fix: bool) -> int:
+    async with AsyncSessionLocal() as db:
+        mismatches = await check_daily_totals(db, user_id)
+        for m in mismatches[:50]:
+            print(f"  user {m['user_id']} {m['date']}: {m['problem']} (expected {m['expected_meals']} meals)")
+        if len(mismatches) > 50:
+            print(f"  ... and {len(mismatches) - 50} more")
+        if not mismatches:
+            print("Nutrition rollup is consistent")
+            return 0
+        print(f"{len(mismatches)} inconsistent day(s)")
+        if fix:
+            await refresh_daily_totals(db, [(m["user_id"], m["date"]) for m in mismatches])
+            await db.commit()
+            print("Repaired")
+            return 0
+        return 1
+
+
+async def rebuild(user_id) -> int:
+    async with AsyncSessionLocal() as db:
+        rows = await rebuild_daily_totals(db, user_id)
+        await db.commit()
+    print(f"Rebuilt nutrition rollup: {rows} day(s)" + (f" for user {user_id}" if user_id else ""))
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["check", "rebuild"])
+    parser.add_argument("--user", type=int, help="Only this user")
+    parser.add_argument("--fix", action="store_true", help="check: recompute the inconsistent days")
+    args = parser.parse_args()
+
+    if args.command == "check":
+        sys.exit(asyncio.run(check(args.user, args.fix)))
+    sys.exit(asyncio.run(rebuild(args.user)))
+
+
+if __name__ == "__main__":
+    main()
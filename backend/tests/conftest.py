@@ -0,0 +1,53 @@
+"""
+Shared fixtures: the app in-process against a throwaway SQLite database.
+
+The database lives for the whole session; every test signs up its own users,
+so ids never repeat and the per-process caches (users, responses, recipe
+indexes) never see a recycled id.
+"""
+import os
+import tempfile
+import uuid
+
+_db_dir = tempfile.mkdtemp(prefix="gymfuel-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/gymfuel.db"
+os.environ.setdefault("JOB_BACKEND", "eager")
+os.environ.setdefault("RESPONSE_CACHE_BACKEND", "memory")
+os.environ.setdefault("WS_BACKPLANE", "memory")
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.models.database import Base, engine  # noqa: E402
+
+PASSWORD = "Passw0rdX"
+
+
+@pytest.fixture(scope="session")
+def client():
+    Base.metadata.create_all(bind=engine)
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def signup(client):
+    """signup(role="client") -> auth headers for a new user."""
+    def signup(role: str = "client") -> dict:
+        tag = uuid.uuid4().hex[:12]
+        email = f"{tag}@gymfuel.dev"
+        response = client.post("/api/auth/register/", json={
+            "email": email, "username": tag, "password": PASSWORD, "role": role,
+        })
+        assert response.status_code == 200, response.text
+        response = client.post("/api/auth/login/", data={"username": email, "password": PASSWORD})
+        assert response.status_code == 200, response.text
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+    return signup
+
+
+@pytest.fixture
+def headers(signup):
+    """Auth headers for a fresh client user."""
+    return signup()
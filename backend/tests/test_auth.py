@@ -0,0 +1,81 @@
+"""Token users resolve through the user cache, which follows committed changes."""
+from sqlalchemy import select
+
+from app.api.auth import user_cache
+from app.models.database import AsyncSessionLocal, CoachClient, Family, User
+
+
+def me(client, headers) -> dict:
+    response = client.get("/api/auth/me/", headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_committed_changes_reach_the_cache(client, headers):
+    user = me(client, headers)
+    assert user["family_id"] is None
+    assert user_cache.get(user["email"]) is not None
+
+    async def join_family() -> int:
+        async with AsyncSessionLocal() as db:
+            family = Family(name="Test family")
+            db.add(family)
+            await db.flush()
+            (await db.get(User, user["id"])).family_id = family.id
+            await db.flush()
+            assert user_cache.get(user["email"]) is not None  # flushed, not committed
+            await db.commit()
+            return family.id
+
+    family_id = client.portal.call(join_family)
+    assert user_cache.get(user["email"]) is None
+    assert me(client, headers)["family_id"] == family_id  # the token still claims no family
+
+
+def test_rolled_back_changes_keep_the_cache(client, headers):
+    user = me(client, headers)
+
+    async def change_role_and_roll_back():
+        async with AsyncSessionLocal() as db:
+            (await db.get(User, user["id"])).role = "coach"
+            await db.flush()
+            await db.rollback()
+
+    client.portal.call(change_role_and_roll_back)
+    assert user_cache.get(user["email"]) is not None
+    assert me(client, headers)["role"] == "client"
+
+
+def test_coach_links_invalidate_both_users(client, signup, headers):
+    coach_headers = signup("coach")
+    coach, user = me(client, coach_headers), me(client, headers)
+
+    async def link():
+        async with AsyncSessionLocal() as db:
+            db.add(CoachClient(coach_id=coach["id"], client_id=user["id"]))
+            await db.commit()
+
+    client.portal.call(link)
+    assert user_cache.get(coach["email"]) is None
+    assert user_cache.get(user["email"]) is None
+
+
+def test_deleted_users_tokens_are_rejected(client, signup, headers):
+    user = me(client, headers)
+    signup()  # SQLite reuses the highest rowid once it's deleted; keep this user's below it
+
+    async def delete():
+        async with AsyncSessionLocal() as db:
+            await db.delete((await db.execute(select(User).where(User.id == user["id"]))).scalar_one())
+            await db.commit()
+
+    async def recreate():
+        async with AsyncSessionLocal() as db:
+            db.add(User(email=user["email"], username=user["username"] + "2", hashed_password="x"))
+            await db.commit()
+
+    client.portal.call(delete)
+    assert client.get("/api/auth/me/", headers=headers).status_code == 401
+    # Same email, new account: the old token's user_id no longer matches
+    client.portal.call(recreate)
+    assert client.get("/api/auth/me/", headers=headers).status_code == 401
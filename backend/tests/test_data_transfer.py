@@ -0,0 +1,39 @@
+"""Streaming import: batches commit as they go, and committed rows are always announced."""
+import pytest
+
+from app.api import data
+from app.core.config import settings
+from app.services import transfer_service
+
+BODY = b"".join(b'{"name": "item %d", "quantity": 1}\n' % i for i in range(5))
+
+
+@pytest.fixture
+def announced(monkeypatch):
+    calls = []
+    monkeypatch.setattr(data.changes, "record_bulk", lambda user, entity, count: calls.append((entity, count)))
+    monkeypatch.setattr(settings, "IMPORT_BATCH_SIZE", 2)
+    return calls
+
+
+def test_import_announces_every_record(client, headers, announced):
+    response = client.post("/api/data/import/groceries", headers=headers, content=BODY)
+    assert response.status_code == 200, response.text
+    assert response.json()["imported"] == 5
+    assert response.json()["batches"] == 3
+    assert announced == [("grocery_item", 5)]
+
+
+def test_failed_import_announces_committed_batches(client, headers, announced, monkeypatch):
+    write_batch = transfer_service._write_batch
+
+    async def fail_second_batch(db, kind, user_id, batch, report):
+        if report.batches == 1:
+            raise RuntimeError("batch failed")
+        await write_batch(db, kind, user_id, batch, report)
+
+    monkeypatch.setattr(transfer_service, "_write_batch", fail_second_batch)
+    with pytest.raises(RuntimeError):
+        client.post("/api/data/import/groceries", headers=headers, content=BODY)
+    assert announced == [("grocery_item", 2)]
+    assert len(client.get("/api/groceries/", headers=headers).json()) == 2
@@ -0,0 +1,88 @@
+"""Merging grocery items that are already in the pantry (same name and unit)."""
+from app.schemas.schemas import GroceryItemCreate
+from app.services.grocery_service import merge_payload
+
+
+def item(**fields) -> GroceryItemCreate:
+    return GroceryItemCreate(**{"name": "rice", "quantity": 1, **fields})
+
+
+def test_merge_payload_rules():
+    rows = merge_payload(7, [
+        item(quantity=1, unit="kg", category="grains", expiration_date="2026-05-10"),
+        item(quantity=2, unit="kg", expiration_date="2026-05-01"),
+        item(quantity=3, unit="kg", category="pantry"),
+        item(quantity=5, unit="g"),
+    ])
+    assert len(rows) == 2
+    kilos, grams = rows
+    assert kilos["user_id"] == 7
+    assert kilos["quantity"] == 6
+    assert str(kilos["expiration_date"]) == "2026-05-01"  # earliest wins
+    assert kilos["category"] == "pantry"  # latest given wins
+    assert grams["quantity"] == 5
+
+
+def test_adding_an_existing_item_merges_into_it(client, headers):
+    first = client.post("/api/groceries/", headers=headers, json={
+        "name": "oats", "quantity": 1, "unit": "kg", "category": "grains", "expiration_date": "2026-06-01",
+    }).json()
+
+    # No category: keeps "grains"; later expiry: keeps June 1
+    second = client.post("/api/groceries/", headers=headers, json={
+        "name": "oats", "quantity": 2, "unit": "kg", "expiration_date": "2026-07-01",
+    }).json()
+    assert second["id"] == first["id"]
+    assert second["quantity"] == 3
+    assert second["category"] == "grains"
+    assert second["expiration_date"] == "2026-06-01"
+
+    # A category replaces the current one; an earlier expiry wins
+    third = client.post("/api/groceries/", headers=headers, json={
+        "name": "oats", "quantity": 1, "unit": "kg", "category": "breakfast", "expiration_date": "2026-05-15",
+    }).json()
+    assert third["id"] == first["id"]
+    assert third["quantity"] == 4
+    assert third["category"] == "breakfast"
+    assert third["expiration_date"] == "2026-05-15"
+
+    # A different unit is a different item
+    other = client.post("/api/groceries/", headers=headers, json={"name": "oats", "quantity": 500, "unit": "g"}).json()
+    assert other["id"] != first["id"]
+    assert len(client.get("/api/groceries/", headers=headers).json()) == 2
+
+
+def test_bulk_merges_repeats_and_existing_rows(client, headers):
+    existing = client.post("/api/groceries/", headers=headers, json={"name": "eggs", "quantity": 6}).json()
+    response = client.post("/api/groceries/bulk", headers=headers, json=[
+        {"name": "eggs", "quantity": 6, "category": "dairy"},
+        {"name": "milk", "quantity": 1, "unit": "l"},
+        {"name": "eggs", "quantity": 12},
+    ])
+    assert response.status_code == 200, response.text
+    eggs, milk = response.json()
+    assert eggs["id"] == existing["id"]
+    assert eggs["quantity"] == 24
+    assert eggs["category"] == "dairy"
+    assert milk["quantity"] == 1
+
+
+def test_empty_category_keeps_the_current_one(client, headers):
+    existing = client.post("/api/groceries/", headers=headers, json={
+        "name": "flour", "quantity": 1, "category": "baking",
+    }).json()
+
+    # Across requests and within one payload alike
+    merged = client.post("/api/groceries/", headers=headers, json={"name": "flour", "quantity": 1, "category": ""})
+    assert merged.json()["id"] == existing["id"]
+    assert merged.json()["category"] == "baking"
+
+    response = client.post("/api/groceries/bulk", headers=headers, json=[
+        {"name": "flour", "quantity": 1, "category": ""},
+        {"name": "sugar", "quantity": 1, "category": "baking"},
+        {"name": "sugar", "quantity": 1, "category": ""},
+    ])
+    flour, sugar = response.json()
+    assert flour["category"] == "baking"
+    assert flour["quantity"] == 3
+    assert sugar["category"] == "baking"
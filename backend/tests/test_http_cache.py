@@ -0,0 +1,63 @@
+"""Conditional GETs (ETag / Last-Modified -> 304) and the response cache behind them."""
+from datetime import date
+
+import pytest
+
+LISTS = ["/api/meals/week", "/api/groceries/", "/api/recipes/", "/api/groceries/expiring-soon"]
+
+
+@pytest.mark.parametrize("url", LISTS)
+def test_etag_round_trip(client, headers, url):
+    first = client.get(url, headers=headers)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert etag.startswith('W/"')
+    assert first.headers["cache-control"] == "private, no-cache"
+
+    again = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == etag
+
+    assert client.get(url, headers={**headers, "If-None-Match": 'W/"0-stale"'}).status_code == 200
+    assert client.get(url, headers={**headers, "If-None-Match": "*"}).status_code == 304
+
+
+def test_writes_change_the_validator(client, headers):
+    etag = client.get("/api/groceries/", headers=headers).headers["etag"]
+    client.post("/api/groceries/", headers=headers, json={"name": "kale", "quantity": 1})
+
+    response = client.get("/api/groceries/", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert [item["name"] for item in response.json()] == ["kale"]
+    assert response.headers["etag"] != etag
+
+
+def test_validators_depend_on_query_and_user(client, signup, headers):
+    etag = client.get("/api/recipes/?limit=5", headers=headers).headers["etag"]
+    assert client.get("/api/recipes/?limit=6", headers={**headers, "If-None-Match": etag}).status_code == 200
+    other = signup()
+    assert client.get("/api/recipes/?limit=5", headers={**other, "If-None-Match": etag}).status_code == 200
+
+
+def test_if_modified_since(client, headers):
+    last_modified = client.get("/api/meals/week", headers=headers).headers["last-modified"]
+    response = client.get("/api/meals/week", headers={**headers, "If-Modified-Since": last_modified})
+    assert response.status_code == 304
+    old = "Mon, 01 Jan 2001 00:00:00 GMT"
+    assert client.get("/api/meals/week", headers={**headers, "If-Modified-Since": old}).status_code == 200
+
+
+def test_recipe_edit_refreshes_meal_lists(client, headers):
+    recipe = client.post("/api/recipes/", headers=headers, json={"title": "Stew", "instructions": "x"}).json()
+    client.post("/api/meals/", headers=headers, json={
+        "date": date.today().isoformat(), "meal_type": "dinner", "recipe_id": recipe["id"],
+    })
+    before = client.get("/api/meals/week", headers=headers)
+    assert before.json()[0]["recipe"]["title"] == "Stew"
+
+    # Meal lists embed their recipe: renaming it must invalidate them (and their cached body)
+    client.put(f"/api/recipes/{recipe['id']}", headers=headers, json={"title": "Beef stew"})
+    after = client.get("/api/meals/week", headers={**headers, "If-None-Match": before.headers["etag"]})
+    assert after.status_code == 200
+    assert after.json()[0]["recipe"]["title"] == "Beef stew"
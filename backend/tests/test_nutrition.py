@@ -0,0 +1,88 @@
+"""The nutrition_daily rollup stays equal to meals + recipes through edits."""
+import pytest
+
+from app.models.database import AsyncSessionLocal
+from app.services.nutrition_service import check_daily_totals
+
+DAY_1, DAY_2 = "2026-04-06", "2026-04-07"
+RANGE = f"{DAY_1}..{DAY_2}"
+
+
+@pytest.fixture
+def recipe(client, headers):
+    def recipe(**macros) -> int:
+        response = client.post("/api/recipes/", headers=headers, json={
+            "title": "Bowl", "instructions": "x", "nutritional_info": macros,
+        })
+        assert response.status_code == 200, response.text
+        return response.json()["id"]
+    return recipe
+
+
+def days(client, headers) -> dict:
+    """Per-day (meals, calories, protein) from the rollup, after checking it against a fresh aggregate."""
+    user_id = client.get("/api/auth/me/", headers=headers).json()["id"]
+
+    async def mismatches():
+        async with AsyncSessionLocal() as db:
+            return await check_daily_totals(db, user_id)
+
+    assert client.portal.call(mismatches) == []
+    response = client.get("/api/meals/nutrition", headers=headers, params={"range": RANGE})
+    assert response.status_code == 200, response.text
+    return {p["start_date"]: (p["meals"], p["calories"], p["protein"]) for p in response.json()["periods"]}
+
+
+def add_meal(client, headers, day: str, recipe_id=None, meal_type: str = "lunch") -> int:
+    response = client.post("/api/meals/", headers=headers, json={
+        "date": day, "meal_type": meal_type, "recipe_id": recipe_id,
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def test_meal_edits(client, headers, recipe):
+    bowl = recipe(calories=500, protein=40)
+    shake = recipe(calories=200, protein=30)
+    lunch = add_meal(client, headers, DAY_1, bowl)
+    add_meal(client, headers, DAY_1, shake, "snack")
+    add_meal(client, headers, DAY_1)  # no recipe: not counted
+    assert days(client, headers) == {DAY_1: (2, 700.0, 70.0), DAY_2: (0, 0.0, 0.0)}
+
+    # Moving a meal updates both days
+    client.put(f"/api/meals/{lunch}", headers=headers, json={"date": DAY_2})
+    assert days(client, headers) == {DAY_1: (1, 200.0, 30.0), DAY_2: (1, 500.0, 40.0)}
+
+    # Swapping the recipe
+    client.put(f"/api/meals/{lunch}", headers=headers, json={"recipe_id": shake})
+    assert days(client, headers)[DAY_2] == (1, 200.0, 30.0)
+
+    # Deleting the last meal of a day empties it
+    client.delete(f"/api/meals/{lunch}", headers=headers)
+    assert days(client, headers) == {DAY_1: (1, 200.0, 30.0), DAY_2: (0, 0.0, 0.0)}
+
+
+def test_recipe_edits(client, headers, recipe):
+    bowl = recipe(calories=500, protein=40)
+    add_meal(client, headers, DAY_1, bowl)
+    add_meal(client, headers, DAY_2, bowl)
+    add_meal(client, headers, DAY_2, bowl, "dinner")
+    assert days(client, headers) == {DAY_1: (1, 500.0, 40.0), DAY_2: (2, 1000.0, 80.0)}
+
+    # New macros reach every day the recipe was eaten
+    client.put(f"/api/recipes/{bowl}", headers=headers, json={"nutritional_info": {"calories": 600, "protein": 50}})
+    assert days(client, headers) == {DAY_1: (1, 600.0, 50.0), DAY_2: (2, 1200.0, 100.0)}
+
+    # Non-numeric values count as missing
+    client.put(f"/api/recipes/{bowl}", headers=headers, json={"nutritional_info": {"calories": "lots", "protein": 50}})
+    assert days(client, headers) == {DAY_1: (1, 0.0, 50.0), DAY_2: (2, 0.0, 100.0)}
+
+    # Deleting the recipe unlinks its meals, which drop out of the rollup
+    client.delete(f"/api/recipes/{bowl}", headers=headers)
+    assert days(client, headers) == {DAY_1: (0, 0.0, 0.0), DAY_2: (0, 0.0, 0.0)}
+
+
+def test_rollup_only_counts_own_meals(client, signup, headers, recipe):
+    add_meal(client, headers, DAY_1, recipe(calories=300))
+    other = signup()
+    assert days(client, other) == {DAY_1: (0, 0.0, 0.0), DAY_2: (0, 0.0, 0.0)}
@@ -0,0 +1,100 @@
+"""Cursor pagination round-trips and the offset compatibility mode."""
+import base64
+import json
+import random
+from datetime import date, timedelta
+from typing import List
+
+
+def walk(client, url: str, headers: dict) -> List[int]:
+    """Follow rel="next" Link headers to the end; ids in the order served."""
+    ids = []
+    while url:
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200, response.text
+        ids += [item["id"] for item in response.json()]
+        link = response.headers.get("link")
+        if link:
+            assert response.headers["x-next-cursor"] in link
+        url = link[1:link.index(">")] if link else None
+    return ids
+
+
+def test_recipes_cursor_round_trip(client, headers):
+    for i in range(23):
+        client.post("/api/recipes/", headers=headers, json={"title": f"Recipe {i}", "instructions": "x"})
+    everything = [item["id"] for item in client.get("/api/recipes/?limit=500", headers=headers).json()]
+
+    ids = walk(client, "/api/recipes/?limit=4", headers)
+    assert ids == everything
+    assert len(ids) == 23
+    assert ids == sorted(ids, reverse=True)  # newest first; created_at ties broken by id
+
+    by_offset = []
+    for skip in range(0, 23, 4):
+        by_offset += [item["id"] for item in client.get(f"/api/recipes/?skip={skip}&limit=4", headers=headers).json()]
+    assert by_offset == ids
+
+
+def test_groceries_cursor_matches_offset_order(client, headers):
+    rng = random.Random(3)
+    soon = date.today() + timedelta(days=5)
+    client.post("/api/groceries/bulk", headers=headers, json=[
+        {"name": f"item {i}", "quantity": 1,
+         "expiration_date": rng.choice([None, soon.isoformat(), (soon + timedelta(days=1)).isoformat()])}
+        for i in range(30)
+    ])
+
+    by_cursor = walk(client, "/api/groceries/?limit=7", headers)
+    by_offset = []
+    for skip in range(0, 30, 7):
+        page = client.get(f"/api/groceries/?skip={skip}&limit=7", headers=headers)
+        by_offset += [item["id"] for item in page.json()]
+    assert len(set(by_cursor)) == 30
+    assert by_offset == by_cursor
+
+    items = client.get("/api/groceries/?limit=500", headers=headers).json()
+    keys = [(item["expiration_date"] is None, item["expiration_date"] or "", item["id"]) for item in items]
+    assert keys == sorted(keys)  # soonest first, undated last, id breaks ties
+
+
+def test_meals_cursor_round_trip(client, headers):
+    start = date(2026, 3, 2)
+    for i in range(10):
+        client.post("/api/meals/", headers=headers, json={
+            "date": (start + timedelta(days=i // 3)).isoformat(), "meal_type": "lunch",
+        })
+    ids = walk(client, f"/api/meals/?start_date={start}&limit=3", headers)
+    assert len(ids) == len(set(ids)) == 10
+
+
+def test_invalid_cursors_are_rejected(client, headers):
+    client.post("/api/recipes/", headers=headers, json={"title": "a", "instructions": "x"})
+    client.post("/api/recipes/", headers=headers, json={"title": "b", "instructions": "x"})
+    assert client.get("/api/recipes/?cursor=garbage", headers=headers).status_code == 400
+
+    cursor = client.get("/api/recipes/?limit=1", headers=headers).headers["x-next-cursor"]
+    assert client.get(f"/api/meals/?cursor={cursor}", headers=headers).status_code == 400
+
+
+def tampered(listing: str, values: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps([listing, values]).encode()).decode().rstrip("=")
+
+
+def test_tampered_cursors_are_rejected(client, headers):
+    for listing, url, values in [
+        ("groceries", "/api/groceries/", [["v", {"a": 1}], ["v", 1]]),  # not a scalar
+        ("groceries", "/api/groceries/", [["x", "2026-01-01"], ["v", 1]]),  # unknown kind
+        ("groceries", "/api/groceries/", [["d", "2026-01-01"], ["v", "abc"]]),  # string id
+        ("groceries", "/api/groceries/", [["d", "2026-01-01"], ["v", None]]),  # NULL id
+        ("meals", "/api/meals/", [["v", "abc"], ["v", 1]]),  # string for a date
+        ("meals", "/api/meals/", [["dt", "2026-01-01T00:00:00"], ["v", 1]]),  # datetime for a date
+        ("meals", "/api/meals/", [["v", None], ["v", 1]]),  # NULL date
+        ("recipes", "/api/recipes/", [["v", True], ["v", 1]]),  # bool for a datetime
+    ]:
+        response = client.get(url, headers=headers, params={"cursor": tampered(listing, values)})
+        assert response.status_code == 400, (values, response.text)
+
+    # Trailing NULL expiry dates are a real position in the groceries listing
+    cursor = tampered("groceries", [["v", None], ["v", 0]])
+    assert client.get("/api/groceries/", headers=headers, params={"cursor": cursor}).status_code == 200
@@ -0,0 +1,46 @@
+"""Pantry matching and the SQLite search fallback follow recipe writes (recipes collection version)."""
+from app.services.pantry_service import normalize_ingredient
+from app.services.recipe_index import fold_plural
+from app.services.search_service import tokenize
+
+
+def test_plural_folding_is_shared():
+    assert [fold_plural(w) for w in ("eggs", "tomatoes", "berries", "glass", "gas")] == [
+        "egg", "tomato", "berry", "glass", "gas",
+    ]
+    assert normalize_ingredient("Boneless Chicken Breasts (diced)") == "chicken breast"
+    assert tokenize("Fresh Tomatoes and Berries") == ["fresh", "tomato", "berry"]
+
+
+def test_pantry_index_follows_recipe_writes(client, headers):
+    def matches():
+        response = client.get("/api/recipes/match", headers=headers, params={"pantry": "tofu, rice"})
+        assert response.status_code == 200, response.text
+        return [match["title"] for match in response.json()]
+
+    assert matches() == []  # indexes the (empty) collection
+    recipe = client.post("/api/recipes/", headers=headers, json={
+        "title": "Tofu bowl", "instructions": "x", "ingredients": [{"name": "Tofu"}, {"name": "rice"}],
+    }).json()
+    assert matches() == ["Tofu bowl"]
+
+    client.put(f"/api/recipes/{recipe['id']}", headers=headers, json={"ingredients": [{"name": "beef"}]})
+    assert matches() == []
+
+
+def test_search_index_follows_recipe_writes(client, headers):
+    def search(q: str):
+        response = client.get("/api/recipes/search", headers=headers, params={"q": q})
+        assert response.status_code == 200, response.text
+        return [result["title"] for result in response.json()]
+
+    assert search("lentils") == []
+    recipe = client.post("/api/recipes/", headers=headers, json={
+        "title": "Lentil soup", "instructions": "x", "ingredients": [{"name": "red lentils"}],
+    }).json()
+    assert search("lentils") == ["Lentil soup"]
+
+    client.put(f"/api/recipes/{recipe['id']}", headers=headers, json={"title": "Dal"})
+    assert search("soup") == []
+    client.delete(f"/api/recipes/{recipe['id']}", headers=headers)
+    assert search("lentils") == []